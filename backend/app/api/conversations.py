@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.engine import get_session
@@ -7,6 +7,8 @@ from app.schemas.conversation import (
     ConversationUpdate,
     ConversationOut,
     ConversationDetailOut,
+    MessageOut,
+    MessagePage,
 )
 from app.services.conversation_service import ConversationService
 
@@ -33,12 +35,37 @@ async def create_conversation(
 
 @router.get("/{conversation_id}", response_model=ConversationDetailOut)
 async def get_conversation(
-    conversation_id: str, service: ConversationService = Depends(get_conv_service)
+    conversation_id: str,
+    last: int | None = Query(None, ge=1, le=1000, description="Only include the last N messages"),
+    service: ConversationService = Depends(get_conv_service),
 ):
-    conv = await service.get(conversation_id)
+    conv = await service.get(conversation_id, with_messages=last is None)
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conv
+    if last is None:
+        return conv
+    messages, _ = await service.list_messages(conversation_id, limit=last)
+    return ConversationDetailOut(
+        **ConversationOut.model_validate(conv).model_dump(),
+        messages=[MessageOut.model_validate(m) for m in messages],
+    )
+
+
+@router.get("/{conversation_id}/messages", response_model=MessagePage)
+async def list_messages(
+    conversation_id: str,
+    before_id: int | None = None,
+    after_id: int | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    service: ConversationService = Depends(get_conv_service),
+):
+    conv = await service.get(conversation_id, with_messages=False)
+    if not conv:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    messages, has_more = await service.list_messages(
+        conversation_id, before_id=before_id, after_id=after_id, limit=limit
+    )
+    return MessagePage(messages=messages, has_more=has_more)
 
 
 @router.patch("/{conversation_id}", response_model=ConversationOut)
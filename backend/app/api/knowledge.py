@@ -1,34 +1,135 @@
-import os
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+import asyncio
+
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Optional
 
 from app.db.engine import get_session
-from app.schemas.document import DocumentOut
-from app.services.document_service import DocumentService
+from app.models.document import DocumentStatus
+from app.config import settings
+from app.schemas.document import BulkUploadOut, DocumentOut, DocumentScopeUpdate, DocumentUploadOut, IngestionJobOut
+from app.services.bulk_import import BulkStager
+from app.services.document_service import DocumentService, UPLOAD_DIR
 
 router = APIRouter()
 
-UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "uploads")
+def get_doc_service(request: Request, session: AsyncSession = Depends(get_session)) -> DocumentService:
+    return DocumentService(session, request.app.state.knowledge_engine)
+
+def _check_scope(agent_id: Optional[str], channel_id: Optional[str]):
+    if agent_id and channel_id:
+        raise HTTPException(status_code=400, detail="A document belongs to an agent or a channel, not both")
 
-def get_doc_service(session: AsyncSession = Depends(get_session)) -> DocumentService:
-    return DocumentService(session)
+@router.get("/metrics")
+async def knowledge_metrics(request: Request):
+    """Embedding/query latency and warm-up time of the shared knowledge-base engine."""
+    return request.app.state.knowledge_engine.metrics()
 
 @router.get("", response_model=List[DocumentOut])
 async def list_documents(service: DocumentService = Depends(get_doc_service)):
     return await service.list_documents()
 
-@router.post("", response_model=DocumentOut)
+@router.get("/jobs", response_model=List[IngestionJobOut])
+async def list_ingestion_jobs(request: Request):
+    return [job.as_dict() for job in request.app.state.ingestion_queue.list_jobs()]
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobOut)
+async def get_ingestion_job(job_id: str, request: Request):
+    job = request.app.state.ingestion_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.as_dict()
+
+@router.post("", response_model=DocumentUploadOut, status_code=202)
 async def upload_document(
+    request: Request,
     file: UploadFile = File(...),
+    agent_id: Optional[str] = Form(None),
+    channel_id: Optional[str] = Form(None),
+    service: DocumentService = Depends(get_doc_service)
+):
+    """Store the file and queue it for ingestion; progress is at /api/knowledge/jobs/{job_id}.
+
+    With agent_id or channel_id the document is only searchable by that agent or in that channel.
+    """
+    _check_scope(agent_id, channel_id)
+    try:
+        doc, file_path = await service.upload_document(file, UPLOAD_DIR, agent_id=agent_id, channel_id=channel_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    job = request.app.state.ingestion_queue.submit(doc, file_path) if file_path else None
+    return DocumentUploadOut(**DocumentOut.model_validate(doc).model_dump(), job_id=job.id if job else None)
+
+@router.post("/bulk", response_model=BulkUploadOut, status_code=202)
+async def bulk_upload_documents(
+    request: Request,
+    files: Optional[List[UploadFile]] = File(None),
+    path: Optional[str] = Form(None),
+    agent_id: Optional[str] = Form(None),
+    channel_id: Optional[str] = Form(None),
     service: DocumentService = Depends(get_doc_service)
 ):
+    """Import many documents at once and queue them for ingestion.
+
+    Accepts any number of files, where .zip/.tar(.gz) archives are expanded, and/or
+    ``path``, a file or directory under data/workspace. Archive and directory
+    entries are limited to text, markdown and PDF files.
+    """
+    _check_scope(agent_id, channel_id)
+    if not files and not path:
+        raise HTTPException(status_code=400, detail="Send files, an archive, or a workspace path")
+
+    def stage():
+        stager = BulkStager(
+            UPLOAD_DIR,
+            settings.bulk_upload_max_files,
+            settings.bulk_upload_max_file_bytes,
+            settings.bulk_upload_max_total_bytes,
+        )
+        try:
+            for file in files or []:
+                stager.add_upload(file.filename, file.content_type, file.file)
+            if path:
+                stager.add_workspace_path(path)
+        except BaseException:
+            stager.batch.discard()
+            raise
+        return stager.batch
+
+    try:
+        batch = await asyncio.to_thread(stage)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     try:
-        doc = await service.upload_document(file, UPLOAD_DIR)
-        return doc
+        created, duplicates = await service.create_documents(batch, UPLOAD_DIR, agent_id=agent_id, channel_id=channel_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    # The queue's fixed worker pool bounds how many of these are ingested at once
+    queue = request.app.state.ingestion_queue
+    return BulkUploadOut(
+        created=[
+            DocumentUploadOut(**DocumentOut.model_validate(doc).model_dump(), job_id=queue.submit(doc, file_path).id)
+            for doc, file_path in created
+        ],
+        duplicates=[DocumentOut.model_validate(doc) for doc in duplicates],
+        skipped=batch.skipped,
+    )
+
+@router.put("/{doc_id}/scope", response_model=DocumentOut)
+async def set_document_scope(
+    doc_id: str,
+    body: DocumentScopeUpdate,
+    service: DocumentService = Depends(get_doc_service)
+):
+    _check_scope(body.agent_id, body.channel_id)
+    doc = await service.get_document(doc_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if doc.status in (DocumentStatus.PENDING, DocumentStatus.PROCESSING):
+        raise HTTPException(status_code=409, detail="Document is still being ingested")
+    return await service.set_document_scope(doc_id, agent_id=body.agent_id, channel_id=body.channel_id)
+
 @router.delete("/{doc_id}")
 async def delete_document(doc_id: str, service: DocumentService = Depends(get_doc_service)):
     success = await service.delete_document(doc_id)
@@ -63,6 +63,9 @@ async def update_settings(req: SettingsUpdate, request: Request):
 
     if req.ollama_base_url is not None:
         settings.ollama_base_url = req.ollama_base_url
+        if req.ollama_base_url:
+            from app.providers.ollama_provider import OllamaProvider
+            await request.app.state.provider_registry.replace_provider("ollama", OllamaProvider(req.ollama_base_url))
     if req.default_model is not None:
         settings.default_model = req.default_model
     if req.default_temperature is not None:
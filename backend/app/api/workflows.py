@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from app.db.engine import get_session
-from app.schemas.workflow import WorkflowOut, WorkflowCreate, WorkflowGraph, NodeCreate, EdgeCreate
+from app.models.workflow import WorkflowRunStatus
+from app.schemas.workflow import (
+    WorkflowOut, WorkflowCreate, WorkflowGraph, NodeCreate, EdgeCreate, WorkflowRunOut, WorkflowRunDetail,
+    WorkflowRunQueued,
+)
+from app.services.workflow_engine import WorkflowEngine
+from app.services.workflow_plan import WorkflowGraphError
+from app.services.workflow_queue import WorkflowQueue, WorkflowQueueFull
 from app.services.workflow_service import WorkflowService
 
 router = APIRouter()
@@ -11,6 +18,15 @@ router = APIRouter()
 def get_workflow_service(session: AsyncSession = Depends(get_session)) -> WorkflowService:
     return WorkflowService(session)
 
+def _enqueue(queue: WorkflowQueue, run_id: str, workflow_id: str) -> WorkflowRunQueued:
+    try:
+        queue.submit(run_id, workflow_id)
+    except WorkflowQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return WorkflowRunQueued(run_id=run_id, status="queued", queue_depth=queue.depth)
+
 @router.get("", response_model=List[WorkflowOut])
 async def list_workflows(
     agent_id: Optional[str] = Query(None),
@@ -31,6 +47,68 @@ async def create_workflow(
         channel_id=workflow.channel_id,
     )
 
+@router.get("/schedules")
+async def list_schedules(request: Request):
+    """Scheduled triggers and when each fires next."""
+    return request.app.state.workflow_scheduler.upcoming()
+
+@router.get("/runs/{run_id}", response_model=WorkflowRunDetail)
+async def get_run(run_id: str, service: WorkflowService = Depends(get_workflow_service)):
+    """A run with its per-node status, output and timings."""
+    run = await service.get_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return run
+
+@router.post("/runs/{run_id}/resume", response_model=WorkflowRunQueued, status_code=202)
+async def resume_run(run_id: str, request: Request, service: WorkflowService = Depends(get_workflow_service)):
+    """Queue a failed or interrupted run to continue; nodes that already succeeded are not executed again."""
+    run = await service.get_run(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    if run.status not in (WorkflowRunStatus.ERROR, WorkflowRunStatus.INTERRUPTED):
+        raise HTTPException(status_code=409, detail=f"Only failed or interrupted runs can be resumed (run is {run.status})")
+    return _enqueue(request.app.state.workflow_queue, run.id, run.workflow_id)
+
+@router.post("/{workflow_id}/trigger", response_model=WorkflowRunQueued, status_code=202)
+async def trigger_workflow(
+    workflow_id: str,
+    request: Request,
+    payload: Dict[str, Any] = Body(default={}),
+    trigger_node_id: Optional[str] = Query(None),
+    session: AsyncSession = Depends(get_session),
+):
+    """Start a run in the background (e.g. from a webhook); the JSON body is the trigger payload.
+
+    Returns the run id at once; follow the run with GET /api/workflows/runs/{run_id}.
+    """
+    queue: WorkflowQueue = request.app.state.workflow_queue
+    if queue.is_full:
+        raise HTTPException(
+            status_code=429, detail="Workflow queue is full; try again later.", headers={"Retry-After": "5"},
+        )
+    engine = WorkflowEngine(session, request.app.state.provider_registry, request.app.state.tool_registry)
+    try:
+        run = await engine.create_run(workflow_id, payload, trigger_node_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return _enqueue(queue, run.id, workflow_id)
+    except HTTPException as e:
+        # Filled up while the run was being recorded
+        run.status = WorkflowRunStatus.ERROR
+        run.error = e.detail
+        await session.commit()
+        raise
+
+@router.get("/{workflow_id}/runs", response_model=List[WorkflowRunOut])
+async def list_runs(
+    workflow_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    service: WorkflowService = Depends(get_workflow_service),
+):
+    return await service.list_runs(workflow_id, limit=limit)
+
 @router.get("/{workflow_id}", response_model=WorkflowGraph)
 async def get_workflow(workflow_id: str, service: WorkflowService = Depends(get_workflow_service)):
     workflow = await service.get_workflow(workflow_id)
@@ -43,16 +121,22 @@ async def save_graph(
     workflow_id: str,
     nodes: List[NodeCreate],
     edges: List[EdgeCreate],
+    request: Request,
     service: WorkflowService = Depends(get_workflow_service)
 ):
-    workflow = await service.save_graph(workflow_id, nodes, edges)
+    try:
+        workflow = await service.save_graph(workflow_id, nodes, edges)
+    except WorkflowGraphError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not workflow:
         raise HTTPException(status_code=404, detail="Workflow not found")
+    request.app.state.workflow_scheduler.refresh_soon()
     return workflow
 
 @router.delete("/{workflow_id}")
-async def delete_workflow(workflow_id: str, service: WorkflowService = Depends(get_workflow_service)):
+async def delete_workflow(workflow_id: str, request: Request, service: WorkflowService = Depends(get_workflow_service)):
     success = await service.delete_workflow(workflow_id)
     if not success:
         raise HTTPException(status_code=404, detail="Workflow not found")
+    request.app.state.workflow_scheduler.refresh_soon()
     return {"status": "deleted"}
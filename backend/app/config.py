@@ -8,8 +8,20 @@ class Settings(BaseSettings):
     host: str = "127.0.0.1"
     port: int = 8321
 
-    # Database
+    # Database (relative SQLite paths resolve against the backend/ directory;
+    # use postgresql+asyncpg://... with the "postgres" extra for Postgres)
     database_url: str = "sqlite+aiosqlite:///data/assitance.db"
+    database_echo: bool = False
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_timeout: float = 30.0
+
+    # SQLite engine profile, applied as PRAGMAs on every new connection
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_cache_size_kib: int = 65536
+    sqlite_mmap_size: int = 268435456  # 256 MiB
 
     # Provider API keys
     openai_api_key: str | None = None
@@ -17,10 +29,66 @@ class Settings(BaseSettings):
     gemini_api_key: str | None = None
     ollama_base_url: str = "http://localhost:11434"
 
+    # Ollama HTTP client (one pooled keep-alive client per provider instance)
+    ollama_max_connections: int = 20
+    ollama_max_keepalive_connections: int = 10
+    ollama_keepalive_expiry_seconds: float = 30.0
+    ollama_request_timeout_seconds: float = 120.0
+    ollama_health_ttl_seconds: float = 15.0  # How long an availability probe result is reused
+
     # Defaults
     default_model: str = "gemini/gemini-2.5-flash"
     default_temperature: float = 0.7
     default_system_prompt: str = "You are a helpful AI assistant."
 
+    # Tool execution
+    tool_max_concurrency: int = 4  # Max tool calls run at once per assistant turn (1 = sequential)
+    tool_timeout_seconds: float = 120.0
+
+    # Chat history
+    history_cache_conversations: int = 256  # Decoded histories kept in memory (LRU)
+    context_window_ratio: float = 0.8  # Share of the model's context window used for prompt + history
+    context_max_tokens: int = 0  # Hard cap on prompt + history tokens (0 = model window only)
+    context_summary_max_messages: int = 40  # Dropped messages summarised per turn; an older backlog is omitted
+
+    # Knowledge base
+    knowledge_warmup: bool = True  # Load the embedding model at startup instead of on the first search
+    kb_query_cache_size: int = 512  # Cached query embeddings / result sets (0 disables)
+    kb_query_cache_ttl_seconds: float = 300.0
+    chunk_max_tokens: int = 200  # Chunk size; the default embedding model reads up to 256 word pieces
+    chunk_overlap_tokens: int = 32  # Whole sentences carried over when a section is split
+    embedding_batch_size: int = 64  # Chunks embedded per model call during ingestion
+    ingestion_concurrency: int = 2  # Documents ingested at once
+    ingestion_processes: int = 0  # Page-extraction worker processes (0 = CPU count, at most 4)
+    kb_rerank: bool = False  # Rerank search results with a CPU cross-encoder (needs sentence-transformers)
+    kb_rerank_model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    kb_rerank_candidates: int = 20  # Chunks fetched by the first-stage search and scored by the reranker
+    kb_rerank_min_score: float | None = None  # Drop reranked chunks scoring below this (0-1 after a sigmoid; unset keeps the top n)
+    kb_rerank_threads: int = 2  # Reranks run at once
+    bulk_upload_max_files: int = 5000  # Files accepted by one bulk upload / workspace import
+    bulk_upload_max_file_bytes: int = 104857600  # 100 MiB; larger files (after decompression) are skipped
+    bulk_upload_max_total_bytes: int = 1073741824  # 1 GiB staged by one bulk import; the rest is skipped unread
+
+    # Workflows
+    workflow_max_parallel_nodes: int = 4  # Nodes of one run executing at once (independent branches)
+    workflow_workers: int = 4  # Queued runs executing at once, across all workflows
+    workflow_max_runs_per_workflow: int = 2  # Runs of the same workflow executing at once
+    workflow_queue_max_depth: int = 100  # Runs waiting to execute; triggers beyond this get 429
+    workflow_scheduler: bool = True  # Run "schedule" trigger nodes
+    workflow_schedule_refresh_seconds: float = 30.0  # How often schedule edits are picked up
+    workflow_schedule_misfire_grace_seconds: float = 60.0  # Later than this a fire time counts as missed
+    workflow_schedule_max_catchup: int = 10  # Missed runs replayed per schedule under the "catch_up" policy
+    workflow_schedule_jitter_seconds: float = 0.0  # Default random delay (0 to this) added to every fire time
+
+    # Message persistence during chat turns:
+    #   "immediate" - commit every message as it is produced
+    #   "tool"      - buffer and commit once per tool round and at the end of the turn
+    #   "turn"      - buffer and commit only at the end of the turn
+    # Buffered messages older than message_flush_interval_seconds are committed on the next write.
+    # Buffered messages are also committed when a turn fails or the client disconnects; only a
+    # process crash loses them.
+    message_flush_policy: str = "tool"
+    message_flush_interval_seconds: float = 5.0
+
 
 settings = Settings()
@@ -1,58 +1,81 @@
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import event, select, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from app.config import Settings, settings
 from app.db.base import Base
+from app.db.migrations import run_migrations
 
 
-DATABASE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "assitance.db")
-DATABASE_URL = f"sqlite+aiosqlite:///{DATABASE_PATH}"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+
+def resolve_database_url(url: str) -> str:
+    """Make relative SQLite paths absolute (under backend/) so the DB location doesn't depend on the CWD."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database and parsed.database != ":memory:":
+        if not os.path.isabs(parsed.database):
+            parsed = parsed.set(database=os.path.join(BACKEND_DIR, parsed.database))
+    return parsed.render_as_string(hide_password=False)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, config: Settings):
+    cursor = dbapi_connection.cursor()
+    try:
+        if config.sqlite_journal_mode:
+            cursor.execute(f"PRAGMA journal_mode={config.sqlite_journal_mode}")
+        if config.sqlite_synchronous:
+            cursor.execute(f"PRAGMA synchronous={config.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config.sqlite_busy_timeout_ms)}")
+        # Negative cache_size is in KiB rather than pages
+        cursor.execute(f"PRAGMA cache_size=-{int(config.sqlite_cache_size_kib)}")
+        cursor.execute(f"PRAGMA mmap_size={int(config.sqlite_mmap_size)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
+
+def create_engine_from_settings(config: Settings, url: str | None = None) -> AsyncEngine:
+    """Create the async engine for the configured database with its tuning profile applied."""
+    url = resolve_database_url(url or config.database_url)
+    parsed = make_url(url)
+    is_sqlite = parsed.get_backend_name() == "sqlite"
+
+    kwargs = {"echo": config.database_echo}
+    if not (is_sqlite and parsed.database in (None, "", ":memory:")):
+        # Concurrent readers (WebSocket chats, delegations, status updates) each hold a connection
+        kwargs.update(
+            pool_size=config.database_pool_size,
+            max_overflow=config.database_max_overflow,
+            pool_timeout=config.database_pool_timeout,
+            pool_pre_ping=not is_sqlite,
+        )
+
+    new_engine = create_async_engine(url, **kwargs)
+
+    if is_sqlite:
+        @event.listens_for(new_engine.sync_engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            _apply_sqlite_pragmas(dbapi_connection, config)
+
+    return new_engine
+
+
+DATABASE_URL = resolve_database_url(settings.database_url)
+DATABASE_PATH = make_url(DATABASE_URL).database if DATABASE_URL.startswith("sqlite") else None
+
+engine = create_engine_from_settings(settings)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
 async def init_database():
-    os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
+    if DATABASE_PATH and DATABASE_PATH != ":memory:":
+        os.makedirs(os.path.dirname(DATABASE_PATH), exist_ok=True)
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-        # Migrate: add new columns if they don't exist (SQLite doesn't support IF NOT EXISTS for columns)
-        new_agent_cols = [
-            ("personality_tone", "TEXT"),
-            ("personality_traits", "TEXT"),
-            ("communication_style", "TEXT"),
-            ("enabled_tools", "TEXT"),
-            ("reasoning_style", "TEXT"),
-            ("memory_context", "TEXT"),
-            ("memory_instructions", "TEXT"),
-            ("api_key", "TEXT"),
-            ("is_system", "BOOLEAN DEFAULT 0"),
-        ]
-        import sqlalchemy
-        from sqlalchemy import select, func
-        for col_name, col_type in new_agent_cols:
-            try:
-                await conn.execute(sqlalchemy.text(f"ALTER TABLE agents ADD COLUMN {col_name} {col_type}"))
-            except Exception:
-                pass  # Column already exists
-                
-        # Migrate: add agent_id to conversations
-        try:
-            await conn.execute(sqlalchemy.text(f"ALTER TABLE conversations ADD COLUMN agent_id VARCHAR"))
-        except Exception:
-            pass
-
-        # Migrate: add channel_id to conversations
-        try:
-            await conn.execute(sqlalchemy.text(f"ALTER TABLE conversations ADD COLUMN channel_id VARCHAR"))
-        except Exception:
-            pass
-
-        # Migrate: add agent_id and channel_id to workflows
-        for col_name in ["agent_id", "channel_id"]:
-            try:
-                await conn.execute(sqlalchemy.text(f"ALTER TABLE workflows ADD COLUMN {col_name} VARCHAR"))
-            except Exception:
-                pass
-            
+        # Bring databases created by older versions up to the current schema
+        await conn.run_sync(run_migrations)
+
     # Import models to ensure they are created by Base.metadata.create_all
     from app.models.model_config import ModelConfig
     from app.models.agent import Agent, new_id
@@ -110,7 +133,6 @@ async def init_database():
             await session.commit()
 
 
-
 async def get_session() -> AsyncSession:
     async with async_session() as session:
         yield session
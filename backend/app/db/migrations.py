@@ -0,0 +1,118 @@
+"""
+Versioned schema migrations, run at startup by init_database().
+
+Base.metadata.create_all builds the full current schema for new databases, but it
+never alters existing tables. Each migration here brings an older database up to
+date and is idempotent (it inspects the schema before changing it), so it is also
+safe on a database create_all has just built. The applied version is stored in the
+``schema_version`` table.
+
+To add a migration, append a function to MIGRATIONS; never reorder or edit old ones.
+"""
+from typing import Callable
+
+import sqlalchemy
+from sqlalchemy.engine import Connection
+
+
+def _columns(conn: Connection, table: str) -> set[str]:
+    return {c["name"] for c in sqlalchemy.inspect(conn).get_columns(table)}
+
+
+def _has_table(conn: Connection, table: str) -> bool:
+    return sqlalchemy.inspect(conn).has_table(table)
+
+
+def _add_column_if_missing(conn: Connection, table: str, column: str, ddl_type: str):
+    if _has_table(conn, table) and column not in _columns(conn, table):
+        conn.execute(sqlalchemy.text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl_type}"))
+
+
+def _create_index_if_missing(conn: Connection, name: str, table: str, columns: list[str]):
+    if not _has_table(conn, table):
+        return
+    existing = {ix["name"] for ix in sqlalchemy.inspect(conn).get_indexes(table)}
+    if name not in existing:
+        conn.execute(sqlalchemy.text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+
+
+def _m001_legacy_columns(conn: Connection):
+    """Columns added after the first release (previously the try/except ALTER TABLE loop)."""
+    for col_name in [
+        "personality_tone", "personality_traits", "communication_style", "enabled_tools",
+        "reasoning_style", "memory_context", "memory_instructions", "api_key",
+    ]:
+        _add_column_if_missing(conn, "agents", col_name, "TEXT")
+    _add_column_if_missing(conn, "agents", "is_system", "BOOLEAN DEFAULT FALSE")
+
+    _add_column_if_missing(conn, "conversations", "agent_id", "VARCHAR")
+    _add_column_if_missing(conn, "conversations", "channel_id", "VARCHAR")
+    _add_column_if_missing(conn, "channels", "parallel_broadcast", "BOOLEAN DEFAULT FALSE")
+    _add_column_if_missing(conn, "workflows", "agent_id", "VARCHAR")
+    _add_column_if_missing(conn, "workflows", "channel_id", "VARCHAR")
+
+
+def _m002_hot_path_indexes(conn: Connection):
+    """Indexes for the per-turn history reads, delegation lookups and channel membership."""
+    # get_messages: WHERE conversation_id = ? ORDER BY created_at
+    _create_index_if_missing(conn, "ix_messages_conversation_id_created_at", "messages", ["conversation_id", "created_at"])
+    # get_chat_history incremental read: WHERE conversation_id = ? AND id > ? ORDER BY id
+    _create_index_if_missing(conn, "ix_messages_conversation_id_id", "messages", ["conversation_id", "id"])
+    # list_all(agent_id=...): WHERE agent_id = ? ORDER BY updated_at DESC
+    _create_index_if_missing(conn, "ix_conversations_agent_id_updated_at", "conversations", ["agent_id", "updated_at"])
+    # (channel_id, agent_id) probes use the composite primary key; this covers lookups by agent
+    _create_index_if_missing(conn, "ix_channel_agents_agent_id", "channel_agents", ["agent_id"])
+
+
+def _m003_document_ingestion_state(conn: Connection):
+    """Ingestion state on documents; rows from before the job queue were ingested inline."""
+    _add_column_if_missing(conn, "documents", "status", "VARCHAR NOT NULL DEFAULT 'ready'")
+    _add_column_if_missing(conn, "documents", "chunk_count", "INTEGER NOT NULL DEFAULT 0")
+    _add_column_if_missing(conn, "documents", "error", "TEXT")
+
+
+def _m004_document_scope(conn: Connection):
+    """Agent/channel ownership of knowledge-base documents; existing documents stay global."""
+    _add_column_if_missing(conn, "documents", "agent_id", "VARCHAR")
+    _add_column_if_missing(conn, "documents", "channel_id", "VARCHAR")
+    _create_index_if_missing(conn, "ix_documents_agent_id", "documents", ["agent_id"])
+    _create_index_if_missing(conn, "ix_documents_channel_id", "documents", ["channel_id"])
+
+
+def _m005_workflow_version(conn: Connection):
+    """Graph version of each workflow, the key of its cached execution plan."""
+    _add_column_if_missing(conn, "workflows", "version", "INTEGER NOT NULL DEFAULT 1")
+
+
+def _m006_conversation_context_summary(conn: Connection):
+    """Persisted rolling summary of history dropped from the context window."""
+    _add_column_if_missing(conn, "conversations", "context_summary", "TEXT")
+    _add_column_if_missing(conn, "conversations", "context_summary_upto", "INTEGER")
+
+
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _m001_legacy_columns,
+    _m002_hot_path_indexes,
+    _m003_document_ingestion_state,
+    _m004_document_scope,
+    _m005_workflow_version,
+    _m006_conversation_context_summary,
+]
+
+
+def current_version(conn: Connection) -> int:
+    conn.execute(sqlalchemy.text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    version = conn.execute(sqlalchemy.text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+def run_migrations(conn: Connection) -> int:
+    """Apply pending migrations in order. Returns the resulting schema version."""
+    version = current_version(conn)
+    for number, migration in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        migration(conn)
+        conn.execute(sqlalchemy.text("INSERT INTO schema_version (version) VALUES (:v)"), {"v": number})
+        version = number
+    return version
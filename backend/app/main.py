@@ -12,6 +12,11 @@ import app.models.custom_tool
 import app.models.skill
 from app.db.engine import init_database, async_session
 from app.providers.registry import ProviderRegistry
+from app.services.knowledge_engine import KnowledgeEngine
+from app.services.ingestion import IngestionQueue
+from app.services.workflow_queue import WorkflowQueue
+from app.services.workflow_scheduler import WorkflowScheduler
+from app.services.workflow_service import WorkflowService
 from app.tools.registry import ToolRegistry
 from app.api.router import api_router
 from app.api.chat import websocket_chat
@@ -22,13 +27,31 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_database()
     app.state.provider_registry = ProviderRegistry(settings)
+    app.state.knowledge_engine = KnowledgeEngine()
+    await app.state.knowledge_engine.warm_up(load_model=settings.knowledge_warmup)
+    app.state.ingestion_queue = IngestionQueue(app.state.knowledge_engine)
+    await app.state.ingestion_queue.start()
     app.state.tool_registry = ToolRegistry()
-    app.state.tool_registry.register_defaults(provider_registry=app.state.provider_registry)
+    app.state.tool_registry.register_defaults(
+        provider_registry=app.state.provider_registry,
+        knowledge_engine=app.state.knowledge_engine,
+    )
     # Load user-created custom tools from DB
     async with async_session() as session:
         await app.state.tool_registry.load_custom_tools(session)
+        # Runs cut off by the last shutdown stay resumable via /api/workflows/runs/{id}/resume
+        await WorkflowService(session).mark_interrupted_runs()
+    app.state.workflow_queue = WorkflowQueue(app.state.provider_registry, app.state.tool_registry)
+    await app.state.workflow_queue.start()
+    app.state.workflow_scheduler = WorkflowScheduler(app.state.workflow_queue)
+    await app.state.workflow_scheduler.start()
     yield
     # Shutdown
+    await app.state.workflow_scheduler.stop()
+    await app.state.workflow_queue.stop()
+    await app.state.ingestion_queue.stop()
+    app.state.knowledge_engine.close()
+    await app.state.provider_registry.aclose()
 
 
 app = FastAPI(title="Assitance", version="0.1.0", lifespan=lifespan)
@@ -70,6 +93,27 @@ async def websocket_agents_status(websocket: WebSocket):
         manager.unsubscribe(queue)
 
 
+@app.websocket("/api-ws/knowledge/jobs")
+async def websocket_ingestion_jobs(websocket: WebSocket):
+    await websocket.accept()
+    ingestion_queue = websocket.app.state.ingestion_queue
+
+    await websocket.send_text(json.dumps({
+        "type": "initial_jobs",
+        "jobs": [job.as_dict() for job in ingestion_queue.list_jobs()]
+    }))
+
+    queue = ingestion_queue.subscribe()
+    try:
+        while True:
+            message = await queue.get()
+            await websocket.send_text(message)
+    except WebSocketDisconnect:
+        ingestion_queue.unsubscribe(queue)
+    except Exception:
+        ingestion_queue.unsubscribe(queue)
+
+
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok", "version": "0.1.0"}
@@ -19,6 +19,9 @@ class Channel(Base):
     name: Mapped[str] = mapped_column(String, index=True)
     description: Mapped[str | None] = mapped_column(Text, nullable=True)
     is_announcement: Mapped[bool] = mapped_column(Boolean, default=False)
+    # Group chat mode: False = agents reply one after another, each seeing the previous
+    # replies; True = all agents answer the same history snapshot concurrently.
+    parallel_broadcast: Mapped[bool] = mapped_column(Boolean, default=False)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, onupdate=utcnow)
@@ -1,7 +1,16 @@
-from sqlalchemy import Column, String, Integer, DateTime
+from sqlalchemy import Column, String, Integer, DateTime, Text, LargeBinary
 from sqlalchemy.sql import func
 from app.db.base import Base
 
+
+class DocumentStatus:
+    """Ingestion state of a Document (text extraction, chunking, embedding)."""
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    FAILED = "failed"
+
+
 class Document(Base):
     __tablename__ = "documents"
 
@@ -10,4 +19,21 @@ class Document(Base):
     file_type = Column(String, nullable=False)
     size = Column(Integer, nullable=False)
     content_hash = Column(String, index=True, nullable=False)
+    status = Column(String, nullable=False, default=DocumentStatus.READY, server_default=DocumentStatus.READY)
+    chunk_count = Column(Integer, nullable=False, default=0, server_default="0")
+    error = Column(Text, nullable=True)
+    # Owner scope: an agent's or a channel's private document; both None means shared with everyone
+    agent_id = Column(String, nullable=True, index=True)
+    channel_id = Column(String, nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class EmbeddingCacheEntry(Base):
+    """Content-addressed embedding cache: sha256 of the normalised chunk text -> float32 vector."""
+    __tablename__ = "embedding_cache"
+
+    model = Column(String, primary_key=True)  # Embedding model the vector came from
+    text_hash = Column(String(64), primary_key=True)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, Boolean, DateTime, Float, ForeignKey, Integer, Text, UniqueConstraint
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 import uuid
@@ -14,6 +14,7 @@ class Workflow(Base):
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")  # Bumped on every graph change
     agent_id = Column(String, ForeignKey("agents.id", ondelete="SET NULL"), nullable=True)
     channel_id = Column(String, ForeignKey("channels.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -46,3 +47,49 @@ class Edge(Base):
     target_node_id = Column(String, nullable=False)
 
     workflow = relationship("Workflow", back_populates="edges")
+
+
+class WorkflowRunStatus:
+    """State of a workflow run; "interrupted" runs were cut off by a shutdown or crash and can be resumed."""
+    PENDING = "pending"
+    RUNNING = "running"
+    SUCCESS = "success"
+    ERROR = "error"
+    INTERRUPTED = "interrupted"
+
+
+class WorkflowRun(Base):
+    __tablename__ = "workflow_runs"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    workflow_id = Column(String, ForeignKey("workflows.id", ondelete="CASCADE"), nullable=False, index=True)
+    workflow_version = Column(Integer, nullable=False)  # Graph version the run's node outputs belong to
+    trigger_node_id = Column(String, nullable=True)
+    status = Column(String, nullable=False, default=WorkflowRunStatus.PENDING)
+    trigger_payload_json = Column(Text, default="{}")
+    final_payload_json = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    node_runs = relationship("NodeRun", back_populates="run", cascade="all, delete-orphan", order_by="NodeRun.started_at")
+
+
+class NodeRun(Base):
+    """One node's execution within a run; a successful row is the checkpoint a resumed run starts from."""
+    __tablename__ = "node_runs"
+    __table_args__ = (UniqueConstraint("run_id", "node_id", name="uq_node_runs_run_id_node_id"),)
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    run_id = Column(String, ForeignKey("workflow_runs.id", ondelete="CASCADE"), nullable=False)
+    node_id = Column(String, nullable=False)
+    node_type = Column(String, nullable=False)  # The node's sub_type, e.g. summarize
+    status = Column(String, nullable=False)  # success, error
+    output_json = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    duration_ms = Column(Float, nullable=True)
+
+    run = relationship("WorkflowRun", back_populates="node_runs")
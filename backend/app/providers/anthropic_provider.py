@@ -15,7 +15,7 @@ class AnthropicProvider(BaseProvider):
     def name(self) -> str:
         return "anthropic"
 
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         return bool(self._api_key)
 
     def _format_messages(self, messages: list[ChatMessage]) -> tuple[str | None, list[dict]]:
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import AsyncIterator
 
 
@@ -19,6 +19,10 @@ class ChatMessage:
     content: str = ""
     tool_calls: list[dict] | None = None
     tool_call_id: str | None = None
+    tool_name: str | None = None
+    agent_name: str | None = None  # Author in group chats; not sent to providers
+    message_id: int | None = field(default=None, repr=False, compare=False)  # Stored Message.id; not sent to providers
+    token_counts: dict[str, int] = field(default_factory=dict, repr=False, compare=False)  # Memoised per tokenizer
 
 
 @dataclass
@@ -65,6 +69,10 @@ class BaseProvider(ABC):
         ...
 
     @abstractmethod
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         """Check if provider is configured and usable."""
         ...
+
+    async def aclose(self):
+        """Release network resources (pooled clients). Called on app shutdown."""
+        return None
@@ -9,6 +9,8 @@ from app.providers.base import BaseProvider, ChatMessage, StreamChunk, ModelInfo
 
 
 class GeminiProvider(BaseProvider):
+    """Gemini over the SDK's async surface (client.aio), so calls never block the event loop."""
+
     def __init__(self, api_key: str):
         self._api_key = api_key
         self.client = genai.Client(api_key=api_key)
@@ -17,9 +19,12 @@ class GeminiProvider(BaseProvider):
     def name(self) -> str:
         return "gemini"
 
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         return bool(self._api_key)
 
+    async def aclose(self):
+        await self.client.aio.aclose()
+
     def _format_tools(self, tools: list[dict] | None) -> list[types.Tool] | None:
         if not tools:
             return None
@@ -110,7 +115,7 @@ class GeminiProvider(BaseProvider):
         if system_instruction:
             config.system_instruction = system_instruction
 
-        response = self.client.models.generate_content(
+        response = await self.client.aio.models.generate_content(
             model=model,
             contents=contents,
             config=config,
@@ -158,7 +163,7 @@ class GeminiProvider(BaseProvider):
         if system_instruction:
             config.system_instruction = system_instruction
 
-        response = self.client.models.generate_content_stream(
+        response = await self.client.aio.models.generate_content_stream(
             model=model,
             contents=contents,
             config=config,
@@ -166,7 +171,7 @@ class GeminiProvider(BaseProvider):
 
         accumulated_tool_calls = []
 
-        for chunk in response:
+        async for chunk in response:
             if not chunk.candidates:
                 continue
 
@@ -1,25 +1,63 @@
+import asyncio
 import json
+import time
 import httpx
 from typing import AsyncIterator
 
+from app.config import settings
 from app.providers.base import BaseProvider, ChatMessage, StreamChunk, ModelInfo
 
 
 class OllamaProvider(BaseProvider):
+    """
+    Talks to an Ollama server over one long-lived pooled httpx client, so turns
+    reuse keep-alive connections. Availability is a cached async probe of
+    /api/tags that is re-run at most once per ollama_health_ttl_seconds.
+    """
+
     def __init__(self, base_url: str = "http://localhost:11434"):
         self.base_url = base_url.rstrip("/")
+        self._client: httpx.AsyncClient | None = None
+        self._health: tuple[float, bool] | None = None  # (checked_at monotonic, available)
+        self._health_lock = asyncio.Lock()
 
     @property
     def name(self) -> str:
         return "ollama"
 
-    def is_available(self) -> bool:
-        try:
-            import httpx
-            r = httpx.get(f"{self.base_url}/api/tags", timeout=2)
-            return r.status_code == 200
-        except Exception:
-            return False
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=settings.ollama_request_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=settings.ollama_max_connections,
+                    max_keepalive_connections=settings.ollama_max_keepalive_connections,
+                    keepalive_expiry=settings.ollama_keepalive_expiry_seconds,
+                ),
+            )
+        return self._client
+
+    async def is_available(self) -> bool:
+        if self._health and time.monotonic() - self._health[0] < settings.ollama_health_ttl_seconds:
+            return self._health[1]
+        async with self._health_lock:
+            # Another caller may have refreshed it while we waited
+            if self._health and time.monotonic() - self._health[0] < settings.ollama_health_ttl_seconds:
+                return self._health[1]
+            try:
+                r = await self.client.get("/api/tags", timeout=2)
+                available = r.status_code == 200
+            except Exception:
+                available = False
+            self._health = (time.monotonic(), available)
+            return available
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     def _format_messages(self, messages: list[ChatMessage]) -> list[dict]:
         formatted = []
@@ -47,14 +85,9 @@ class OllamaProvider(BaseProvider):
             "options": {"temperature": temperature},
         }
 
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=120,
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await self.client.post("/api/chat", json=payload)
+        resp.raise_for_status()
+        data = resp.json()
 
         return ChatMessage(
             role="assistant",
@@ -75,32 +108,25 @@ class OllamaProvider(BaseProvider):
             "options": {"temperature": temperature},
         }
 
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST",
-                f"{self.base_url}/api/chat",
-                json=payload,
-                timeout=120,
-            ) as resp:
-                resp.raise_for_status()
-                async for line in resp.aiter_lines():
-                    if not line.strip():
-                        continue
-                    data = json.loads(line)
-                    msg = data.get("message", {})
-                    done = data.get("done", False)
-
-                    yield StreamChunk(
-                        delta=msg.get("content", ""),
-                        finish_reason="stop" if done else None,
-                    )
+        async with self.client.stream("POST", "/api/chat", json=payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                msg = data.get("message", {})
+                done = data.get("done", False)
+
+                yield StreamChunk(
+                    delta=msg.get("content", ""),
+                    finish_reason="stop" if done else None,
+                )
 
     async def list_models(self) -> list[ModelInfo]:
         try:
-            async with httpx.AsyncClient() as client:
-                resp = await client.get(f"{self.base_url}/api/tags", timeout=5)
-                resp.raise_for_status()
-                data = resp.json()
+            resp = await self.client.get("/api/tags", timeout=5)
+            resp.raise_for_status()
+            data = resp.json()
         except Exception:
             return []
 
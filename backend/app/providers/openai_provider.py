@@ -14,7 +14,7 @@ class OpenAIProvider(BaseProvider):
     def name(self) -> str:
         return "openai"
 
-    def is_available(self) -> bool:
+    async def is_available(self) -> bool:
         return bool(self._api_key)
 
     def _format_messages(self, messages: list[ChatMessage]) -> list[dict]:
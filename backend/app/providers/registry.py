@@ -5,6 +5,8 @@ from app.providers.base import BaseProvider, ModelInfo
 class ProviderRegistry:
     def __init__(self, config: Settings):
         self._providers: dict[str, BaseProvider] = {}
+        # Per-agent providers (custom key / Ollama URL), reused so their clients are pooled
+        self._ephemeral: dict[tuple[str, str], BaseProvider] = {}
 
         if config.openai_api_key:
             from app.providers.openai_provider import OpenAIProvider
@@ -28,13 +30,13 @@ class ProviderRegistry:
             raise ValueError(f"Provider '{provider_name}' not found. Available: {available}")
         return provider
 
-    def available_providers(self) -> list[str]:
-        return [name for name, p in self._providers.items() if p.is_available()]
+    async def available_providers(self) -> list[str]:
+        return [name for name, p in self._providers.items() if await p.is_available()]
 
     async def all_models(self) -> list[ModelInfo]:
         models = []
         for provider in self._providers.values():
-            if provider.is_available():
+            if await provider.is_available():
                 try:
                     provider_models = await provider.list_models()
                     models.extend(provider_models)
@@ -43,7 +45,13 @@ class ProviderRegistry:
         return models
 
     def create_ephemeral(self, provider_name: str, api_key: str) -> BaseProvider:
-        """Create a one-off provider instance with a custom API key."""
+        """Get a provider instance for a custom API key, creating it on first use."""
+        key = (provider_name, api_key)
+        if key not in self._ephemeral:
+            self._ephemeral[key] = self._build_ephemeral(provider_name, api_key)
+        return self._ephemeral[key]
+
+    def _build_ephemeral(self, provider_name: str, api_key: str) -> BaseProvider:
         if provider_name == "openai":
             from app.providers.openai_provider import OpenAIProvider
             return OpenAIProvider(api_key)
@@ -61,3 +69,18 @@ class ProviderRegistry:
 
     def add_provider(self, name: str, provider: BaseProvider):
         self._providers[name] = provider
+
+    async def replace_provider(self, name: str, provider: BaseProvider):
+        """Swap in a new provider instance and close the one it replaces."""
+        old = self._providers.get(name)
+        self._providers[name] = provider
+        if old is not None and old is not provider:
+            await old.aclose()
+
+    async def aclose(self):
+        for provider in [*self._providers.values(), *self._ephemeral.values()]:
+            try:
+                await provider.aclose()
+            except Exception as e:
+                print(f"Error closing provider '{provider.name}': {e}")
+        self._ephemeral.clear()
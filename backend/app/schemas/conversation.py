@@ -50,3 +50,8 @@ class ConversationOut(BaseModel):
 
 class ConversationDetailOut(ConversationOut):
     messages: list[MessageOut] = []
+
+
+class MessagePage(BaseModel):
+    messages: list[MessageOut]
+    has_more: bool
@@ -13,7 +13,42 @@ class DocumentOut(BaseModel):
     file_type: str
     size: int
     content_hash: str
+    status: str = "ready"
+    chunk_count: int = 0
+    error: str | None = None
+    agent_id: str | None = None
+    channel_id: str | None = None
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+
+class DocumentScopeUpdate(BaseModel):
+    """Owner of a document: an agent or a channel (at most one), or neither for a shared document."""
+    agent_id: str | None = None
+    channel_id: str | None = None
+
+
+class DocumentUploadOut(DocumentOut):
+    job_id: str | None = None  # Ingestion job; None when the file was already in the knowledge base
+
+
+class BulkUploadOut(BaseModel):
+    created: list[DocumentUploadOut]  # New documents, each with its ingestion job
+    duplicates: list[DocumentOut]  # Files whose content is already in the knowledge base
+    skipped: list[dict] = []  # [{"name": "...", "reason": "..."}] for files that were not imported
+
+
+class IngestionJobOut(BaseModel):
+    id: str
+    doc_id: str
+    filename: str
+    status: str
+    stage: str
+    progress: float
+    chunks_done: int
+    page_errors: list[dict] = []  # [{"page": n, "error": "..."}] for PDF pages that could not be read
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
@@ -44,6 +44,7 @@ class WorkflowCreate(WorkflowBase):
 class WorkflowOut(WorkflowBase):
     id: str
     is_active: bool
+    version: int = 1
     agent_id: Optional[str] = None
     channel_id: Optional[str] = None
     created_at: datetime
@@ -55,3 +56,40 @@ class WorkflowOut(WorkflowBase):
 class WorkflowGraph(WorkflowOut):
     nodes: List[NodeOut]
     edges: List[EdgeOut]
+
+class NodeRunOut(BaseModel):
+    node_id: str
+    node_type: str
+    status: str
+    output_json: Optional[str] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+class WorkflowRunOut(BaseModel):
+    id: str
+    workflow_id: str
+    workflow_version: int
+    trigger_node_id: Optional[str] = None
+    status: str
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class WorkflowRunDetail(WorkflowRunOut):
+    trigger_payload_json: Optional[str] = None
+    final_payload_json: Optional[str] = None
+    node_runs: List[NodeRunOut]
+
+class WorkflowRunQueued(BaseModel):
+    run_id: str
+    status: str
+    queue_depth: int  # Runs waiting ahead of (and including) this one
@@ -0,0 +1,184 @@
+"""
+Staging for bulk knowledge-base imports.
+
+A bulk import is a batch of uploaded files, zip/tar archives, or a directory
+under the workspace (data/workspace). Every file is streamed once into a
+temporary ``.part`` file in the upload directory while it is hashed, so the
+whole batch can then be deduplicated with one content_hash query and turned
+into Document rows in one transaction (DocumentService.create_documents).
+Files over the per-file size limit, and everything after the batch's total
+limit is reached, are skipped; archive members count at their decompressed size
+and are never read past the limit, so a zip bomb cannot fill the disk.
+Staging is blocking file I/O; callers run it in a worker thread.
+"""
+import hashlib
+import mimetypes
+import os
+import tarfile
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from typing import BinaryIO, Iterator
+
+WORKSPACE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "workspace")
+STAGE_BLOCK_SIZE = 1024 * 1024
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+# File types taken from archives and workspace directories; anything else is skipped
+IMPORT_SUFFIXES = (".txt", ".md", ".markdown", ".rst", ".pdf")
+
+
+@dataclass
+class StagedFile:
+    filename: str  # Path inside the archive or workspace directory, "/"-separated
+    content_type: str
+    tmp_path: str
+    content_hash: str
+    size: int
+
+
+@dataclass
+class StagedBatch:
+    files: list[StagedFile] = field(default_factory=list)
+    skipped: list[dict] = field(default_factory=list)  # [{"name": ..., "reason": ...}]
+
+    def discard(self):
+        """Remove temporary files that were not moved into place."""
+        for staged in self.files:
+            if os.path.exists(staged.tmp_path):
+                os.remove(staged.tmp_path)
+
+
+def is_archive(name: str) -> bool:
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _importable(name: str) -> str | None:
+    """Why an archive/workspace entry is skipped, or None to import it."""
+    if any(part.startswith(".") or part == "__MACOSX" for part in name.split("/")):
+        return "Hidden file"
+    if not name.lower().endswith(IMPORT_SUFFIXES):
+        return "Unsupported file type"
+    return None
+
+
+def resolve_workspace_path(path: str) -> str:
+    """Absolute path of ``path`` inside the workspace; raises ValueError if it points outside."""
+    root = os.path.realpath(WORKSPACE_DIR)
+    full = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full]) != root:
+        raise ValueError("Path traversal not allowed")
+    if not os.path.exists(full):
+        raise ValueError(f"Workspace path not found: {path}")
+    return full
+
+
+def _iter_archive(stream: BinaryIO, name: str) -> Iterator[tuple[str, BinaryIO, int]]:
+    """(member name, readable stream, declared size) for the regular files of a zip or tar archive."""
+    if name.lower().endswith(".zip"):
+        with zipfile.ZipFile(stream) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    with archive.open(info) as member:
+                        yield info.filename, member, info.file_size
+        return
+    with tarfile.open(fileobj=stream, mode="r:*") as archive:
+        for info in archive:
+            # Links and devices are never followed; members are only read, never extracted
+            if info.isfile():
+                member = archive.extractfile(info)
+                if member is not None:
+                    with member:
+                        yield info.name, member, info.size
+
+
+def _iter_workspace(full_path: str) -> Iterator[tuple[str, BinaryIO]]:
+    if os.path.isfile(full_path):
+        with open(full_path, "rb") as f:
+            yield os.path.basename(full_path), f
+        return
+    for dirpath, dirnames, filenames in os.walk(full_path):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if os.path.islink(path):
+                continue
+            with open(path, "rb") as f:
+                yield os.path.relpath(path, full_path).replace(os.sep, "/"), f
+
+
+class BulkStager:
+    """Stages files into upload_dir, up to max_files and the size limits, recording everything skipped."""
+
+    def __init__(self, upload_dir: str, max_files: int, max_file_bytes: int, max_total_bytes: int):
+        self.upload_dir = upload_dir
+        self.max_files = max_files
+        self.max_file_bytes = max_file_bytes
+        self.max_total_bytes = max_total_bytes
+        self.total_bytes = 0
+        self.batch = StagedBatch()
+        os.makedirs(upload_dir, exist_ok=True)
+
+    def add_upload(self, name: str, content_type: str | None, stream: BinaryIO):
+        """An uploaded file: archives are expanded, other files are taken as they are."""
+        if not is_archive(name):
+            self._stage(name, content_type, stream)
+            return
+        try:
+            for member_name, member, declared_size in _iter_archive(stream, name):
+                self._add_entry(f"{name}/{member_name}", member, declared_size)
+        except (zipfile.BadZipFile, tarfile.TarError) as e:
+            self.batch.skipped.append({"name": name, "reason": f"Unreadable archive: {e}"})
+
+    def add_workspace_path(self, path: str):
+        for entry_name, stream in _iter_workspace(resolve_workspace_path(path)):
+            self._add_entry(entry_name, stream)
+
+    def _add_entry(self, name: str, stream: BinaryIO, declared_size: int = 0):
+        reason = _importable(name)
+        if reason:
+            self.batch.skipped.append({"name": name, "reason": reason})
+            return
+        self._stage(name, None, stream, declared_size)
+
+    def _size_reason(self, size: int) -> str:
+        if size > self.max_file_bytes:
+            return f"Larger than {self.max_file_bytes} bytes"
+        return f"Import exceeds {self.max_total_bytes} bytes in total"
+
+    def _stage(self, name: str, content_type: str | None, stream: BinaryIO, declared_size: int = 0):
+        if len(self.batch.files) >= self.max_files:
+            self.batch.skipped.append({"name": name, "reason": f"More than {self.max_files} files in one import"})
+            return
+        # Declared archive sizes can lie, so the bytes actually read are checked too
+        limit = min(self.max_file_bytes, self.max_total_bytes - self.total_bytes)
+        if declared_size > limit:
+            self.batch.skipped.append({"name": name, "reason": self._size_reason(declared_size)})
+            return
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                # Never read more than one byte past the limit
+                while block := stream.read(min(STAGE_BLOCK_SIZE, limit + 1 - size)):
+                    size += len(block)
+                    if size > limit:
+                        break
+                    hasher.update(block)
+                    f.write(block)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+        if size > limit:
+            os.remove(tmp_path)
+            self.batch.skipped.append({"name": name, "reason": self._size_reason(size)})
+            return
+        self.total_bytes += size
+        self.batch.files.append(StagedFile(
+            filename=name,
+            content_type=content_type or mimetypes.guess_type(name)[0] or "application/octet-stream",
+            tmp_path=tmp_path,
+            content_hash=hasher.hexdigest(),
+            size=size,
+        ))
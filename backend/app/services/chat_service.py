@@ -1,21 +1,30 @@
+import asyncio
 import json
+import time
 from typing import AsyncIterator
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.config import settings
 from app.models.agent import Agent
 from app.models.channel import Channel
 from app.models.channel_agent import ChannelAgent
 from app.providers.base import ChatMessage
 from app.providers.registry import ProviderRegistry
+from app.tools.base import ToolContext, current_tool_context
 from app.tools.registry import ToolRegistry
+from app.services.context_window import ContextWindow
 from app.services.conversation_service import ConversationService
 from app.services.skill_service import SkillService
 from app.services.agent_status import AgentStatusManager, AgentState
 
 
 class ChatService:
+    # Shared across instances so non-parallel-safe tools stay serialized between
+    # concurrent conversations as well as within a single turn.
+    _serial_tool_locks: dict[str, asyncio.Lock] = {}
+
     def __init__(
         self,
         provider_registry: ProviderRegistry,
@@ -24,7 +33,8 @@ class ChatService:
     ):
         self.providers = provider_registry
         self.tools = tool_registry
-        self.conv_service = ConversationService(session)
+        self.conv_service = ConversationService(session, write_behind=True)
+        self.context = ContextWindow(session)
         self.session = session
 
     def _parse_model_string(self, model_string: str) -> tuple[str, str]:
@@ -94,54 +104,67 @@ class ChatService:
         svc = SkillService(self.session)
         return await svc.get_active_instructions()
 
-    def _db_messages_to_chat(self, db_messages, system_prompt: str | None = None) -> list[ChatMessage]:
+    def _history_to_chat(self, history: list[ChatMessage], system_prompt: str | None = None) -> list[ChatMessage]:
         messages = []
         if system_prompt:
             messages.append(ChatMessage(role="system", content=system_prompt))
-
-        for msg in db_messages:
-            tool_calls = None
-            if msg.tool_calls_json:
-                try:
-                    tool_calls = json.loads(msg.tool_calls_json)
-                except json.JSONDecodeError:
-                    pass
-
-            messages.append(ChatMessage(
-                role=msg.role,
-                content=msg.content,
-                tool_calls=tool_calls,
-                tool_call_id=msg.tool_call_id,
-            ))
-
+        messages.extend(history)
         return messages
 
-    async def _execute_tool_calls(self, tool_calls: list[dict]) -> list[ChatMessage]:
-        """Execute tool calls and return tool result messages."""
-        results = []
-        for tc in tool_calls:
-            func = tc.get("function", {})
-            tool_name = func.get("name", "")
-            args_str = func.get("arguments", "{}")
+    async def _run_tool_call(
+        self, tc: dict, semaphore: asyncio.Semaphore, context: ToolContext,
+    ) -> tuple[ChatMessage, float]:
+        """Execute a single tool call under the turn's concurrency cap, as ``context``'s caller.
 
-            try:
-                args = json.loads(args_str) if isinstance(args_str, str) else args_str
-            except json.JSONDecodeError:
-                args = {}
+        Returns the tool result message and the wall time in milliseconds.
+        """
+        func = tc.get("function", {})
+        tool_name = func.get("name", "")
+        args_str = func.get("arguments", "{}")
 
+        try:
+            args = json.loads(args_str) if isinstance(args_str, str) else args_str
+        except json.JSONDecodeError:
+            args = {}
+
+        async with semaphore:
+            started = time.perf_counter()
+            token = current_tool_context.set(context)
             try:
                 tool = self.tools.get(tool_name)
-                result = await tool.execute(**args)
+                if tool.parallel_safe:
+                    result = await asyncio.wait_for(tool.execute(**args), timeout=settings.tool_timeout_seconds)
+                else:
+                    lock = self._serial_tool_locks.setdefault(tool_name, asyncio.Lock())
+                    async with lock:
+                        result = await asyncio.wait_for(tool.execute(**args), timeout=settings.tool_timeout_seconds)
+            except asyncio.TimeoutError:
+                result = f"Tool error: '{tool_name}' timed out after {settings.tool_timeout_seconds:g}s"
             except Exception as e:
                 result = f"Tool error: {str(e)}"
-
-            results.append(ChatMessage(
-                role="tool",
-                content=result,
-                tool_call_id=tc.get("id", ""),
-            ))
-
-        return results
+            finally:
+                current_tool_context.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        return ChatMessage(
+            role="tool",
+            content=result,
+            tool_call_id=tc.get("id", ""),
+            tool_name=tool_name,
+        ), elapsed_ms
+
+    async def _execute_tool_calls(
+        self, tool_calls: list[dict], context: ToolContext | None = None,
+    ) -> list[tuple[ChatMessage, float]]:
+        """Execute tool calls concurrently and return (tool result message, elapsed ms) pairs.
+
+        At most ``settings.tool_max_concurrency`` calls run at once (1 keeps the old
+        sequential behaviour). Results are returned in the original tool call order.
+        ``context`` identifies the calling agent/channel to the tools.
+        """
+        context = context or ToolContext()
+        semaphore = asyncio.Semaphore(max(1, settings.tool_max_concurrency))
+        return list(await asyncio.gather(*(self._run_tool_call(tc, semaphore, context) for tc in tool_calls)))
 
     async def chat(
         self,
@@ -156,7 +179,7 @@ class ChatService:
         provider = self.providers.get(provider_name)
 
         # Ensure conversation exists
-        conv = await self.conv_service.get(conversation_id)
+        conv = await self.conv_service.get(conversation_id, with_messages=False)
         if not conv:
             conv = await self.conv_service.create(model=model_string)
             conversation_id = conv.id
@@ -165,7 +188,7 @@ class ChatService:
         await self.conv_service.add_message(conversation_id, "user", user_message)
 
         # Build message history
-        db_messages = await self.conv_service.get_messages(conversation_id)
+        history = await self.conv_service.get_chat_history(conversation_id)
         
         # If conversation is tied to an agent, apply agent-specific logic
         agent = None
@@ -184,7 +207,10 @@ class ChatService:
             tool_schemas = self.tools.as_provider_format() if self.tools else None
             agent_name = "Assistant"
             
-        messages = self._db_messages_to_chat(db_messages, prompt)
+        history, summary = await self.context.fit(conversation_id, history, provider, provider_name, model_id, prompt)
+        if summary:
+            prompt = (prompt or "") + "\n\n## Earlier Conversation Summary\n" + summary
+        messages = self._history_to_chat(history, prompt)
 
         # Agentic loop
         max_iterations = 10
@@ -212,28 +238,37 @@ class ChatService:
                         tool_name = func.get("name", "")
                         status_manager.set_status(agent_id, AgentState.WORKING, f"Using tool: {tool_name}...")
                     
-                    tool_results = await self._execute_tool_calls(result.tool_calls)
+                    tool_results = await self._execute_tool_calls(
+                        result.tool_calls,
+                        ToolContext(agent_id=agent.id if agent else None, channel_id=conv.channel_id,
+                                    conversation_id=conversation_id),
+                    )
                     status_manager.set_status(agent_id, AgentState.WORKING, "Evaluating tool results...")
                     
-                    for tr in tool_results:
+                    for tr, _elapsed_ms in tool_results:
                         await self.conv_service.add_message(
                             conversation_id, "tool", tr.content,
                             tool_call_id=tr.tool_call_id,
                         )
                         messages.append(tr)
+                    await self.conv_service.checkpoint()
                 else:
                     # Final response
                     await self.conv_service.add_message(
                         conversation_id, "assistant", result.content, agent_name=agent_name
                     )
+                    await self.conv_service.flush()
                     status_manager.set_status(agent_id, AgentState.IDLE)
                     return result.content
 
+            await self.conv_service.flush()
             status_manager.set_status(agent_id, AgentState.IDLE)
             return "Max tool iterations reached."
         except Exception as e:
             status_manager.set_status(agent_id, AgentState.IDLE)
             raise e
+        finally:
+            await self._flush_on_exit(conversation_id)
 
     async def stream_chat(
         self,
@@ -248,7 +283,7 @@ class ChatService:
         provider = self.providers.get(provider_name)
 
         # Ensure conversation exists
-        conv = await self.conv_service.get(conversation_id)
+        conv = await self.conv_service.get(conversation_id, with_messages=False)
         if not conv:
             conv = await self.conv_service.create(model=model_string)
             conversation_id = conv.id
@@ -257,7 +292,7 @@ class ChatService:
         await self.conv_service.add_message(conversation_id, "user", user_message)
 
         # Build message history
-        db_messages = await self.conv_service.get_messages(conversation_id)
+        history = await self.conv_service.get_chat_history(conversation_id)
         
         # If conversation is tied to an agent, apply agent-specific logic
         agent = None
@@ -280,7 +315,10 @@ class ChatService:
         skill_instructions = await self._get_skill_instructions()
         if skill_instructions:
             prompt = (prompt or "") + "\n\n# Available Skills\n" + skill_instructions
-        messages = self._db_messages_to_chat(db_messages, prompt)
+        history, summary = await self.context.fit(conversation_id, history, provider, provider_name, model_id, prompt)
+        if summary:
+            prompt = (prompt or "") + "\n\n## Earlier Conversation Summary\n" + summary
+        messages = self._history_to_chat(history, prompt)
 
         # Agentic loop with streaming
         max_iterations = 10
@@ -300,81 +338,96 @@ class ChatService:
                 agent_id = "assistant" # Last resort
 
 
-        for _ in range(max_iterations):
-            full_response = ""
-            final_tool_calls = None
+        # Flushed in finally: a client disconnect closes this generator with
+        # GeneratorExit/CancelledError, which the except below does not see
+        try:
+            for _ in range(max_iterations):
+                full_response = ""
+                final_tool_calls = None
 
-            status_manager.set_status(agent_id, AgentState.WORKING, f"Generating response...")
-            yield {"type": "agent_turn_start", "agent_name": agent_name}
+                status_manager.set_status(agent_id, AgentState.WORKING, f"Generating response...")
+                yield {"type": "agent_turn_start", "agent_name": agent_name}
 
-            try:
-                async for chunk in provider.stream(messages, model_id, tools=tool_schemas, temperature=temperature):
-                    if chunk.delta:
-                        full_response += chunk.delta
-                        yield {"type": "chunk", "delta": chunk.delta}
+                try:
+                    async for chunk in provider.stream(messages, model_id, tools=tool_schemas, temperature=temperature):
+                        if chunk.delta:
+                            full_response += chunk.delta
+                            yield {"type": "chunk", "delta": chunk.delta}
 
-                    if chunk.tool_calls:
-                        final_tool_calls = chunk.tool_calls
+                        if chunk.tool_calls:
+                            final_tool_calls = chunk.tool_calls
 
-                if final_tool_calls:
-                    # Save assistant message with tool calls
-                    await self.conv_service.add_message(
-                        conversation_id, "assistant", full_response,
-                        agent_name=agent_name,
-                        tool_calls_json=json.dumps(final_tool_calls),
-                    )
-                    messages.append(ChatMessage(
-                        role="assistant", content=full_response, tool_calls=final_tool_calls,
-                    ))
+                    if final_tool_calls:
+                        # Save assistant message with tool calls
+                        await self.conv_service.add_message(
+                            conversation_id, "assistant", full_response,
+                            agent_name=agent_name,
+                            tool_calls_json=json.dumps(final_tool_calls),
+                        )
+                        messages.append(ChatMessage(
+                            role="assistant", content=full_response, tool_calls=final_tool_calls,
+                        ))
 
-                    # Execute tools and stream results
-                    for tc in final_tool_calls:
-                        func = tc.get("function", {})
-                        tool_name = func.get("name", "")
+                        # Execute tools and stream results
+                        for tc in final_tool_calls:
+                            func = tc.get("function", {})
+                            tool_name = func.get("name", "")
 
-                        status_manager.set_status(agent_id, AgentState.WORKING, f"Using tool: {tool_name}...")
-                        yield {
-                            "type": "tool_call",
-                            "tool_name": tool_name,
-                            "tool_args": json.loads(func.get("arguments", "{}")),
-                        }
+                            status_manager.set_status(agent_id, AgentState.WORKING, f"Using tool: {tool_name}...")
+                            yield {
+                                "type": "tool_call",
+                                "tool_name": tool_name,
+                                "tool_call_id": tc.get("id", ""),
+                                "tool_args": json.loads(func.get("arguments", "{}")),
+                            }
 
-                    tool_results = await self._execute_tool_calls(final_tool_calls)
-                    for tr in tool_results:
-                        await self.conv_service.add_message(
-                            conversation_id, "tool", tr.content,
-                            tool_call_id=tr.tool_call_id,
+                        tool_results = await self._execute_tool_calls(
+                            final_tool_calls,
+                            ToolContext(agent_id=agent_id if agent_id != "assistant" else None,
+                                        channel_id=conv.channel_id, conversation_id=conversation_id),
                         )
-                        messages.append(tr)
+                        for tr, elapsed_ms in tool_results:
+                            await self.conv_service.add_message(
+                                conversation_id, "tool", tr.content,
+                                tool_call_id=tr.tool_call_id,
+                            )
+                            messages.append(tr)
+                            yield {
+                                "type": "tool_result",
+                                "tool_name": tr.tool_name,
+                                "tool_call_id": tr.tool_call_id,
+                                "tool_result": tr.content,
+                                "elapsed_ms": round(elapsed_ms, 1),
+                            }
+                        await self.conv_service.checkpoint()
+                    else:
+                        # Final response
+                        msg = await self.conv_service.add_message(
+                            conversation_id, "assistant", full_response, agent_name=agent_name
+                        )
+                        await self.conv_service.flush()  # Assigns msg.id for the events below
+                    
+                        status_manager.set_status(agent_id, AgentState.IDLE)
                         yield {
-                            "type": "tool_result",
-                            "tool_name": "",
-                            "tool_result": tr.content,
+                            "type": "agent_turn_end",
+                            "agent_name": agent_name,
+                            "message_id": msg.id,
                         }
-                else:
-                    # Final response
-                    msg = await self.conv_service.add_message(
-                        conversation_id, "assistant", full_response, agent_name=agent_name
-                    )
-                    
+                        yield {
+                            "type": "done",
+                            "message_id": msg.id,
+                            "conversation_id": conversation_id,
+                        }
+                        return
+                except Exception as e:
                     status_manager.set_status(agent_id, AgentState.IDLE)
-                    yield {
-                        "type": "agent_turn_end",
-                        "agent_name": agent_name,
-                        "message_id": msg.id,
-                    }
-                    yield {
-                        "type": "done",
-                        "message_id": msg.id,
-                        "conversation_id": conversation_id,
-                    }
-                    return
-            except Exception as e:
-                status_manager.set_status(agent_id, AgentState.IDLE)
-                raise e
+                    raise e
 
-        status_manager.set_status(agent_id, AgentState.IDLE)
-        yield {"type": "done", "conversation_id": conversation_id}
+            await self.conv_service.flush()
+            status_manager.set_status(agent_id, AgentState.IDLE)
+            yield {"type": "done", "conversation_id": conversation_id}
+        finally:
+            await self._flush_on_exit(conversation_id)
 
     async def stream_group_chat(
         self,
@@ -385,16 +438,18 @@ class ChatService:
     ) -> AsyncIterator[dict]:
         """Streaming group chat orchestrating active agents."""
         # Ensure conversation exists and is marked as group
-        conv = await self.conv_service.get(conversation_id)
+        conv = await self.conv_service.get(conversation_id, with_messages=False)
         if not conv:
             conv = await self.conv_service.create(title="Group Chat", is_group=True)
             conversation_id = conv.id
 
         # Save user message
         await self.conv_service.add_message(conversation_id, "user", user_message)
+        await self.conv_service.flush()
 
         # Determine which agents to include
         active_agents = []
+        channel = None
         if conv.channel_id:
             channel = await self.session.get(Channel, conv.channel_id)
             if channel:
@@ -425,146 +480,286 @@ class ChatService:
             }
             return
 
-        # Each agent gets exactly ONE top-level turn to reply to the user's message
+        skill_instructions = await self._get_skill_instructions()
+        parallel = bool(channel and channel.parallel_broadcast)
+
+        if parallel:
+            async for event in self._stream_group_parallel(
+                conversation_id, active_agents, skill_instructions, temperature, conv.channel_id
+            ):
+                yield event
+        else:
+            # Each agent gets exactly ONE top-level turn to reply to the user's message
+            for agent in active_agents:
+                provider_name, model_id = self._parse_model_string(agent.model)
+                provider = self.providers.get(provider_name)
+                if not provider:
+                    continue
+
+                # Fetch fresh history (includes whatever previous agents just said!)
+                history = await self.conv_service.get_chat_history(conversation_id)
+                system_prompt = self._build_group_system_prompt(agent, skill_instructions)
+                history, summary = await self.context.fit(
+                    conversation_id, history, provider, provider_name, model_id, system_prompt
+                )
+                agent_msgs = self._build_group_agent_messages(agent, history, system_prompt, summary)
+
+                yield {
+                    "type": "agent_turn_start",
+                    "agent_name": agent.name,
+                    "model": agent.model
+                }
+
+                pending: list[tuple[str, str, dict]] = []
+                try:
+                    async for event in self._group_agent_turn(
+                        agent, provider, model_id, agent_msgs, temperature, pending, conv.channel_id, conversation_id
+                    ):
+                        yield event
+                    msg_record = await self._persist_group_turn(conversation_id, pending)
+                finally:
+                    # Keeps what the turn produced if it fails or the client goes away
+                    await self._flush_on_exit(conversation_id, [pending])
+
+                yield {
+                    "type": "agent_turn_end",
+                    "agent_name": agent.name,
+                    "message_id": msg_record.id if msg_record else None
+                }
+
+        yield {"type": "done", "conversation_id": conversation_id}
+
+    async def _stream_group_parallel(
+        self,
+        conversation_id: str,
+        active_agents: list[Agent],
+        skill_instructions: str,
+        temperature: float,
+        channel_id: str | None = None,
+    ) -> AsyncIterator[dict]:
+        """Parallel broadcast: every agent answers the same history snapshot at once.
+
+        Each agent's turn runs as its own task and buffers its events in a queue.
+        The queues are drained in agent order (ordered fan-in), so the first agent
+        streams live while the others keep generating in the background, and the
+        client still sees one complete turn at a time. Messages are persisted in the
+        same deterministic order once each turn has been drained.
+        """
+        history = await self.conv_service.get_chat_history(conversation_id)
+        status_manager = await AgentStatusManager.get_instance()
+
+        turns: list[tuple[Agent, asyncio.Queue, list[tuple[str, str, dict]], asyncio.Task]] = []
+
+        async def pump(agent, provider, model_id, agent_msgs, queue, pending):
+            try:
+                async for event in self._group_agent_turn(
+                    agent, provider, model_id, agent_msgs, temperature, pending, channel_id, conversation_id
+                ):
+                    await queue.put(event)
+            except Exception as e:
+                await queue.put(e)
+            finally:
+                await queue.put(None)
+
         for agent in active_agents:
             provider_name, model_id = self._parse_model_string(agent.model)
             provider = self.providers.get(provider_name)
             if not provider:
                 continue
-
-            # Fetch fresh history (includes whatever previous agents just said!)
-            db_messages = await self.conv_service.get_messages(conversation_id)
-            
-            agent_msgs = []
-            
-            # 1. System Prompt (Personality + Strict anti-hallucination instruction)
-            agent_prompt = self._build_agent_prompt(agent)
-            multi_agent_instruction = (
-                f"\n\nIMPORTANT: You are in a multi-agent chat room. Your name is {agent.name}. "
-                "Respond ONLY as yourself. Do NOT simulate conversations. "
-                "Do NOT prefix your response with your name like 'Name: '. Just output your response directly."
+            system_prompt = self._build_group_system_prompt(agent, skill_instructions)
+            agent_history, summary = await self.context.fit(
+                conversation_id, history, provider, provider_name, model_id, system_prompt
             )
-            final_prompt = (agent_prompt or "") + multi_agent_instruction
-            # Inject active skill instructions
-            skill_instructions = await self._get_skill_instructions()
-            if skill_instructions:
-                final_prompt += "\n\n# Available Skills\n" + skill_instructions
-            agent_msgs.append(ChatMessage(role="system", content=final_prompt))
-                
-            # 2. Reconstruct history specifically for this agent's viewpoint
-            for msg in db_messages:
-                tool_calls = None
-                if msg.tool_calls_json:
-                    try:
-                        tool_calls = json.loads(msg.tool_calls_json)
-                    except json.JSONDecodeError:
-                        pass
-                
-                if msg.role == "assistant":
-                    if msg.agent_name == agent.name:
-                        # This agent's own past message
-                        agent_msgs.append(ChatMessage(
-                            role="assistant", content=msg.content,
-                            tool_calls=tool_calls, tool_call_id=msg.tool_call_id
-                        ))
-                    else:
-                        # Another agent's message -> treat as user input so it doesn't try to continue the text
-                        sender = msg.agent_name or "Another Agent"
-                        agent_msgs.append(ChatMessage(
-                            role="user", content=f"[{sender}]: {msg.content}"
-                        ))
-                else:
-                    agent_msgs.append(ChatMessage(
-                        role=msg.role, content=msg.content,
-                        tool_calls=tool_calls, tool_call_id=msg.tool_call_id
-                    ))
+            agent_msgs = self._build_group_agent_messages(agent, agent_history, system_prompt, summary)
+            queue: asyncio.Queue = asyncio.Queue()
+            pending: list[tuple[str, str, dict]] = []
+            task = asyncio.create_task(pump(agent, provider, model_id, agent_msgs, queue, pending))
+            turns.append((agent, queue, pending, task))
 
-            # Filter tools for this agent
-            agent_tools = self._filter_tools_for_agent(agent)
+        try:
+            for agent, queue, pending, _task in turns:
+                yield {
+                    "type": "agent_turn_start",
+                    "agent_name": agent.name,
+                    "model": agent.model
+                }
+                while (event := await queue.get()) is not None:
+                    if isinstance(event, Exception):
+                        raise event
+                    yield event
+
+                msg_record = await self._persist_group_turn(conversation_id, pending)
+                yield {
+                    "type": "agent_turn_end",
+                    "agent_name": agent.name,
+                    "message_id": msg_record.id if msg_record else None
+                }
+        finally:
+            # Client went away or a turn failed: stop the agents still generating and
+            # keep what every unsaved turn produced so far, in agent order
+            for agent, _queue, _pending, task in turns:
+                if not task.done():
+                    task.cancel()
+                    status_manager.set_status(agent.id, AgentState.IDLE)
+            await asyncio.gather(*(task for *_, task in turns), return_exceptions=True)
+            await self._flush_on_exit(conversation_id, [pending for _agent, _queue, pending, _task in turns])
+
+    def _build_group_system_prompt(self, agent: Agent, skill_instructions: str) -> str:
+        """An agent's system prompt in a group chat: personality, a strict anti-hallucination instruction and skills."""
+        agent_prompt = self._build_agent_prompt(agent)
+        multi_agent_instruction = (
+            f"\n\nIMPORTANT: You are in a multi-agent chat room. Your name is {agent.name}. "
+            "Respond ONLY as yourself. Do NOT simulate conversations. "
+            "Do NOT prefix your response with your name like 'Name: '. Just output your response directly."
+        )
+        final_prompt = (agent_prompt or "") + multi_agent_instruction
+        # Inject active skill instructions
+        if skill_instructions:
+            final_prompt += "\n\n# Available Skills\n" + skill_instructions
+        return final_prompt
+
+    def _build_group_agent_messages(
+        self, agent: Agent, history: list[ChatMessage], system_prompt: str, summary: str | None = None
+    ) -> list[ChatMessage]:
+        """Reconstruct the group history from one agent's point of view."""
+        agent_msgs = []
+
+        # 1. System Prompt (from _build_group_system_prompt, plus the summary of dropped history)
+        if summary:
+            system_prompt += "\n\n## Earlier Conversation Summary\n" + summary
+        agent_msgs.append(ChatMessage(role="system", content=system_prompt))
+
+        # 2. Reconstruct history specifically for this agent's viewpoint
+        for msg in history:
+            if msg.role == "assistant" and msg.agent_name != agent.name:
+                # Another agent's message -> treat as user input so it doesn't try to continue the text
+                sender = msg.agent_name or "Another Agent"
+                agent_msgs.append(ChatMessage(
+                    role="user", content=f"[{sender}]: {msg.content}"
+                ))
+            else:
+                # User/tool messages and this agent's own past messages
+                agent_msgs.append(msg)
 
-            yield {
-                "type": "agent_turn_start",
-                "agent_name": agent.name,
-                "model": agent.model
-            }
+        return agent_msgs
 
-            msg_record = None
-            
-            status_manager = await AgentStatusManager.get_instance()
-            agent_id = agent.id if agent else "assistant"
-            
-            # Agentic tool loop (allow the agent to use tools and observe results during its turn)
-            for _ in range(5):  # Max 5 tool iterations per agent turn
-                full_response = ""
-                final_tool_calls = None
-                
-                status_manager.set_status(agent_id, AgentState.WORKING, "Generating response...")
+    async def _group_agent_turn(
+        self,
+        agent: Agent,
+        provider,
+        model_id: str,
+        agent_msgs: list[ChatMessage],
+        temperature: float,
+        pending: list[tuple[str, str, dict]],
+        channel_id: str | None = None,
+        conversation_id: str | None = None,
+    ) -> AsyncIterator[dict]:
+        """Run one agent's agentic turn in a group chat and yield its stream events.
 
+        Messages to persist are appended to ``pending`` as (role, content, kwargs)
+        instead of being written directly, so this never touches the DB session and
+        can run concurrently with other agents' turns.
+        """
+        # Filter tools for this agent
+        agent_tools = self._filter_tools_for_agent(agent)
 
-                try:
-                    async for chunk in provider.stream(agent_msgs, model_id, tools=agent_tools, temperature=temperature):
-                        if chunk.delta:
-                            full_response += chunk.delta
-                            yield {
-                                "type": "chunk", 
-                                "delta": chunk.delta,
-                                "agent_name": agent.name
-                            }
-                        
-                        if chunk.tool_calls:
-                            final_tool_calls = chunk.tool_calls
+        status_manager = await AgentStatusManager.get_instance()
+        agent_id = agent.id if agent else "assistant"
 
-                    if final_tool_calls:
-                        msg_record = await self.conv_service.add_message(
-                            conversation_id, "assistant", full_response,
-                            agent_name=agent.name,
-                            tool_calls_json=json.dumps(final_tool_calls),
-                        )
-                        agent_msgs.append(ChatMessage(
-                            role="assistant", content=full_response, tool_calls=final_tool_calls
-                        ))
-                        
-                        # Execute tools and stream results
-                        for tc in final_tool_calls:
-                            tool_name = tc.get("function", {}).get("name")
-                            status_manager.set_status(agent.id, AgentState.WORKING, f"Using tool: {tool_name}...")
-                            yield {
-                                "type": "tool_call",
-                                "tool_name": tool_name,
-                                "tool_args": tc.get("function", {}).get("arguments", {}),
-                            }
-                        
-                        tool_results = await self._execute_tool_calls(final_tool_calls)
-                        status_manager.set_status(agent.id, AgentState.WORKING, "Evaluating tool results...")
-                        for tr in tool_results:
-                            await self.conv_service.add_message(
-                                conversation_id, "tool", tr.content, tool_call_id=tr.tool_call_id
-                            )
-                            agent_msgs.append(tr)
-                            yield {
-                                "type": "tool_result",
-                                "tool_name": tr.tool_name,
-                                "tool_result": tr.content,
-                            }
-                    else:
-                        msg_record = await self.conv_service.add_message(
-                            conversation_id, "assistant", full_response, agent_name=agent.name
-                        )
-                        status_manager.set_status(agent_id, AgentState.IDLE)
-                        break # Finished turn
-                except Exception as e:
-                    status_manager.set_status(agent_id, AgentState.IDLE)
-                    raise e
-            
-            status_manager.set_status(agent_id, AgentState.IDLE)
+        # Agentic tool loop (allow the agent to use tools and observe results during its turn)
+        for _ in range(5):  # Max 5 tool iterations per agent turn
+            full_response = ""
+            final_tool_calls = None
 
-            yield {
-                "type": "agent_turn_end",
-                "agent_name": agent.name,
-                "message_id": msg_record.id if msg_record else None
-            }
+            status_manager.set_status(agent_id, AgentState.WORKING, "Generating response...")
 
-        yield {"type": "done", "conversation_id": conversation_id}
+            try:
+                async for chunk in provider.stream(agent_msgs, model_id, tools=agent_tools, temperature=temperature):
+                    if chunk.delta:
+                        full_response += chunk.delta
+                        yield {
+                            "type": "chunk",
+                            "delta": chunk.delta,
+                            "agent_name": agent.name
+                        }
+
+                    if chunk.tool_calls:
+                        final_tool_calls = chunk.tool_calls
+
+                if final_tool_calls:
+                    pending.append(("assistant", full_response, {
+                        "agent_name": agent.name,
+                        "tool_calls_json": json.dumps(final_tool_calls),
+                    }))
+                    agent_msgs.append(ChatMessage(
+                        role="assistant", content=full_response, tool_calls=final_tool_calls
+                    ))
+
+                    # Execute tools and stream results
+                    for tc in final_tool_calls:
+                        tool_name = tc.get("function", {}).get("name")
+                        status_manager.set_status(agent.id, AgentState.WORKING, f"Using tool: {tool_name}...")
+                        yield {
+                            "type": "tool_call",
+                            "tool_name": tool_name,
+                            "tool_call_id": tc.get("id", ""),
+                            "tool_args": tc.get("function", {}).get("arguments", {}),
+                            "agent_name": agent.name,
+                        }
+
+                    tool_results = await self._execute_tool_calls(
+                        final_tool_calls,
+                        ToolContext(agent_id=agent.id, channel_id=channel_id, conversation_id=conversation_id),
+                    )
+                    status_manager.set_status(agent.id, AgentState.WORKING, "Evaluating tool results...")
+                    for tr, elapsed_ms in tool_results:
+                        pending.append(("tool", tr.content, {"tool_call_id": tr.tool_call_id}))
+                        agent_msgs.append(tr)
+                        yield {
+                            "type": "tool_result",
+                            "tool_name": tr.tool_name,
+                            "tool_call_id": tr.tool_call_id,
+                            "tool_result": tr.content,
+                            "elapsed_ms": round(elapsed_ms, 1),
+                            "agent_name": agent.name,
+                        }
+                else:
+                    pending.append(("assistant", full_response, {"agent_name": agent.name}))
+                    break  # Finished turn
+            except Exception as e:
+                status_manager.set_status(agent_id, AgentState.IDLE)
+                raise e
+
+        status_manager.set_status(agent_id, AgentState.IDLE)
+
+    async def _persist_group_turn(self, conversation_id: str, pending: list[tuple[str, str, dict]]):
+        """Write a finished group turn's messages in one commit and return the last assistant message."""
+        msg_record = None
+        for role, content, kwargs in pending:
+            msg = await self.conv_service.add_message(conversation_id, role, content, **kwargs)
+            if role == "assistant":
+                msg_record = msg
+        pending.clear()
+        await self.conv_service.flush()
+        return msg_record
+
+    async def _flush_on_exit(self, conversation_id: str, pending_turns: list[list[tuple[str, str, dict]]] = ()):
+        """Commit whatever a turn has buffered when it ends, however it ends.
+
+        Called from finally blocks, so tool calls and results held back by the
+        write-behind policy (and unsaved group-turn messages) are committed even
+        when the turn fails or the client disconnects mid-turn. Only a process
+        crash can lose them. Errors are logged rather than raised so they do not
+        replace the exception that ended the turn.
+        """
+        try:
+            for pending in pending_turns:
+                for role, content, kwargs in pending:
+                    await self.conv_service.add_message(conversation_id, role, content, **kwargs)
+                pending.clear()
+            await self.conv_service.flush()
+        except Exception as e:
+            print(f"Error saving messages of an interrupted turn: {e}")
 
     # ──────────────────────────────────────────────────────────────────
     # Agent Delegation
@@ -0,0 +1,236 @@
+"""
+Streaming, structure-aware chunker for knowledge-base ingestion.
+
+Text arrives as a stream of (page_number, text) pieces, e.g. one per PDF page or
+one per line of a text file, so a large file is never held as a single string.
+Pieces are split into paragraphs (text without blank lines is cut every few
+chunks' worth of characters, so it is not buffered whole), and paragraphs are packed into chunks of at
+most ``max_tokens`` tokens. A chunk never crosses a heading, long paragraphs are
+split at sentence boundaries (then at word boundaries, then inside over-long
+words), and a short overlap of whole sentences from the previous chunk carries
+context across splits.
+"""
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+_MARKDOWN_HEADING_RE = re.compile(r"^#{1,6}\s+\S")
+# Bullet list items and table rows, which are never headings
+_NOT_HEADING_RE = re.compile(r"^(?:[-*+•]\s|\|)")
+# Paragraph buffer cap, in characters per chunk token: about four chunks of English prose.
+# Text without blank lines (logs, CSV) is flushed at this size instead of piling up.
+PARAGRAPH_BUFFER_CHARS_PER_TOKEN = 24
+
+
+def paragraph_buffer_chars(max_tokens: int) -> int:
+    """Characters chunk_stream buffers before cutting a paragraph without blank lines."""
+    return max_tokens * PARAGRAPH_BUFFER_CHARS_PER_TOKEN
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (words and punctuation), close to word-piece counts for English."""
+    return len(_TOKEN_RE.findall(text))
+
+
+def is_heading(paragraph: str, standalone: bool = True) -> bool:
+    """Markdown headings, or a short capitalised line with no closing punctuation ("Results").
+
+    Without a markdown marker the line must be ``standalone``: a paragraph of its
+    own between blank lines, not one line of a list or table.
+    """
+    if _MARKDOWN_HEADING_RE.match(paragraph):
+        return True
+    if not standalone or len(paragraph) > 80 or _NOT_HEADING_RE.match(paragraph):
+        return False
+    words = paragraph.split()
+    return 0 < len(words) <= 10 and paragraph[-1] not in ".!?,;:" and paragraph[0].isupper()
+
+
+@dataclass
+class Chunk:
+    text: str
+    token_count: int
+    page_start: int | None = None
+    page_end: int | None = None
+    heading: str | None = None
+
+    def metadata(self) -> dict:
+        """Chroma metadata (which cannot hold None values)."""
+        meta = {"token_count": self.token_count}
+        if self.page_start is not None:
+            meta["page_start"] = self.page_start
+            meta["page_end"] = self.page_end
+        if self.heading:
+            meta["heading"] = self.heading
+        return meta
+
+
+def iter_paragraphs(
+    pieces: Iterable[tuple[int | None, str]],
+    max_chars: int | None = None,
+) -> Iterator[tuple[int | None, str, bool]]:
+    """Regroup streamed text into (page, paragraph, standalone), standalone meaning a single line.
+
+    Page breaks also end a paragraph, and so does buffering more than ``max_chars``
+    characters: the paragraph is then yielded in parts, none of them standalone.
+    """
+    buffer: list[str] = []
+    buffer_chars = 0
+    buffer_page = None
+    continued = False  # The buffer continues a paragraph that was cut at max_chars
+
+    def flush(cut: bool = False):
+        nonlocal buffer_chars, continued
+        text = " ".join(" ".join(buffer).split())
+        standalone = len(buffer) == 1 and not continued and not cut
+        buffer.clear()
+        buffer_chars = 0
+        continued = cut
+        return text, standalone
+
+    for page, text in pieces:
+        if page != buffer_page and buffer:
+            paragraph, standalone = flush()
+            if paragraph:
+                yield buffer_page, paragraph, standalone
+        buffer_page = page
+        for line in text.split("\n"):
+            line = line.strip()
+            if line and not _MARKDOWN_HEADING_RE.match(line):
+                buffer.append(line)
+                buffer_chars += len(line) + 1
+                if max_chars and buffer_chars > max_chars:
+                    paragraph, _ = flush(cut=True)
+                    yield page, paragraph, False
+                continue
+            # Blank lines close the paragraph; markdown headings are paragraphs of their own
+            paragraph, standalone = flush()
+            if paragraph:
+                yield page, paragraph, standalone
+            if line:
+                yield page, line, True
+    if buffer:
+        paragraph, standalone = flush()
+        if paragraph:
+            yield buffer_page, paragraph, standalone
+
+
+def _split_tokens(word: str, max_tokens: int) -> list[str]:
+    """Cut a word with no spaces (a URL, a run of symbols) into pieces of at most max_tokens tokens."""
+    starts = [m.start() for m in _TOKEN_RE.finditer(word)]
+    return [
+        word[starts[i]:starts[i + max_tokens] if i + max_tokens < len(starts) else len(word)]
+        for i in range(0, len(starts), max_tokens)
+    ]
+
+
+def _split_long(text: str, max_tokens: int) -> list[str]:
+    """Split an over-long paragraph into sentence groups, falling back to word windows and then to token runs."""
+    pieces: list[str] = []
+    for sentence in _SENTENCE_SPLIT_RE.split(text):
+        if count_tokens(sentence) <= max_tokens:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        current: list[str] = []
+        current_tokens = 0
+        for word in words:
+            word_tokens = count_tokens(word)
+            if word_tokens > max_tokens:
+                if current:
+                    pieces.append(" ".join(current))
+                    current, current_tokens = [], 0
+                pieces.extend(_split_tokens(word, max_tokens))
+                continue
+            if current and current_tokens + word_tokens > max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(word)
+            current_tokens += word_tokens
+        if current:
+            pieces.append(" ".join(current))
+    return pieces
+
+
+def chunk_stream(
+    pieces: Iterable[tuple[int | None, str]],
+    max_tokens: int = 200,
+    overlap_tokens: int = 32,
+) -> Iterator[Chunk]:
+    """Yield Chunks from a stream of (page_number, text) pieces."""
+    # (paragraph_no, page, text, tokens); segments of one paragraph share paragraph_no
+    parts: list[tuple[int, int | None, str, int]] = []
+    tokens = 0
+    heading: str | None = None
+    heading_only = False  # parts holds nothing but heading(s)
+
+    def emit() -> Chunk:
+        pages = [p for _, p, _, _ in parts if p is not None]
+        paragraphs: list[list[str]] = []
+        last_no = None
+        for no, _, text, _ in parts:
+            if no != last_no:
+                paragraphs.append([])
+                last_no = no
+            paragraphs[-1].append(text)
+        return Chunk(
+            text="\n\n".join(" ".join(p) for p in paragraphs),
+            token_count=tokens,
+            page_start=min(pages) if pages else None,
+            page_end=max(pages) if pages else None,
+            heading=heading,
+        )
+
+    def overlap_tail() -> list[tuple[int, int | None, str, int]]:
+        """Trailing whole sentences of the current chunk, up to overlap_tokens."""
+        if overlap_tokens <= 0 or not parts:
+            return []
+        no, page, text, part_tokens = parts[-1]
+        tail: list[str] = []
+        tail_tokens = 0
+        for sentence in reversed(_SENTENCE_SPLIT_RE.split(text)):
+            sentence_tokens = count_tokens(sentence)
+            if tail_tokens + sentence_tokens > overlap_tokens:
+                break
+            tail.insert(0, sentence)
+            tail_tokens += sentence_tokens
+        if not tail:
+            return []
+        return [(no, page, " ".join(tail), tail_tokens)]
+
+    for no, (page, paragraph, standalone) in enumerate(iter_paragraphs(pieces, paragraph_buffer_chars(max_tokens))):
+        paragraph_tokens = count_tokens(paragraph)
+        # A "heading" too long for one chunk is split like any other text
+        if paragraph_tokens <= max_tokens and is_heading(paragraph, standalone):
+            # A heading directly under another one (e.g. "# Guide" / "## Setup") is kept with it
+            if heading_only and len(parts) == 1 and tokens + paragraph_tokens <= max_tokens:
+                parts.append((no, page, paragraph, paragraph_tokens))
+                tokens += paragraph_tokens
+            else:
+                if parts:
+                    yield emit()
+                parts = [(no, page, paragraph, paragraph_tokens)]
+                tokens = paragraph_tokens
+            heading = paragraph.lstrip("#").strip()
+            heading_only = True
+            continue
+
+        heading_only = False
+
+        segments = [paragraph] if paragraph_tokens <= max_tokens else _split_long(paragraph, max_tokens)
+        for segment in segments:
+            segment_tokens = paragraph_tokens if len(segments) == 1 else count_tokens(segment)
+            if parts and tokens + segment_tokens > max_tokens:
+                chunk = emit()
+                parts = overlap_tail()
+                tokens = sum(t for _, _, _, t in parts)
+                yield chunk
+                if tokens + segment_tokens > max_tokens:
+                    parts, tokens = [], 0
+            parts.append((no, page, segment, segment_tokens))
+            tokens += segment_tokens
+
+    if parts:
+        yield emit()
@@ -0,0 +1,291 @@
+import json
+import math
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Callable
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.conversation import Conversation
+from app.models.model_config import ModelConfig
+from app.providers.base import BaseProvider, ChatMessage
+from app.services.history_cache import history_cache
+
+# Per-message framing overhead (role markers etc.), roughly what OpenAI documents
+MESSAGE_OVERHEAD_TOKENS = 4
+# Used when neither ModelConfig nor the provider knows the model
+DEFAULT_CONTEXT_WINDOW = 8192
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a long conversation between a user and AI agents. "
+    "Merge the existing summary with the new messages into one concise summary. Keep facts, "
+    "decisions, names, numbers, open tasks and tool findings; drop pleasantries. "
+    "Write in third person and output only the summary."
+)
+
+# (tokenizer name, encode function returning a token count)
+Tokenizer = tuple[str, Callable[[str], int]]
+
+# Context windows reported by providers (list_models is a network call); ModelConfig is always read fresh
+_provider_window_cache: dict[str, int] = {}
+
+
+@lru_cache(maxsize=None)
+def tokenizer_for(provider_name: str) -> Tokenizer:
+    """Return (tokenizer_name, encode_fn). tiktoken is optional; fall back to ~4 chars/token."""
+    if provider_name == "openai":
+        try:
+            import tiktoken
+            enc = tiktoken.get_encoding("o200k_base")
+            return "tiktoken", lambda text: len(enc.encode(text, disallowed_special=()))
+        except Exception:
+            pass
+    return "approx", lambda text: len(text) // 4 + 1
+
+
+def count_message_tokens(msg: ChatMessage, tokenizer: Tokenizer) -> int:
+    """Token count of a message, memoised on the message per tokenizer."""
+    name, encode = tokenizer
+    cached = msg.token_counts.get(name)
+    if cached is not None:
+        return cached
+    tokens = MESSAGE_OVERHEAD_TOKENS + encode(msg.content or "")
+    if msg.tool_calls:
+        tokens += encode(json.dumps(msg.tool_calls))
+    msg.token_counts[name] = tokens
+    return tokens
+
+
+class ContextWindow:
+    """
+    Assembles the history sent to a provider so it fits the model's context window.
+
+    Keeps the most recent whole turns (a user message and everything after it) that
+    fit the token budget. When a turn is too large on its own, it falls back to
+    tool-call blocks. Everything older is folded into a rolling summary, stored on
+    the conversation (keyed by the id of the last message it covers, and copied
+    into the history cache) so it is only extended when more turns drop out of
+    the window, across restarts and cache evictions. One turn summarises at most
+    settings.context_summary_max_messages newly dropped messages; an older
+    backlog (e.g. the first time a long conversation overflows) is omitted.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def resolve_window(self, provider: BaseProvider, provider_name: str, model_id: str) -> int:
+        """Context window for a model: ModelConfig first, then the provider's ModelInfo.
+
+        ModelConfig is read on every call (a primary-key lookup), so edits apply on
+        the next turn; only the provider's answer is cached.
+        """
+        window = await self.session.scalar(
+            select(ModelConfig.context_window).where(
+                ModelConfig.provider == provider_name, ModelConfig.id == model_id
+            )
+        )
+        if window:
+            return window
+
+        key = f"{provider_name}/{model_id}"
+        if key in _provider_window_cache:
+            return _provider_window_cache[key]
+        try:
+            for info in await provider.list_models():
+                if info.id == model_id:
+                    window = info.context_window
+                    break
+        except Exception:
+            pass
+
+        window = window or DEFAULT_CONTEXT_WINDOW
+        _provider_window_cache[key] = window
+        return window
+
+    async def budget_for(self, provider: BaseProvider, provider_name: str, model_id: str) -> int:
+        budget = int(await self.resolve_window(provider, provider_name, model_id) * settings.context_window_ratio)
+        if settings.context_max_tokens:
+            budget = min(budget, settings.context_max_tokens)
+        return budget
+
+    def _history_tokens(self, conversation_id: str, history: list[ChatMessage], tokenizer: Tokenizer) -> int:
+        """Tokens in history, counting only messages added since the last call.
+
+        The running total for the cached part of the history is kept on its history
+        cache entry; messages past it (not yet stored) are counted each time.
+        """
+        name = tokenizer[0]
+        entry = history_cache.peek(conversation_id)
+        shared = min(len(entry.messages), len(history)) if entry is not None else 0
+        if shared and history[shared - 1] is not entry.messages[shared - 1]:
+            # Not the cached history (e.g. rebuilt since): count from scratch, keep no total
+            entry, shared = None, 0
+        counted, total = entry.token_totals.get(name, (0, 0)) if entry is not None else (0, 0)
+        if counted > shared:
+            counted, total = 0, 0
+        total += sum(count_message_tokens(m, tokenizer) for m in history[counted:shared])
+        if entry is not None:
+            entry.token_totals[name] = (shared, total)
+        return total + sum(count_message_tokens(m, tokenizer) for m in history[shared:])
+
+    def _select_start(self, history: list[ChatMessage], tokenizer: Tokenizer, budget: int) -> int:
+        """Index of the oldest message to keep so that history[start:] fits in budget.
+
+        Prefers whole turns. When even the newest turn does not fit, returns the
+        oldest of its tool-call blocks that fits, with room reserved for the turn's
+        user message, which fit() puts back in front. An assistant message with tool
+        calls and the tool results after it form one block, so tool results are
+        never orphaned. Walks back from the newest message and stops at the budget.
+        """
+        turn_start = next((i for i in range(len(history) - 1, -1, -1) if history[i].role == "user"), None)
+        reserve = count_message_tokens(history[turn_start], tokenizer) if turn_start is not None else 0
+        used = 0
+        best_turn = None
+        best_block = None
+        newest_block = None
+        for start in range(len(history) - 1, -1, -1):
+            used += count_message_tokens(history[start], tokenizer)
+            if history[start].role == "tool" and start > 0:
+                continue  # Inside a block
+            if newest_block is None:
+                newest_block = start
+            if used > budget:
+                break
+            if history[start].role == "user":
+                best_turn = start
+            elif best_turn is None and used + reserve <= budget:
+                best_block = start
+
+        if best_turn is not None:
+            return best_turn
+        if best_block is not None:
+            return best_block
+        # Even the newest block is over budget; send it anyway rather than nothing
+        return newest_block if newest_block is not None else 0
+
+    async def fit(
+        self,
+        conversation_id: str,
+        history: list[ChatMessage],
+        provider: BaseProvider,
+        provider_name: str,
+        model_id: str,
+        system_prompt: str | None = None,
+    ) -> tuple[list[ChatMessage], str | None]:
+        """Return (history to send, summary of the dropped part or None)."""
+        tokenizer = tokenizer_for(provider_name)
+        budget = await self.budget_for(provider, provider_name, model_id)
+        if system_prompt:
+            budget -= count_message_tokens(ChatMessage(role="system", content=system_prompt), tokenizer)
+
+        if self._history_tokens(conversation_id, history, tokenizer) <= budget:
+            return history, None
+
+        # Leave room for the summary itself
+        summary_budget = min(1024, max(64, budget // 8))
+        start = self._select_start(history, tokenizer, budget - summary_budget)
+
+        upto_id, summary = await self._load_summary(conversation_id)
+        # Position after the last summarised message: ids ascend, unsaved messages come last
+        upto = bisect_right(
+            history, upto_id, key=lambda m: m.message_id if m.message_id is not None else math.inf
+        ) if summary is not None else 0
+        if summary is not None and upto > start:
+            # An earlier (tighter) window already summarised past this point
+            start = upto
+        if start > upto:
+            dropped = history[upto:start]
+            omitted = max(0, len(dropped) - max(1, settings.context_summary_max_messages))
+            summary = await self._extend_summary(
+                summary, dropped[omitted:], provider, provider_name, model_id, summary_budget, tokenizer, omitted
+            )
+            last_id = history[start - 1].message_id
+            if last_id is not None:
+                await self._save_summary(conversation_id, last_id, summary)
+
+        kept = history[start:]
+        if start < len(history) and history[start].role != "user":
+            # Cut inside a turn: providers (Anthropic) require history to open with a
+            # user message, so repeat the turn's question in front of its last blocks
+            turn_start = next((i for i in range(start - 1, -1, -1) if history[i].role == "user"), None)
+            if turn_start is not None:
+                kept = [history[turn_start]] + kept
+        return kept, summary
+
+    async def _load_summary(self, conversation_id: str) -> tuple[int, str | None]:
+        """(id of the last summarised message, rolling summary), from the history cache or the conversation."""
+        cached = history_cache.get_summary(conversation_id)
+        if cached is not None:
+            return cached
+        row = (await self.session.execute(
+            select(Conversation.context_summary_upto, Conversation.context_summary)
+            .where(Conversation.id == conversation_id)
+        )).one_or_none()
+        upto_id, summary = (row[0] or 0, row[1]) if row else (0, None)
+        history_cache.set_summary(conversation_id, upto_id, summary)
+        return upto_id, summary
+
+    async def _save_summary(self, conversation_id: str, upto_id: int, summary: str):
+        history_cache.set_summary(conversation_id, upto_id, summary)
+        # updated_at is kept: a summary is not activity that should reorder conversation lists
+        await self.session.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(context_summary=summary, context_summary_upto=upto_id, updated_at=Conversation.updated_at)
+        )
+        await self.session.commit()
+
+    async def _extend_summary(
+        self,
+        summary: str | None,
+        dropped: list[ChatMessage],
+        provider: BaseProvider,
+        provider_name: str,
+        model_id: str,
+        summary_budget: int,
+        tokenizer: Tokenizer,
+        omitted: int = 0,
+    ) -> str:
+        """Fold newly dropped messages into the rolling summary, a window-sized batch at a time.
+
+        ``omitted`` older dropped messages are skipped; the summary only notes that they existed.
+        """
+        budget = await self.budget_for(provider, provider_name, model_id)
+        batch: list[str] = [f"[{omitted} older messages omitted]"] if omitted else []
+        batch_tokens = 0
+
+        async def flush(current: str | None) -> str | None:
+            if not batch:
+                return current
+            transcript = "\n".join(batch)
+            prompt = f"Existing summary:\n{current or '(none)'}\n\nNew messages:\n{transcript}"
+            try:
+                result = await provider.complete(
+                    [
+                        ChatMessage(role="system", content=SUMMARY_PROMPT),
+                        ChatMessage(role="user", content=prompt),
+                    ],
+                    model_id,
+                    temperature=0.2,
+                )
+                return result.content.strip() or current
+            except Exception as e:
+                print(f"Context summary error: {e}")
+                return current
+
+        for msg in dropped:
+            if msg.role == "tool":
+                line = f"[tool result]: {msg.content[:2000]}"
+            else:
+                line = f"[{msg.agent_name or msg.role}]: {msg.content}"
+            line_tokens = count_message_tokens(msg, tokenizer)
+            if batch and batch_tokens + line_tokens > budget - summary_budget:
+                summary = await flush(summary)
+                batch, batch_tokens = [], 0
+            batch.append(line)
+            batch_tokens += line_tokens
+        summary = await flush(summary)
+
+        return summary or f"({len(dropped) + omitted} earlier messages omitted.)"
@@ -1,13 +1,47 @@
+import json
+import time
+
 from sqlalchemy import select, desc
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.models.conversation import Conversation, Message
+from app.config import settings
+from app.models.conversation import Conversation, Message, utcnow
+from app.providers.base import ChatMessage
+from app.services.history_cache import history_cache
+
+
+def message_to_chat(msg: Message) -> ChatMessage:
+    """Decode a stored Message row into a ChatMessage."""
+    tool_calls = None
+    if msg.tool_calls_json:
+        try:
+            tool_calls = json.loads(msg.tool_calls_json)
+        except json.JSONDecodeError:
+            pass
+    return ChatMessage(
+        role=msg.role,
+        content=msg.content,
+        tool_calls=tool_calls,
+        tool_call_id=msg.tool_call_id,
+        agent_name=msg.agent_name,
+        message_id=msg.id,
+    )
 
 
 class ConversationService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, write_behind: bool = False):
+        """
+        With ``write_behind=True`` (used by ChatService) add_message buffers messages
+        in memory and they are committed together by checkpoint()/flush(), according
+        to ``settings.message_flush_policy``. A crash loses at most the messages
+        produced since the last flush: the current tool round with the "tool"
+        policy, or the current turn with "turn".
+        """
         self.session = session
+        self.write_behind = write_behind and settings.message_flush_policy != "immediate"
+        self._pending: list[Message] = []
+        self._pending_since: float | None = None
 
     async def create(
         self, title: str = "New Conversation", model: str = "gemini/gemini-2.5-flash", system_prompt: str | None = None, is_group: bool = False, agent_id: str | None = None, channel_id: str | None = None
@@ -18,12 +52,10 @@ class ConversationService:
         await self.session.refresh(conv)
         return conv
 
-    async def get(self, conversation_id: str) -> Conversation | None:
-        stmt = (
-            select(Conversation)
-            .where(Conversation.id == conversation_id)
-            .options(selectinload(Conversation.messages))
-        )
+    async def get(self, conversation_id: str, with_messages: bool = True) -> Conversation | None:
+        stmt = select(Conversation).where(Conversation.id == conversation_id)
+        if with_messages:
+            stmt = stmt.options(selectinload(Conversation.messages))
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
@@ -49,6 +81,7 @@ class ConversationService:
                 setattr(conv, key, value)
         await self.session.commit()
         await self.session.refresh(conv)
+        history_cache.invalidate(conversation_id)
         return conv
 
     async def delete(self, conversation_id: str) -> bool:
@@ -57,6 +90,7 @@ class ConversationService:
             return False
         await self.session.delete(conv)
         await self.session.commit()
+        history_cache.invalidate(conversation_id)
         return True
 
     async def add_message(
@@ -75,13 +109,40 @@ class ConversationService:
             agent_name=agent_name,
             tool_calls_json=tool_calls_json,
             tool_call_id=tool_call_id,
+            created_at=utcnow(),
         )
+        if self.write_behind:
+            # Buffered: msg.id is assigned by the next flush()
+            self._pending.append(msg)
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+            elif time.monotonic() - self._pending_since >= settings.message_flush_interval_seconds:
+                await self.flush()
+            return msg
+
         self.session.add(msg)
         await self.session.commit()
         await self.session.refresh(msg)
+        history_cache.append(conversation_id, msg.id, message_to_chat(msg))
         return msg
 
+    async def checkpoint(self):
+        """Tool-round boundary: flush buffered messages unless the policy waits for turn end."""
+        if settings.message_flush_policy == "tool":
+            await self.flush()
+
+    async def flush(self):
+        """Commit all buffered messages in a single transaction and assign their ids."""
+        if not self._pending:
+            return
+        pending, self._pending, self._pending_since = self._pending, [], None
+        self.session.add_all(pending)
+        await self.session.commit()
+        for msg in pending:
+            history_cache.append(msg.conversation_id, msg.id, message_to_chat(msg))
+
     async def get_messages(self, conversation_id: str) -> list[Message]:
+        await self.flush()
         stmt = (
             select(Message)
             .where(Message.conversation_id == conversation_id)
@@ -89,3 +150,62 @@ class ConversationService:
         )
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
+
+    async def list_messages(
+        self,
+        conversation_id: str,
+        before_id: int | None = None,
+        after_id: int | None = None,
+        limit: int = 50,
+    ) -> tuple[list[Message], bool]:
+        """Keyset-paginate a conversation's messages by primary key.
+
+        With no cursor (or ``before_id``) returns the newest ``limit`` messages older than
+        the cursor; with only ``after_id`` returns the oldest ``limit`` messages newer than
+        it. Messages are always returned in chronological order. The flag tells whether
+        more messages exist beyond the page in the direction being paged.
+        """
+        await self.flush()
+        stmt = select(Message).where(Message.conversation_id == conversation_id)
+        if before_id is not None:
+            stmt = stmt.where(Message.id < before_id)
+        if after_id is not None:
+            stmt = stmt.where(Message.id > after_id)
+
+        forward = after_id is not None and before_id is None
+        stmt = stmt.order_by(Message.id if forward else desc(Message.id)).limit(limit + 1)
+        result = await self.session.execute(stmt)
+        rows = list(result.scalars().all())
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if not forward:
+            rows.reverse()
+        return rows, has_more
+
+    async def get_chat_history(self, conversation_id: str) -> list[ChatMessage]:
+        """Return the decoded history of a conversation, reading only new rows.
+
+        Served from the process-wide history cache; on a hit only messages with an id
+        above the cached high-water mark are fetched (normally none, since
+        add_message appends to the cache). Returns a fresh list the caller may extend.
+        """
+        await self.flush()
+        entry = history_cache.get(conversation_id)
+        if entry is None:
+            rows = await self.get_messages(conversation_id)
+            entry = history_cache.put(
+                conversation_id,
+                [message_to_chat(m) for m in rows],
+                max((m.id for m in rows), default=0),
+            )
+        else:
+            stmt = (
+                select(Message)
+                .where(Message.conversation_id == conversation_id, Message.id > entry.last_id)
+                .order_by(Message.id)
+            )
+            result = await self.session.execute(stmt)
+            for m in result.scalars().all():
+                history_cache.append(conversation_id, m.id, message_to_chat(m))
+        return list(entry.messages)
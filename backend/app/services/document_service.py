@@ -1,30 +1,48 @@
+import asyncio
 import os
 import hashlib
+import tempfile
+import unicodedata
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from fastapi import UploadFile
-import chromadb
-from chromadb.utils import embedding_functions
+import numpy as np
 
-from app.models.document import Document
-import PyPDF2
+from app.config import settings
+from app.models.document import Document, DocumentStatus, EmbeddingCacheEntry
+from app.services.bulk_import import StagedBatch
+from app.services.knowledge_engine import KnowledgeEngine, document_scope
+
+UPLOAD_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "uploads")
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+# Hashes per embedding-cache lookup; keeps each IN (...) well under SQLite's bound-parameter limit
+CACHE_LOOKUP_BATCH_SIZE = 500
+
+
+def chunk_hash(chunk: str) -> str:
+    """Content address of a chunk: sha256 of its NFC-normalised, whitespace-collapsed text."""
+    normalised = " ".join(unicodedata.normalize("NFC", chunk).split())
+    return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+
+def stored_file_path(upload_dir: str, doc_id: str, filename: str) -> str:
+    """Where an uploaded document's file is kept (bulk imports have "/" in their filenames)."""
+    return os.path.join(upload_dir, f"{doc_id}_{filename.replace('/', '_')}")
+
+
+def _insert_ignoring_duplicates(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(EmbeddingCacheEntry).on_conflict_do_nothing()
 
-CHROMA_DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "chroma")
 
 class DocumentService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, engine: KnowledgeEngine):
         self.session = session
-        os.makedirs(CHROMA_DB_DIR, exist_ok=True)
-        # Initialize ChromaDB client (local persistent)
-        self.chroma_client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
-        # Use sentence-transformers default embedding
-        self.embedding_fn = embedding_functions.DefaultEmbeddingFunction()
-        # Get or create collection
-        self.collection = self.chroma_client.get_or_create_collection(
-            name="knowledge_base",
-            embedding_function=self.embedding_fn
-        )
+        self.engine = engine
 
     async def list_documents(self) -> List[Document]:
         stmt = select(Document).order_by(Document.created_at.desc())
@@ -41,115 +59,206 @@ class DocumentService:
         if not doc:
             return False
         
-        # Remove from vector DB
+        # Remove its chunks from the vector DB and the lexical index
         try:
-            self.collection.delete(where={"doc_id": doc_id})
+            await asyncio.to_thread(self.engine.delete, where={"doc_id": doc_id})
         except Exception as e:
             print(f"Error deleting from ChromaDB: {e}")
 
+        file_path = stored_file_path(UPLOAD_DIR, doc.id, doc.filename)
         await self.session.delete(doc)
         await self.session.commit()
+
+        # The upload kept for ingestion (and its resume after a restart) is no longer needed
+        try:
+            await asyncio.to_thread(os.remove, file_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error deleting uploaded file {file_path}: {e}")
         return True
 
-    def _extract_text(self, file_path: str, content_type: str) -> str:
-        text = ""
-        if "pdf" in content_type.lower() or file_path.endswith(".pdf"):
-            try:
-                with open(file_path, "rb") as f:
-                    reader = PyPDF2.PdfReader(f)
-                    for page in reader.pages:
-                        extracted = page.extract_text()
-                        if extracted:
-                            text += extracted + "\n"
-            except Exception as e:
-                print(f"PDF extraction error: {e}")
-        else:
-            # Assume text
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    text = f.read()
-            except Exception as e:
-                print(f"Text extraction error: {e}")
-        return text
-
-    def _chunk_text(self, text: str, chunk_size: int = 1000, overlap: int = 200) -> List[str]:
-        chunks = []
-        start = 0
-        text_len = len(text)
-        while start < text_len:
-            end = start + chunk_size
-            chunks.append(text[start:end])
-            start += chunk_size - overlap
-        return chunks
-
-    async def upload_document(self, file: UploadFile, upload_dir: str) -> Document:
-        content = await file.read()
-        content_hash = hashlib.sha256(content).hexdigest()
-        
-        # Check if already exists based on hash to prevent duplicates
-        stmt = select(Document).where(Document.content_hash == content_hash)
-        result = await self.session.execute(stmt)
-        existing_doc = result.scalar_one_or_none()
-        
-        if existing_doc:
-            return existing_doc
+    async def set_document_scope(
+        self, doc_id: str, agent_id: Optional[str] = None, channel_id: Optional[str] = None,
+    ) -> Optional[Document]:
+        """Make a document private to an agent or a channel, or shared (both None)."""
+        doc = await self.get_document(doc_id)
+        if not doc:
+            return None
+        await asyncio.to_thread(self.engine.set_document_scope, doc_id, document_scope(agent_id, channel_id))
+        doc.agent_id = agent_id
+        doc.channel_id = channel_id
+        await self.session.commit()
+        await self.session.refresh(doc)
+        return doc
 
-        doc_id = f"doc_{content_hash[:12]}"
-        
-        # Save file to disk
+    async def upload_document(
+        self,
+        file: UploadFile,
+        upload_dir: str,
+        agent_id: Optional[str] = None,
+        channel_id: Optional[str] = None,
+    ) -> tuple[Document, str | None]:
+        """Store the file and create its Document in the "pending" state.
+
+        Returns (document, file_path). file_path is None when an identical file was
+        already uploaded (it keeps its existing scope); otherwise the caller queues
+        it for ingestion. agent_id/channel_id make the document private to them.
+        """
+        # Stream to a temporary file in upload_dir, hashing as we go, so memory use
+        # does not grow with the file size
         os.makedirs(upload_dir, exist_ok=True)
-        file_path = os.path.join(upload_dir, f"{doc_id}_{file.filename}")
-        with open(file_path, "wb") as f:
-            f.write(content)
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=upload_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while block := await file.read(UPLOAD_BLOCK_SIZE):
+                    hasher.update(block)
+                    size += len(block)
+                    await asyncio.to_thread(f.write, block)
+            content_hash = hasher.hexdigest()
 
-        # Create DB record
+            # Check if already exists based on hash to prevent duplicates
+            stmt = select(Document).where(Document.content_hash == content_hash)
+            result = await self.session.execute(stmt)
+            existing_doc = result.scalar_one_or_none()
+
+            if existing_doc:
+                return existing_doc, None
+
+            doc_id = f"doc_{content_hash[:12]}"
+            file_path = stored_file_path(upload_dir, doc_id, file.filename)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # Create DB record; text extraction and embedding happen in the ingestion queue
         doc = Document(
             id=doc_id,
             filename=file.filename,
             file_type=file.content_type or "application/octet-stream",
-            size=len(content),
+            size=size,
             content_hash=content_hash,
+            status=DocumentStatus.PENDING,
+            agent_id=agent_id,
+            channel_id=channel_id,
         )
         self.session.add(doc)
         await self.session.commit()
         await self.session.refresh(doc)
-        
-        # Extract text and ingest to Vector DB
-        text = self._extract_text(file_path, str(file.content_type))
-        if text.strip():
-            chunks = self._chunk_text(text)
-            if chunks:
-                ids = [f"{doc_id}_chunk_{i}" for i in range(len(chunks))]
-                metadatas = [{"doc_id": doc_id, "filename": file.filename, "chunk_index": i} for i in range(len(chunks))]
-                
-                # Add to ChromaDB
-                self.collection.add(
-                    documents=chunks,
-                    metadatas=metadatas,
-                    ids=ids
-                )
-        
-        return doc
+        return doc, file_path
+
+    async def create_documents(
+        self,
+        batch: StagedBatch,
+        upload_dir: str,
+        agent_id: Optional[str] = None,
+        channel_id: Optional[str] = None,
+    ) -> tuple[list[tuple[Document, str]], list[Document]]:
+        """Turn a staged bulk import into "pending" Documents.
 
-    def search_documents(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
-        """Search the vector database for relevant chunks."""
+        Duplicates (of stored documents or within the batch) are found with one
+        content_hash query and all new rows are inserted in one transaction.
+        Returns ([(document, file_path)] to queue for ingestion, [existing duplicates]).
+        """
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
+            hashes = {staged.content_hash for staged in batch.files}
+            by_hash: Dict[str, Document] = {}
+            if hashes:
+                result = await self.session.execute(select(Document).where(Document.content_hash.in_(hashes)))
+                by_hash = {doc.content_hash: doc for doc in result.scalars().all()}
+
+            created: list[tuple[Document, str]] = []
+            duplicates: list[Document] = []
+            moves: list[tuple[str, str]] = []
+            for staged in batch.files:
+                if staged.content_hash in by_hash:
+                    duplicates.append(by_hash[staged.content_hash])
+                    continue
+                doc = Document(
+                    id=f"doc_{staged.content_hash[:12]}",
+                    filename=staged.filename,
+                    file_type=staged.content_type,
+                    size=staged.size,
+                    content_hash=staged.content_hash,
+                    status=DocumentStatus.PENDING,
+                    agent_id=agent_id,
+                    channel_id=channel_id,
+                )
+                by_hash[staged.content_hash] = doc
+                file_path = stored_file_path(upload_dir, doc.id, staged.filename)
+                moves.append((staged.tmp_path, file_path))
+                created.append((doc, file_path))
+
+            if created:
+                self.session.add_all([doc for doc, _ in created])
+                await self.session.commit()
+                for tmp_path, file_path in moves:
+                    os.replace(tmp_path, file_path)
+                # Load server defaults (created_at) for all new rows in one query
+                await self.session.execute(
+                    select(Document)
+                    .where(Document.id.in_([doc.id for doc, _ in created]))
+                    .execution_options(populate_existing=True)
+                )
+            return created, duplicates
+        finally:
+            batch.discard()
+
+    async def embed_chunks(self, chunks: List[str]) -> np.ndarray:
+        """Embed chunks as a (len(chunks), dim) float32 array, reusing cached vectors.
+
+        Vectors are looked up by chunk_hash in the persistent embedding cache, in
+        slices of CACHE_LOOKUP_BATCH_SIZE hashes, so identical chunks in other
+        documents or re-uploads are never embedded again.
+        Misses are embedded in batches of settings.embedding_batch_size and cached.
+        """
+        if not chunks:
+            return np.zeros((0, 0), dtype=np.float32)
+        model = self.engine.model_name
+        hashes = [chunk_hash(c) for c in chunks]
+
+        vectors: Dict[str, np.ndarray] = {}
+        distinct = list(dict.fromkeys(hashes))
+        for start in range(0, len(distinct), CACHE_LOOKUP_BATCH_SIZE):
+            result = await self.session.execute(
+                select(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.vector).where(
+                    EmbeddingCacheEntry.model == model,
+                    EmbeddingCacheEntry.text_hash.in_(distinct[start:start + CACHE_LOOKUP_BATCH_SIZE]),
+                )
             )
-            
-            structured_results = []
-            if results["documents"] and len(results["documents"]) > 0:
-                docs = results["documents"][0]
-                metadatas = results["metadatas"][0] if results["metadatas"] else [{}] * len(docs)
-                
-                for i in range(len(docs)):
-                    structured_results.append({
-                        "content": docs[i],
-                        "metadata": metadatas[i]
-                    })
-            return structured_results
+            for text_hash, blob in result.all():
+                vectors[text_hash] = np.frombuffer(blob, dtype=np.float32)
+
+        # One entry per distinct uncached chunk
+        missing = {h: c for h, c in zip(hashes, chunks) if h not in vectors}
+        self.engine.record_cache_lookup(hits=len(hashes) - len(missing), misses=len(missing))
+        if missing:
+            missing_hashes = list(missing)
+            batch_size = max(1, settings.embedding_batch_size)
+            rows = []
+            for start in range(0, len(missing_hashes), batch_size):
+                batch = missing_hashes[start:start + batch_size]
+                embedded = await asyncio.to_thread(self.engine.embed, [missing[h] for h in batch])
+                for h, vector in zip(batch, embedded):
+                    vectors[h] = vector
+                    rows.append({"model": model, "text_hash": h, "dim": len(vector), "vector": vector.tobytes()})
+            stmt = _insert_ignoring_duplicates(self.session.bind.dialect.name)
+            await self.session.execute(stmt, rows)
+            await self.session.commit()
+
+        return np.stack([vectors[h] for h in hashes])
+
+    async def search_documents(
+        self, query: str, n_results: int = 3, mode: str = "hybrid", scopes: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search the knowledge base for relevant chunks (see KnowledgeEngine.search for modes and scopes)."""
+        try:
+            return await asyncio.to_thread(self.engine.search, query, n_results, mode, scopes)
+        except ValueError:
+            raise
         except Exception as e:
             print(f"Search error: {e}")
             return []
@@ -0,0 +1,128 @@
+"""
+Text extraction for knowledge-base ingestion.
+
+PDF pages are extracted in parallel in the ingestion process pool, a few pages
+per task, with a bounded number of tasks in flight. Results are yielded in page
+order as (page_number, text) as soon as they are ready, so the chunker can start
+before the whole document is parsed and memory stays bounded by the window, not
+the file. A page that fails to extract is recorded as a PageError and skipped.
+Text files are read in blocks and yielded line by line, with long lines cut to
+max_line_chars; together with the chunker's paragraph cap this keeps peak
+memory flat for text with no blank lines or no newlines at all.
+"""
+import codecs
+import os
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+import PyPDF2
+
+# Pages extracted per process-pool task
+PAGES_PER_TASK = 8
+# Bytes read from a text file at a time; also the default longest line yielded in one piece
+TEXT_BLOCK_SIZE = 64 * 1024
+
+
+@dataclass
+class PageError:
+    page: int
+    error: str
+
+    def as_dict(self) -> dict:
+        return {"page": self.page, "error": self.error}
+
+
+def is_pdf(file_path: str, content_type: str) -> bool:
+    return "pdf" in content_type.lower() or file_path.lower().endswith(".pdf")
+
+
+def pdf_page_count(file_path: str) -> int:
+    with open(file_path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_pdf_pages(file_path: str, first: int, last: int) -> list[tuple[int, str, str | None]]:
+    """Extract pages first..last (1-based, inclusive) as (page, text, error). Runs in a worker process."""
+    results = []
+    with open(file_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        for page_number in range(first, last + 1):
+            try:
+                results.append((page_number, reader.pages[page_number - 1].extract_text() or "", None))
+            except Exception as e:
+                results.append((page_number, "", f"{type(e).__name__}: {e}"))
+    return results
+
+
+def iter_pdf_text(
+    file_path: str,
+    pool: Executor,
+    max_in_flight: int,
+    on_progress: Callable[[int, int], None],
+    page_errors: list[PageError],
+) -> Iterator[tuple[int, str]]:
+    total = pool.submit(pdf_page_count, file_path).result()
+    ranges = deque((first, min(first + PAGES_PER_TASK - 1, total)) for first in range(1, total + 1, PAGES_PER_TASK))
+    in_flight = deque()
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < max_in_flight:
+                first, last = ranges.popleft()
+                in_flight.append(pool.submit(extract_pdf_pages, file_path, first, last))
+            for page_number, text, error in in_flight.popleft().result():
+                if error:
+                    page_errors.append(PageError(page_number, error))
+                elif text.strip():
+                    yield page_number, text
+                on_progress(page_number, total)
+    finally:
+        for future in in_flight:
+            future.cancel()
+
+
+def iter_plain_text(
+    file_path: str,
+    on_progress: Callable[[int, int], None],
+    max_line_chars: int = TEXT_BLOCK_SIZE,
+) -> Iterator[tuple[None, str]]:
+    """Stream a text file's lines, reading fixed-size blocks.
+
+    Lines longer than max_line_chars characters are yielded in pieces (cut at a
+    space where there is one), so a file without newlines never has to fit in memory.
+    """
+    total = os.path.getsize(file_path)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    done = 0
+    with open(file_path, "rb") as f:
+        while block := f.read(TEXT_BLOCK_SIZE):
+            done += len(block)
+            *lines, pending = (pending + decoder.decode(block)).split("\n")
+            for line in lines:
+                yield None, line.rstrip("\r")
+            while len(pending) > max_line_chars:
+                cut = pending.rfind(" ", 0, max_line_chars) + 1 or max_line_chars
+                yield None, pending[:cut]
+                pending = pending[cut:]
+            on_progress(done, total)
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield None, pending.rstrip("\r")
+    on_progress(total, total)
+
+
+def iter_document_text(
+    file_path: str,
+    content_type: str,
+    pool: Executor,
+    max_in_flight: int,
+    on_progress: Callable[[int, int], None],
+    page_errors: list[PageError],
+    max_line_chars: int = TEXT_BLOCK_SIZE,
+) -> Iterator[tuple[int | None, str]]:
+    """Stream a file's text as (page_number, text): PDF pages in order, or text lines of at most max_line_chars."""
+    if is_pdf(file_path, content_type):
+        return iter_pdf_text(file_path, pool, max_in_flight, on_progress, page_errors)
+    return iter_plain_text(file_path, on_progress, max_line_chars)
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from app.config import settings
+from app.providers.base import ChatMessage
+
+
+@dataclass
+class CachedHistory:
+    messages: list[ChatMessage] = field(default_factory=list)
+    last_id: int = 0  # Highest Message.id already decoded into `messages`
+    summary: str | None = None  # Copy of the conversation's persisted rolling summary (see ContextWindow)
+    summary_upto: int | None = None  # Message.id the summary covers up to; None until loaded
+    # Running token totals by tokenizer name: (messages counted from the start, their tokens)
+    token_totals: dict[str, tuple[int, int]] = field(default_factory=dict)
+
+
+class HistoryCache:
+    """
+    Process-wide, bounded LRU cache of decoded conversation histories.
+
+    Holds the ChatMessage list for the most recently used conversations so a chat
+    turn only has to read (and json-decode) the rows added since the last turn.
+    ConversationService keeps it in sync: add_message appends, update/delete
+    invalidate.
+    """
+
+    def __init__(self, max_conversations: int = 256):
+        self.max_conversations = max_conversations
+        self._entries: OrderedDict[str, CachedHistory] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conversation_id: str) -> CachedHistory | None:
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(conversation_id)
+        self.hits += 1
+        return entry
+
+    def peek(self, conversation_id: str) -> CachedHistory | None:
+        """The cached entry, without touching LRU order or hit statistics."""
+        return self._entries.get(conversation_id)
+
+    def put(self, conversation_id: str, messages: list[ChatMessage], last_id: int) -> CachedHistory:
+        entry = CachedHistory(messages=messages, last_id=last_id)
+        self._entries[conversation_id] = entry
+        self._entries.move_to_end(conversation_id)
+        while len(self._entries) > self.max_conversations:
+            self._entries.popitem(last=False)
+        return entry
+
+    def append(self, conversation_id: str, message_id: int, message: ChatMessage):
+        """Append a newly written message to a cached history, if one is cached."""
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+        if message_id <= entry.last_id:
+            # Concurrent writers committed out of order; rebuild on next read
+            self.invalidate(conversation_id)
+            return
+        entry.messages.append(message)
+        entry.last_id = message_id
+
+    def get_summary(self, conversation_id: str) -> tuple[int, str | None] | None:
+        """(summary_upto, summary), or None when not cached (read the conversation row instead)."""
+        entry = self._entries.get(conversation_id)
+        if entry is None or entry.summary_upto is None:
+            return None
+        return entry.summary_upto, entry.summary
+
+    def set_summary(self, conversation_id: str, upto: int, summary: str | None):
+        entry = self._entries.get(conversation_id)
+        if entry is not None:
+            entry.summary_upto = upto
+            entry.summary = summary
+
+    def invalidate(self, conversation_id: str):
+        self._entries.pop(conversation_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "conversations": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+history_cache = HistoryCache(max_conversations=settings.history_cache_conversations)
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.db.engine import async_session
+from app.models.document import Document, DocumentStatus
+from app.services.chunker import chunk_stream, paragraph_buffer_chars
+from app.services.document_service import UPLOAD_DIR, DocumentService, stored_file_path
+from app.services.extraction import PageError, iter_document_text
+from app.services.knowledge_engine import GLOBAL_SCOPE, KnowledgeEngine, document_scope
+
+# Finished jobs kept for /api/knowledge/jobs
+MAX_FINISHED_JOBS = 200
+
+
+@dataclass
+class IngestionJob:
+    doc_id: str
+    filename: str
+    file_path: str
+    content_type: str
+    scope: str = GLOBAL_SCOPE  # Stored on every chunk (see knowledge_engine.document_scope)
+    id: str = field(default_factory=lambda: f"job_{uuid.uuid4().hex[:12]}")
+    status: str = DocumentStatus.PENDING
+    stage: str = "queued"  # queued, indexing (extract -> chunk -> embed, pipelined), done
+    units_total: int = 0  # Pages for PDFs, bytes for text files
+    units_done: int = 0
+    chunks_done: int = 0
+    page_errors: list[PageError] = field(default_factory=list)
+    error: str | None = None
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: datetime | None = None
+
+    @property
+    def progress(self) -> float:
+        if self.status == DocumentStatus.READY:
+            return 1.0
+        if not self.units_total:
+            return 0.0
+        return round(min(self.units_done / self.units_total, 1.0), 3)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "doc_id": self.doc_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "chunks_done": self.chunks_done,
+            "page_errors": [e.as_dict() for e in self.page_errors],
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class IngestionQueue:
+    """
+    Background document ingestion, off the request path.
+
+    Uploads are queued as IngestionJobs and picked up by a fixed number of worker
+    tasks. Each job is a pipeline: PDF pages are extracted in parallel in a
+    process pool (PyPDF2 is pure Python and CPU-bound), a thread chunks the pages
+    as they arrive, and batches of chunks are embedded and written to Chroma
+    through the shared KnowledgeEngine. Bounded queues between the stages keep
+    memory flat however large the file is. Job updates are kept in memory and
+    pushed to WebSocket subscribers.
+    """
+
+    def __init__(self, engine: KnowledgeEngine, concurrency: int | None = None, processes: int | None = None):
+        self.engine = engine
+        self.concurrency = max(1, concurrency or settings.ingestion_concurrency)
+        self.processes = max(1, processes or settings.ingestion_processes or min(4, os.cpu_count() or 1))
+        self.jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+        self.subscribers: list[asyncio.Queue] = []
+        self._queue: asyncio.Queue[IngestionJob] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._pool: ProcessPoolExecutor | None = None
+
+    async def start(self):
+        # Not fork: this process already runs threads (Chroma, ONNX, to_thread), and a
+        # forked child can inherit one of their locks held and deadlock on it
+        self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+        await self._resume_unfinished()
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def submit(self, doc: Document, file_path: str) -> IngestionJob:
+        job = IngestionJob(
+            doc_id=doc.id,
+            filename=doc.filename,
+            file_path=file_path,
+            content_type=doc.file_type,
+            scope=document_scope(doc.agent_id, doc.channel_id),
+        )
+        self.jobs[job.id] = job
+        self._trim_finished()
+        self._queue.put_nowait(job)
+        self._broadcast(job)
+        return job
+
+    def get(self, job_id: str) -> IngestionJob | None:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self) -> list[IngestionJob]:
+        return list(reversed(self.jobs.values()))
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self.subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self.subscribers:
+            self.subscribers.remove(queue)
+
+    def _broadcast(self, job: IngestionJob):
+        message = json.dumps({"type": "ingestion_job_update", "job": job.as_dict()})
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(message)
+            except Exception as e:
+                print(f"Error broadcasting ingestion update: {e}")
+
+    def _trim_finished(self):
+        finished = [j.id for j in self.jobs.values() if j.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    async def _resume_unfinished(self):
+        """Re-queue documents left pending/processing by a previous run."""
+        async with async_session() as session:
+            result = await session.execute(
+                select(Document).where(Document.status.in_([DocumentStatus.PENDING, DocumentStatus.PROCESSING]))
+            )
+            for doc in result.scalars().all():
+                file_path = stored_file_path(UPLOAD_DIR, doc.id, doc.filename)
+                if os.path.exists(file_path):
+                    self.submit(doc, file_path)
+                else:
+                    doc.status = DocumentStatus.FAILED
+                    doc.error = "Uploaded file is missing; upload it again."
+            await session.commit()
+
+    async def _set_document_state(self, job: IngestionJob) -> bool:
+        """Mirror the job's state onto its Document. Returns False if the document was deleted."""
+        async with async_session() as session:
+            doc = await session.get(Document, job.doc_id)
+            if doc is None:
+                return False
+            doc.status = job.status
+            doc.chunk_count = job.chunks_done
+            doc.error = job.error
+            if job.page_errors and not job.error:
+                pages = ", ".join(str(e.page) for e in job.page_errors[:20])
+                doc.error = f"Text could not be extracted from {len(job.page_errors)} page(s): {pages}"
+            await session.commit()
+            return True
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._ingest(job)
+            except Exception as e:
+                job.status = DocumentStatus.FAILED
+                job.error = str(e)
+                # A failure here must not end the worker, or later jobs would never be picked up
+                try:
+                    await self._set_document_state(job)
+                except Exception as state_error:
+                    print(f"Error recording failure of ingestion job {job.id}: {state_error}")
+            finally:
+                if job.finished_at is None:
+                    job.finished_at = datetime.now(timezone.utc)
+                self._broadcast(job)
+                self._queue.task_done()
+
+    async def _ingest(self, job: IngestionJob):
+        job.status = DocumentStatus.PROCESSING
+        job.stage = "indexing"
+        if not await self._set_document_state(job):
+            job.status, job.error = DocumentStatus.FAILED, "Document was deleted"
+            return
+        self._broadcast(job)
+
+        # Re-ingesting (e.g. after a restart mid-job) must not leave stale chunks behind
+        await asyncio.to_thread(self.engine.delete, {"doc_id": job.doc_id})
+
+        loop = asyncio.get_running_loop()
+        batch_size = max(1, settings.embedding_batch_size)
+        batches: asyncio.Queue = asyncio.Queue(maxsize=2)
+        stop = threading.Event()
+
+        def on_progress(done: int, total: int):
+            job.units_done, job.units_total = done, total
+
+        def produce():
+            """Extract and chunk in this thread, handing batches of chunks to the event loop."""
+            try:
+                pieces = iter_document_text(
+                    job.file_path, job.content_type, self._pool, self.processes * 2, on_progress, job.page_errors,
+                    paragraph_buffer_chars(settings.chunk_max_tokens),
+                )
+                batch = []
+                for chunk in chunk_stream(pieces, settings.chunk_max_tokens, settings.chunk_overlap_tokens):
+                    if stop.is_set():
+                        return
+                    batch.append(chunk)
+                    if len(batch) >= batch_size:
+                        asyncio.run_coroutine_threadsafe(batches.put(batch), loop).result()
+                        batch = []
+                if batch and not stop.is_set():
+                    asyncio.run_coroutine_threadsafe(batches.put(batch), loop).result()
+            finally:
+                asyncio.run_coroutine_threadsafe(batches.put(None), loop).result()
+
+        producer = asyncio.create_task(asyncio.to_thread(produce))
+        try:
+            async with async_session() as session:
+                service = DocumentService(session, self.engine)
+                while (batch := await batches.get()) is not None:
+                    start = job.chunks_done
+                    texts = [c.text for c in batch]
+                    ids = [f"{job.doc_id}_chunk_{i}" for i in range(start, start + len(batch))]
+                    metadatas = [
+                        {
+                            "doc_id": job.doc_id, "filename": job.filename, "scope": job.scope,
+                            "chunk_index": i, **chunk.metadata(),
+                        }
+                        for i, chunk in enumerate(batch, start=start)
+                    ]
+                    embeddings = await service.embed_chunks(texts)
+                    await asyncio.to_thread(self.engine.add, ids, texts, metadatas, embeddings)
+                    job.chunks_done += len(batch)
+                    self._broadcast(job)
+        except BaseException:
+            # Unblock and finish the producer before propagating
+            stop.set()
+            while not producer.done():
+                while not batches.empty():
+                    batches.get_nowait()
+                await asyncio.sleep(0.05)
+            raise
+        await producer  # Re-raises extraction errors (e.g. an unreadable PDF)
+
+        if job.page_errors and not job.chunks_done:
+            job.status = DocumentStatus.FAILED
+            job.error = f"No text could be extracted ({len(job.page_errors)} page(s) failed)"
+            job.stage = "done"
+            await self._set_document_state(job)
+            return
+
+        job.status = DocumentStatus.READY
+        job.stage = "done"
+        job.finished_at = datetime.now(timezone.utc)
+        if not await self._set_document_state(job):
+            # Deleted while we were embedding; drop what we wrote
+            await asyncio.to_thread(self.engine.delete, {"doc_id": job.doc_id})
+            job.status, job.error = DocumentStatus.FAILED, "Document was deleted"
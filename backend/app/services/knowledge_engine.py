@@ -0,0 +1,368 @@
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import chromadb
+import numpy as np
+from chromadb.utils import embedding_functions
+
+from app.config import settings
+from app.services.lexical_index import LexicalIndex
+from app.services.reranker import Reranker
+
+CHROMA_DB_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "chroma")
+COLLECTION_NAME = "knowledge_base"
+
+SEARCH_MODES = ("hybrid", "vector", "keyword")
+# Reciprocal rank fusion constant (Cormack et al.); damps the weight of top ranks
+RRF_K = 60
+
+# Every chunk carries a "scope" metadata value: shared with everyone, or private
+# to one agent or one channel. Searches filter on the caller's scopes.
+GLOBAL_SCOPE = "global"
+
+
+def document_scope(agent_id: str | None = None, channel_id: str | None = None) -> str:
+    """Scope value stored on the chunks of a document owned by an agent, a channel, or nobody."""
+    if agent_id:
+        return f"agent:{agent_id}"
+    if channel_id:
+        return f"channel:{channel_id}"
+    return GLOBAL_SCOPE
+
+
+def caller_scopes(agent_id: str | None = None, channel_id: str | None = None) -> list[str]:
+    """Scopes visible to a caller: global documents plus its agent's and channel's own."""
+    scopes = [GLOBAL_SCOPE]
+    if agent_id:
+        scopes.append(document_scope(agent_id=agent_id))
+    if channel_id:
+        scopes.append(document_scope(channel_id=channel_id))
+    return scopes
+
+
+@dataclass
+class LatencyStats:
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_ms: float = 0.0
+
+    def record(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.last_ms = elapsed_ms
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_ms": round(self.last_ms, 2),
+        }
+
+
+def normalise_query(query: str) -> str:
+    """Cache key form of a query: case, spacing and trailing punctuation do not matter.
+
+    Queries are also searched in this form, so a cached vector or result set is
+    exactly what a fresh search for any query with the same key would produce.
+    """
+    return " ".join(query.lower().split()).rstrip("?.!")
+
+
+class QueryCache:
+    """Thread-safe LRU cache whose entries expire after ttl_seconds, with hit counters."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class KnowledgeEngine:
+    """
+    Process-wide knowledge-base engine: one Chroma client, collection and embedding model.
+
+    Created once in the FastAPI lifespan (app.state.knowledge_engine) and shared by
+    DocumentService and KnowledgeBaseTool, so the embedding model is loaded once
+    instead of on every search. Embeddings are computed here (not inside Chroma) so
+    their latency can be measured separately from the vector query.
+
+    Chunks are also kept in a BM25 LexicalIndex, so search() can match exact
+    identifiers and names that dense retrieval misses, and fuse both rankings.
+
+    Repeated searches (agents in a group chat often ask the same thing) are served
+    from two LRU+TTL caches: query embeddings, and result sets tagged with the
+    collection generation. Every add/delete bumps the generation, so cached
+    results never outlive a document change.
+
+    With settings.kb_rerank, search() over-fetches kb_rerank_candidates chunks and
+    returns the best n by cross-encoder score (see Reranker).
+
+    Chunks are tagged with a scope (see document_scope); search(scopes=...) only
+    looks at those scopes, as a Chroma ``where`` filter and an FTS5 column filter.
+    """
+
+    def __init__(self, persist_dir: str = CHROMA_DB_DIR):
+        os.makedirs(persist_dir, exist_ok=True)
+        self.chroma_client = chromadb.PersistentClient(path=persist_dir)
+        self.embedding_fn = embedding_functions.DefaultEmbeddingFunction()
+        self.collection = self.chroma_client.get_or_create_collection(
+            name=COLLECTION_NAME,
+            embedding_function=self.embedding_fn,
+        )
+        self.lexical = LexicalIndex(os.path.join(persist_dir, "lexical.db"))
+        self.embedding_stats = LatencyStats()
+        self.query_stats = LatencyStats()
+        self.lexical_stats = LatencyStats()
+        self.rerank_stats = LatencyStats()
+        self.reranker = Reranker()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.generation = 0
+        self.query_embedding_cache = QueryCache(settings.kb_query_cache_size, settings.kb_query_cache_ttl_seconds)
+        self.result_cache = QueryCache(settings.kb_query_cache_size, settings.kb_query_cache_ttl_seconds)
+        self.warmup_ms: float | None = None
+
+    @property
+    def model_name(self) -> str:
+        """Identifies the embedding model, so cached vectors are never mixed across models."""
+        try:
+            return self.embedding_fn.name()
+        except Exception:
+            return type(self.embedding_fn).__name__
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed texts as a (len(texts), dim) float32 array."""
+        started = time.perf_counter()
+        embeddings = np.asarray(self.embedding_fn(texts), dtype=np.float32)
+        self.embedding_stats.record((time.perf_counter() - started) * 1000)
+        return embeddings
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embedding of the normalised query (cached)."""
+        key = normalise_query(query)
+        embedding = self.query_embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.embed([key])
+            self.query_embedding_cache.put(key, embedding)
+        return embedding
+
+    def query(self, query: str, n_results: int = 3, where: dict | None = None) -> dict:
+        """Embed a query and run it against the collection."""
+        embedding = self.embed_query(query)
+        started = time.perf_counter()
+        results = self.collection.query(query_embeddings=embedding, n_results=n_results, where=where)
+        self.query_stats.record((time.perf_counter() - started) * 1000)
+        return results
+
+    def keyword_query(self, query: str, n_results: int = 3, scopes: list[str] | None = None) -> list[dict]:
+        started = time.perf_counter()
+        results = self.lexical.search(query, n_results, scopes)
+        self.lexical_stats.record((time.perf_counter() - started) * 1000)
+        return results
+
+    def search(
+        self,
+        query: str,
+        n_results: int = 3,
+        mode: str = "hybrid",
+        scopes: list[str] | None = None,
+        rerank: bool | None = None,
+    ) -> list[dict]:
+        """Top chunks for a query as [{"id", "content", "metadata", "score"}].
+
+        "vector" is the dense Chroma query, "keyword" the BM25 index, and "hybrid"
+        fuses both rankings with reciprocal rank fusion (score = sum 1/(RRF_K + rank)).
+        With scopes, only chunks in those scopes are searched; None searches everything.
+        Reranked results (rerank, default settings.kb_rerank) also carry "rerank_score".
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}")
+        scope_key = tuple(sorted(set(scopes))) if scopes is not None else None
+        if scope_key == ():
+            return []
+        use_rerank = (settings.kb_rerank if rerank is None else rerank) and self.reranker.available
+        generation = self.generation
+        query = normalise_query(query)
+        cache_key = (query, n_results, mode, scope_key, use_rerank)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None and cached[0] == generation:
+            return list(cached[1])
+
+        # The reranker picks the best n_results out of a larger candidate set
+        fetch = max(settings.kb_rerank_candidates, n_results) if use_rerank else n_results
+        # Fusion needs a deeper candidate list than the caller asks for
+        depth = fetch if mode != "hybrid" else max(fetch * 4, 20)
+
+        rankings: list[list[dict]] = []
+        if mode in ("vector", "hybrid") and self.collection.count():
+            where = {"scope": {"$in": list(scope_key)}} if scope_key is not None else None
+            results = self.query(query, min(depth, self.collection.count()), where=where)
+            ids = results["ids"][0] if results["ids"] else []
+            rankings.append([
+                {"id": ids[i], "content": results["documents"][0][i], "metadata": results["metadatas"][0][i] or {}}
+                for i in range(len(ids))
+            ])
+        if mode in ("keyword", "hybrid"):
+            rankings.append(self.keyword_query(query, depth, scopes))
+
+        fused: dict[str, dict] = {}
+        for ranking in rankings:
+            for rank, hit in enumerate(ranking, start=1):
+                entry = fused.setdefault(hit["id"], {**hit, "score": 0.0})
+                entry["score"] += 1.0 / (RRF_K + rank)
+        results = sorted(fused.values(), key=lambda h: h["score"], reverse=True)[:fetch]
+        if use_rerank:
+            started = time.perf_counter()
+            try:
+                results = self.reranker.rerank(query, results, n_results, settings.kb_rerank_min_score)
+            except Exception as e:
+                print(f"Rerank error: {e}")
+                results = results[:n_results]
+            self.rerank_stats.record((time.perf_counter() - started) * 1000)
+        self.result_cache.put(cache_key, (generation, results))
+        return list(results)
+
+    def add(self, ids: list[str], documents: list[str], metadatas: list[dict], embeddings: np.ndarray | None = None):
+        if embeddings is None:
+            embeddings = self.embed(documents)
+        self.collection.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+        self.lexical.add(ids, documents, metadatas)
+        self.bump_generation()
+
+    def bump_generation(self):
+        """Mark the collection as changed; cached result sets from earlier generations are ignored."""
+        self.generation += 1
+        self.result_cache.clear()
+
+    def record_cache_lookup(self, hits: int, misses: int):
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+    def delete(self, where: dict):
+        try:
+            self.collection.delete(where=where)
+        finally:
+            # Lexical rows go even if Chroma failed, so keyword search never returns a deleted document
+            if "doc_id" in where:
+                self.lexical.delete_document(where["doc_id"])
+            self.bump_generation()
+
+    def set_document_scope(self, doc_id: str, scope: str, page_size: int = 500):
+        """Move every chunk of a document to another scope."""
+        offset = 0
+        while True:
+            page = self.collection.get(where={"doc_id": doc_id}, include=["metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            self.collection.update(ids=page["ids"], metadatas=[{**(m or {}), "scope": scope} for m in page["metadatas"]])
+            offset += len(page["ids"])
+        self.lexical.set_document_scope(doc_id, scope)
+        self.bump_generation()
+
+    def sync_lexical_index(self, page_size: int = 500):
+        """Backfill the BM25 index from Chroma (e.g. chunks ingested before it existed).
+
+        Chunks from before scopes existed have no scope; they are tagged global here
+        so scoped searches still find them.
+        """
+        if self.lexical.count() >= self.collection.count():
+            return
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            metadatas = [m or {} for m in page["metadatas"]]
+            unscoped = [i for i, m in enumerate(metadatas) if "scope" not in m]
+            if unscoped:
+                for i in unscoped:
+                    metadatas[i] = {**metadatas[i], "scope": GLOBAL_SCOPE}
+                self.collection.update(ids=[page["ids"][i] for i in unscoped], metadatas=[metadatas[i] for i in unscoped])
+            self.lexical.add(page["ids"], page["documents"], metadatas)
+            offset += len(page["ids"])
+
+    async def warm_up(self, load_model: bool = True):
+        """Sync the keyword index and chunk scopes, and load the embedding model so the first search is fast.
+
+        The sync always runs (scoped searches depend on it); load_model=False skips the model.
+        """
+        started = time.perf_counter()
+        try:
+            if load_model:
+                await asyncio.to_thread(self.embed, ["warm-up"])
+                if settings.kb_rerank:
+                    await asyncio.to_thread(self.reranker.warm_up)
+            await asyncio.to_thread(self.sync_lexical_index)
+        except Exception as e:
+            print(f"Knowledge base warm-up failed: {e}")
+            return
+        self.warmup_ms = (time.perf_counter() - started) * 1000
+
+    def close(self):
+        self.reranker.close()
+        self.lexical.close()
+
+    def metrics(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "warmup_ms": round(self.warmup_ms, 2) if self.warmup_ms is not None else None,
+            "chunks": self.collection.count(),
+            "embedding": self.embedding_stats.as_dict(),
+            "query": self.query_stats.as_dict(),
+            "keyword_query": self.lexical_stats.as_dict(),
+            "rerank": self.rerank_stats.as_dict(),
+            "query_cache": {
+                "generation": self.generation,
+                "embeddings": self.query_embedding_cache.stats(),
+                "results": self.result_cache.stats(),
+            },
+            "embedding_cache": {
+                "hits": self.cache_hits,
+                "misses": self.cache_misses,
+                "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            },
+        }
@@ -0,0 +1,106 @@
+import json
+import re
+import sqlite3
+import threading
+
+# Keep identifiers such as ERR-1042 or max_tokens as single tokens
+_FTS_TOKENIZER = "unicode61 remove_diacritics 2 tokenchars '-_'"
+_QUERY_TERM_RE = re.compile(r"[\w\-]+")
+
+
+class LexicalIndex:
+    """
+    BM25 keyword index over knowledge-base chunks, in a SQLite FTS5 table.
+
+    Lives next to the Chroma store (not in the app database, which may be
+    Postgres) and mirrors it: KnowledgeEngine adds and deletes chunks in both.
+    Calls are synchronous; callers run them in a worker thread like Chroma calls.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(chunks_fts)")]
+            if columns and ("scope" not in columns or "chunk_rows" not in tables):
+                # FTS5 tables cannot be altered; KnowledgeEngine.sync_lexical_index refills it from Chroma
+                self._conn.execute("DROP TABLE chunks_fts")
+                self._conn.execute("DROP TABLE IF EXISTS chunk_rows")
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+                "chunk_id UNINDEXED, doc_id UNINDEXED, scope UNINDEXED, metadata UNINDEXED, content, "
+                f"tokenize=\"{_FTS_TOKENIZER}\")"
+            )
+            # UNINDEXED FTS5 columns can only be filtered by scanning the whole table, so
+            # chunks are found by id or document here and changed by FTS rowid
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunk_rows ("
+                "fts_rowid INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, doc_id TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_chunk_rows_doc_id ON chunk_rows (doc_id)")
+
+    def add(self, ids: list[str], documents: list[str], metadatas: list[dict]):
+        """Add chunks, replacing any with the same ids."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM chunks_fts WHERE rowid = (SELECT fts_rowid FROM chunk_rows WHERE chunk_id = ?)",
+                [(chunk_id,) for chunk_id in ids],
+            )
+            self._conn.executemany("DELETE FROM chunk_rows WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+            for chunk_id, text, meta in zip(ids, documents, metadatas):
+                rowid = self._conn.execute(
+                    "INSERT INTO chunk_rows (chunk_id, doc_id) VALUES (?, ?)", (chunk_id, meta.get("doc_id"))
+                ).lastrowid
+                self._conn.execute(
+                    "INSERT INTO chunks_fts (rowid, chunk_id, doc_id, scope, metadata, content) VALUES (?, ?, ?, ?, ?, ?)",
+                    (rowid, chunk_id, meta.get("doc_id"), meta.get("scope"), json.dumps(meta), text),
+                )
+
+    def delete_document(self, doc_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM chunks_fts WHERE rowid IN (SELECT fts_rowid FROM chunk_rows WHERE doc_id = ?)", (doc_id,)
+            )
+            self._conn.execute("DELETE FROM chunk_rows WHERE doc_id = ?", (doc_id,))
+
+    def set_document_scope(self, doc_id: str, scope: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chunks_fts SET scope = ?, metadata = json_set(metadata, '$.scope', ?) "
+                "WHERE rowid IN (SELECT fts_rowid FROM chunk_rows WHERE doc_id = ?)",
+                (scope, scope, doc_id),
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM chunks_fts").fetchone()[0]
+
+    def search(self, query: str, n_results: int, scopes: list[str] | None = None) -> list[dict]:
+        """BM25-ranked chunks matching any query term, best first, optionally only in the given scopes."""
+        terms = _QUERY_TERM_RE.findall(query)
+        if not terms or scopes == []:
+            return []
+        # Quote every term so FTS5 operators/punctuation in user text are taken literally
+        match = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+        scope_filter = ""
+        params: list = [match]
+        if scopes is not None:
+            scope_filter = f" AND scope IN ({', '.join('?' * len(scopes))})"
+            params.extend(scopes)
+        params.append(n_results)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id, content, metadata, bm25(chunks_fts) AS score FROM chunks_fts "
+                f"WHERE chunks_fts MATCH ?{scope_filter} ORDER BY score LIMIT ?",
+                params,
+            ).fetchall()
+        return [
+            {"id": chunk_id, "content": content, "metadata": json.loads(metadata), "bm25": -score}
+            for chunk_id, content, metadata, score in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
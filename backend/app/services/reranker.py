@@ -0,0 +1,78 @@
+"""
+Optional cross-encoder reranking for knowledge-base search.
+
+The first-stage search (vector, BM25 or hybrid) over-fetches candidates, and a
+cross-encoder scores every (query, chunk) pair jointly, which ranks far more
+precisely than comparing embeddings. The top few then go to the agent, so a
+small n_results is enough and tool output stays short.
+
+The model (sentence-transformers CrossEncoder) is loaded on first use and runs
+on the CPU in a dedicated thread pool, which bounds how many reranks compete
+for cores with the embedding model and the event loop.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.config import settings
+
+
+class Reranker:
+    def __init__(self, model_name: str | None = None, threads: int | None = None):
+        self.model_name = model_name or settings.kb_rerank_model
+        self._pool = ThreadPoolExecutor(
+            max_workers=max(1, threads or settings.kb_rerank_threads), thread_name_prefix="rerank",
+        )
+        self._model = None
+        self._load_lock = threading.Lock()
+        self._failed = False
+
+    @property
+    def available(self) -> bool:
+        """False once the model failed to load (e.g. sentence-transformers missing); search then skips reranking."""
+        return not self._failed
+
+    def _load(self):
+        with self._load_lock:
+            if self._model is None and not self._failed:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+                except Exception as e:
+                    print(f"Reranker unavailable ({self.model_name}): {e}")
+                    self._failed = True
+        return self._model
+
+    def _predict(self, query: str, texts: list[str]) -> np.ndarray:
+        model = self._load()
+        if model is None:
+            raise RuntimeError("Reranker model is not available")
+        logits = np.asarray(model.predict([(query, text) for text in texts]), dtype=np.float32)
+        # ms-marco cross-encoders return raw logits (e.g. 8.6, -4.3); map them to 0-1
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def score(self, query: str, texts: list[str]) -> np.ndarray:
+        """Relevance of each text to the query, 0-1 (higher is better). Blocks on the rerank pool."""
+        return self._pool.submit(self._predict, query, texts).result()
+
+    def rerank(self, query: str, hits: list[dict], top_k: int, min_score: float | None = None) -> list[dict]:
+        """The top_k hits by cross-encoder score, each with "rerank_score"; hits under min_score are dropped."""
+        if not hits:
+            return []
+        scores = self.score(query, [hit["content"] for hit in hits])
+        ranked = sorted(
+            ({**hit, "rerank_score": float(s)} for hit, s in zip(hits, scores)),
+            key=lambda h: h["rerank_score"],
+            reverse=True,
+        )
+        if min_score is not None:
+            ranked = [hit for hit in ranked if hit["rerank_score"] >= min_score]
+        return ranked[:top_k]
+
+    def warm_up(self):
+        if self._load() is not None:
+            self._predict("warm-up", ["warm-up"])
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,201 @@
+"""
+Schedules for "schedule" trigger nodes, parsed from the node's config_json:
+
+    {"cron": "*/15 9-17 * * mon-fri", "timezone": "Europe/London"}
+    {"interval_seconds": 3600}
+
+plus the optional keys "misfire" (MisfirePolicy), "jitter_seconds" and
+"payload" (merged into every scheduled run's trigger payload). Cron
+expressions have the usual five fields (minute hour day-of-month month
+day-of-week) with lists, ranges, steps and month/day names, or one of the
+@hourly/@daily/@weekly/@monthly/@yearly shortcuts. As in cron, when both the
+day-of-month and day-of-week fields are restricted a day matching either runs;
+a field starting with "*" (including a stepped "*/2") counts as unrestricted.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+class MisfirePolicy:
+    """What to do with fire times missed by more than the grace period (e.g. while the server was down)."""
+    RUN_ONCE = "run_once"  # One run for all missed times, then continue from now
+    SKIP = "skip"  # Drop missed times
+    CATCH_UP = "catch_up"  # One run per missed time (up to settings.workflow_schedule_max_catchup)
+
+    ALL = (RUN_ONCE, SKIP, CATCH_UP)
+
+
+ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+MONTH_NAMES = {name: i for i, name in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1,
+)}
+DAY_NAMES = {name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])}
+
+# Searching further than this for a matching time means the expression never matches (e.g. "0 0 31 2 *")
+MAX_SEARCH_YEARS = 8
+
+
+def _parse_value(value: str, names: Optional[Dict[str, int]]) -> int:
+    if names and value.lower() in names:
+        return names[value.lower()]
+    if not value.isdigit():
+        raise ValueError(f"Invalid value {value!r}")
+    return int(value)
+
+
+def _parse_field(field: str, low: int, high: int, names: Optional[Dict[str, int]] = None) -> frozenset:
+    values = set()
+    for part in field.split(","):
+        expr, _, step_text = part.partition("/")
+        step = int(step_text) if step_text.isdigit() else None
+        if step_text and not step:
+            raise ValueError(f"Invalid step in {part!r}")
+        if expr == "*":
+            start, end = low, high
+        elif "-" in expr:
+            start_text, end_text = expr.split("-", 1)
+            start, end = _parse_value(start_text, names), _parse_value(end_text, names)
+        else:
+            start = _parse_value(expr, names)
+            end = high if step else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"{part!r} is outside {low}-{high}")
+        values.update(range(start, end + 1, step or 1))
+    return frozenset(values)
+
+
+@dataclass(frozen=True)
+class CronSchedule:
+    expression: str
+    tz: ZoneInfo
+    minutes: frozenset
+    hours: frozenset
+    days: frozenset
+    months: frozenset
+    weekdays: frozenset  # 0 = Sunday
+    day_restricted: bool
+    weekday_restricted: bool
+
+    @classmethod
+    def parse(cls, expression: str, tz: ZoneInfo) -> "CronSchedule":
+        fields = ALIASES.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {len(fields)}: {expression!r}")
+        minute, hour, day, month, weekday = fields
+        try:
+            weekdays = _parse_field(weekday, 0, 7, DAY_NAMES)
+            schedule = cls(
+                expression=expression,
+                tz=tz,
+                minutes=_parse_field(minute, 0, 59),
+                hours=_parse_field(hour, 0, 23),
+                days=_parse_field(day, 1, 31),
+                months=_parse_field(month, 1, 12, MONTH_NAMES),
+                weekdays=frozenset(d % 7 for d in weekdays),
+                day_restricted=not day.startswith("*"),
+                weekday_restricted=not weekday.startswith("*"),
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression {expression!r}: {e}")
+        if schedule.next_after(datetime.now(timezone.utc)) is None:
+            raise ValueError(f"Cron expression {expression!r} never matches")
+        return schedule
+
+    def _day_matches(self, moment: datetime) -> bool:
+        in_days = moment.day in self.days
+        in_weekdays = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.day_restricted and self.weekday_restricted:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def next_after(self, after: datetime) -> Optional[datetime]:
+        """The first matching minute strictly after ``after`` (an aware datetime), or None if there is none."""
+        moment = after.astimezone(self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment.year + MAX_SEARCH_YEARS
+        # Skip whole months, days and hours that cannot match; at most a few hundred steps
+        while moment.year <= limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.astimezone(timezone.utc)
+        return None
+
+
+@dataclass(frozen=True)
+class IntervalSchedule:
+    seconds: float
+
+    def next_after(self, after: datetime) -> Optional[datetime]:
+        return after + timedelta(seconds=self.seconds)
+
+
+@dataclass(frozen=True)
+class TriggerSchedule:
+    """A schedule trigger node's parsed config."""
+    timing: CronSchedule | IntervalSchedule
+    misfire: str
+    jitter_seconds: Optional[float]  # None: settings.workflow_schedule_jitter_seconds
+    payload: Dict[str, Any]
+
+    def next_after(self, after: datetime) -> Optional[datetime]:
+        return self.timing.next_after(after)
+
+
+def parse_schedule(config: Dict[str, Any]) -> Optional[TriggerSchedule]:
+    """The schedule in a trigger node's config, or None if it has neither "cron" nor "interval_seconds".
+
+    Raises ValueError for malformed settings.
+    """
+    cron = config.get("cron")
+    interval = config.get("interval_seconds")
+    if not cron and interval is None:
+        return None
+    if cron and interval is not None:
+        raise ValueError("Set either cron or interval_seconds, not both")
+
+    if cron:
+        try:
+            tz = ZoneInfo(config.get("timezone") or "UTC")
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone {config.get('timezone')!r}")
+        timing = CronSchedule.parse(str(cron), tz)
+    else:
+        try:
+            seconds = float(interval)
+        except (TypeError, ValueError):
+            raise ValueError(f"interval_seconds must be a number, got {interval!r}")
+        if seconds < 1:
+            raise ValueError("interval_seconds must be at least 1")
+        timing = IntervalSchedule(seconds)
+
+    misfire = config.get("misfire") or MisfirePolicy.RUN_ONCE
+    if misfire not in MisfirePolicy.ALL:
+        raise ValueError(f"misfire must be one of {', '.join(MisfirePolicy.ALL)}")
+    jitter = config.get("jitter_seconds")
+    if jitter is not None:
+        try:
+            jitter = float(jitter)
+        except (TypeError, ValueError):
+            raise ValueError(f"jitter_seconds must be a number, got {jitter!r}")
+        if jitter < 0:
+            raise ValueError("jitter_seconds must not be negative")
+    payload = config.get("payload") or {}
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be an object")
+    return TriggerSchedule(timing=timing, misfire=misfire, jitter_seconds=jitter, payload=payload)
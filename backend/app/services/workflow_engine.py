@@ -1,7 +1,12 @@
+import asyncio
 import json
+import time
+from datetime import datetime, timezone
 from typing import Dict, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.workflow import Node
+from app.config import settings
+from app.models.workflow import WorkflowRun, WorkflowRunStatus
+from app.services.workflow_plan import WorkflowGraphError
 from app.services.workflow_service import WorkflowService
 from app.providers.registry import ProviderRegistry
 from app.providers.base import ChatMessage
@@ -14,89 +19,216 @@ class WorkflowEngine:
         self.workflow_service = WorkflowService(session)
         self.provider_registry = provider_registry
         self.tool_registry = tool_registry
+        self._handlers = {
+            "trigger": self._run_trigger,
+            "summarize": self._run_summarize,
+            "email_draft": self._run_email_draft,
+            "notify": self._run_notify,
+            "noop": self._run_noop,
+        }
 
-    async def execute_workflow(self, workflow_id: str, trigger_payload: Dict[str, Any]) -> Dict[str, Any]:
+    async def create_run(
+        self,
+        workflow_id: str,
+        trigger_payload: Dict[str, Any],
+        trigger_node_id: Optional[str] = None,
+    ) -> WorkflowRun:
+        """Record a pending run of a workflow. Raises ValueError if the workflow cannot run."""
+        plan = await self.workflow_service.get_plan(workflow_id)
+        if plan is None:
+            raise ValueError("Workflow not found or inactive.")
+        trigger = plan.trigger(trigger_node_id)
+        if trigger is None:
+            raise ValueError("No trigger node found.")
+        return await self.workflow_service.create_run(workflow_id, plan.version, trigger.node_id, trigger_payload)
+
+    async def execute_workflow(
+        self,
+        workflow_id: str,
+        trigger_payload: Dict[str, Any],
+        trigger_node_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         Executes a workflow given its ID and an initial payload (e.g. from a webhook).
+
+        The run is recorded as a WorkflowRun; see run_workflow.
         """
-        workflow = await self.workflow_service.get_workflow(workflow_id)
-        if not workflow or not workflow.is_active:
-            return {"status": "error", "message": "Workflow not found or inactive."}
-
-        # 1. Build adjacency list for DAG traversal
-        nodes_by_id = {node.id: node for node in workflow.nodes}
-        
-        # Find trigger node(s)
-        trigger_nodes = [node for node in workflow.nodes if node.type == "trigger"]
-        if not trigger_nodes:
-            return {"status": "error", "message": "No trigger node found."}
-
-        # We assume one simple linear path for now, but could be expanded to true DAG
-        adjacency = {node.id: [] for node in workflow.nodes}
-        for edge in workflow.edges:
-            if edge.source_node_id in adjacency:
-                adjacency[edge.source_node_id].append(edge.target_node_id)
-
-        # 2. Execution Loop
-        start_node = trigger_nodes[0]
-        context_payload = trigger_payload.copy()
-        
-        current_node_id = start_node.id
-        execution_log = []
-
-        while current_node_id:
-            node = nodes_by_id[current_node_id]
-            config = json.loads(node.config_json) if node.config_json else {}
-            
-            # Execute node logic
-            try:
-                result = await self._execute_node(node, config, context_payload)
-                context_payload.update(result)
-                execution_log.append({"node_id": node.id, "type": node.sub_type, "status": "success", "output": result})
-            except Exception as e:
-                execution_log.append({"node_id": node.id, "type": node.sub_type, "status": "error", "error": str(e)})
-                return {"status": "error", "execution_log": execution_log}
-
-            # Move to next node
-            next_nodes = adjacency.get(current_node_id, [])
-            if next_nodes:
-                current_node_id = next_nodes[0]  # Just take first branch for MVP
-            else:
-                break
-                
-        return {"status": "success", "final_payload": context_payload, "execution_log": execution_log}
-
-    async def _execute_node(self, node: Node, config: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            run = await self.create_run(workflow_id, trigger_payload, trigger_node_id)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        return await self.run_workflow(run.id)
+
+    async def run_workflow(self, run_id: str) -> Dict[str, Any]:
         """
-        Executes an individual node's logic.
+        Executes a recorded run, or resumes a failed/interrupted one.
+
+        The graph is run as a DAG from the run's trigger node: every node whose
+        predecessors have finished is started, up to
+        settings.workflow_max_parallel_nodes at once, so independent branches run
+        concurrently. A node's input is the trigger payload updated with its
+        ancestors' outputs in topological order (ties broken by node id), and the
+        final payload merges every node's output the same way, so the result does
+        not depend on which branch finished first. After a node fails no new nodes
+        are started; nodes already running are allowed to finish.
+
+        Each finished node is checkpointed as a NodeRun. Nodes that already
+        succeeded in this run are not executed again (their saved output is used),
+        so resuming never repeats completed LLM calls. The graph comes from the
+        workflow's compiled plan (see workflow_plan). A run that has checkpointed
+        nodes must still be at the version it started with; one that has not (e.g.
+        it waited in the queue while the graph was saved) adopts the current version.
         """
-        if node.type == "trigger":
-            # Just pass the payload through
+        run = await self.workflow_service.get_run(run_id)
+        if run is None:
+            return {"status": "error", "message": "Run not found."}
+        if run.status == WorkflowRunStatus.SUCCESS:
+            return {"status": "error", "run_id": run.id, "message": "Run already completed."}
+
+        try:
+            plan = await self.workflow_service.get_plan(run.workflow_id)
+        except WorkflowGraphError as e:
+            return await self._fail_run(run, str(e))
+        if plan is None:
+            return await self._fail_run(run, "Workflow not found or inactive.")
+        if plan.version != run.workflow_version:
+            if run.node_runs:
+                return await self._fail_run(run, "The workflow was edited after this run started; start a new run.")
+            # Nothing has executed yet (e.g. the run waited in the queue): run the current graph
+            run.workflow_version = plan.version
+        trigger = plan.trigger(run.trigger_node_id)
+        if trigger is None:
+            return await self._fail_run(run, "No trigger node found.")
+
+        trigger_payload = json.loads(run.trigger_payload_json or "{}")
+        position = {node_id: i for i, node_id in enumerate(trigger.order)}
+        outputs: Dict[str, Dict[str, Any]] = {}
+        log_entries: Dict[str, Dict[str, Any]] = {}
+        for node_run in run.node_runs:
+            if node_run.status == "success" and node_run.node_id in position:
+                outputs[node_run.node_id] = json.loads(node_run.output_json or "{}")
+                log_entries[node_run.node_id] = {
+                    "node_id": node_run.node_id,
+                    "type": node_run.node_type,
+                    "started_at": node_run.started_at.isoformat() if node_run.started_at else None,
+                    "status": "success",
+                    "output": outputs[node_run.node_id],
+                    "finished_at": node_run.finished_at.isoformat() if node_run.finished_at else None,
+                    "duration_ms": node_run.duration_ms,
+                    "resumed": True,
+                }
+
+        run.status = WorkflowRunStatus.RUNNING
+        run.started_at = run.started_at or datetime.now(timezone.utc)
+        run.error = None
+        await self.session.commit()
+
+        failed = False
+        semaphore = asyncio.Semaphore(max(1, settings.workflow_max_parallel_nodes))
+
+        def merged_payload(node_ids) -> Dict[str, Any]:
+            payload = trigger_payload.copy()
+            for node_id in sorted(node_ids, key=position.__getitem__):
+                payload.update(outputs[node_id])
             return payload
-            
-        elif node.type == "action":
-            sub = node.sub_type
-            if sub == "summarize":
-                # Uses LLM to summarize
-                text_to_summarize = payload.get("data", "") or payload.get("text", "")
-                prompt = f"Summarize the following text:\n\n{text_to_summarize}"
-                
-                # Use default model
-                response = await self._call_llm(prompt, "gemini/gemini-2.5-flash")
-                return {"summary": response}
-                
-            elif sub == "email_draft":
-                # Drafts an email
-                context = payload.get("summary", "") or payload.get("text", "")
-                prompt = f"Draft a professional email based on this context:\n\n{context}"
-                response = await self._call_llm(prompt, "gemini/gemini-2.5-flash")
-                return {"email_draft": response}
-                
-            elif sub == "notify":
-                # Mock notification
-                print(f"NOTIFICATION SENT: {payload}")
-                return {"notified": True}
-                
+
+        async def run_node(node_id: str):
+            node = plan.nodes[node_id]
+            payload = merged_payload(trigger.ancestors[node_id])
+            async with semaphore:
+                started_at = datetime.now(timezone.utc)
+                started = time.perf_counter()
+                entry = {"node_id": node.id, "type": node.sub_type, "started_at": started_at.isoformat()}
+                try:
+                    result = await self._handlers[node.handler](node.config, payload)
+                    outputs[node_id] = result
+                    entry.update(status="success", output=result)
+                except Exception as e:
+                    entry.update(status="error", error=str(e))
+                entry["finished_at"] = datetime.now(timezone.utc).isoformat()
+                entry["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                log_entries[node_id] = entry
+
+        remaining = {
+            node_id: sum(1 for p in trigger.predecessors[node_id] if p not in outputs)
+            for node_id in trigger.order if node_id not in outputs
+        }
+        running: Dict[asyncio.Task, str] = {}
+        ready = [node_id for node_id in trigger.order if remaining.get(node_id) == 0]
+        try:
+            while ready or running:
+                for node_id in ready:
+                    running[asyncio.create_task(run_node(node_id))] = node_id
+                ready = []
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in sorted(done, key=lambda t: position[running[t]]):
+                    node_id = running.pop(task)
+                    # Checkpoint before anything downstream can start
+                    await self.workflow_service.save_node_run(run.id, log_entries[node_id])
+                    if log_entries[node_id]["status"] == "error":
+                        failed = True
+                    if failed:
+                        continue
+                    for target in plan.nodes[node_id].successors:
+                        if target in remaining:
+                            remaining[target] -= 1
+                            if remaining[target] == 0:
+                                ready.append(target)
+        finally:
+            # Cancelled (e.g. shutdown): stop the branches; the run is marked interrupted on next start
+            for task in running:
+                task.cancel()
+
+        execution_log = [log_entries[node_id] for node_id in trigger.order if node_id in log_entries]
+        run.finished_at = datetime.now(timezone.utc)
+        if failed:
+            errors = [entry for entry in execution_log if entry["status"] == "error"]
+            run.status = WorkflowRunStatus.ERROR
+            run.error = f"Node {errors[0]['node_id']} failed: {errors[0]['error']}"
+            await self.session.commit()
+            return {"status": "error", "run_id": run.id, "execution_log": execution_log}
+
+        final_payload = merged_payload(outputs)
+        run.status = WorkflowRunStatus.SUCCESS
+        run.final_payload_json = json.dumps(final_payload, default=str)
+        await self.session.commit()
+        return {"status": "success", "run_id": run.id, "final_payload": final_payload, "execution_log": execution_log}
+
+    async def _fail_run(self, run: WorkflowRun, message: str) -> Dict[str, Any]:
+        run.status = WorkflowRunStatus.ERROR
+        run.error = message
+        run.finished_at = datetime.now(timezone.utc)
+        await self.session.commit()
+        return {"status": "error", "run_id": run.id, "message": message}
+
+    # Node handlers, chosen per node when the plan is compiled (workflow_plan.resolve_handler)
+
+    async def _run_trigger(self, config: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Just pass the payload through
+        return payload
+
+    async def _run_summarize(self, config: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Uses LLM to summarize
+        text_to_summarize = payload.get("data", "") or payload.get("text", "")
+        prompt = f"Summarize the following text:\n\n{text_to_summarize}"
+
+        # Use default model
+        response = await self._call_llm(prompt, "gemini/gemini-2.5-flash")
+        return {"summary": response}
+
+    async def _run_email_draft(self, config: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Drafts an email
+        context = payload.get("summary", "") or payload.get("text", "")
+        prompt = f"Draft a professional email based on this context:\n\n{context}"
+        response = await self._call_llm(prompt, "gemini/gemini-2.5-flash")
+        return {"email_draft": response}
+
+    async def _run_notify(self, config: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
+        # Mock notification
+        print(f"NOTIFICATION SENT: {payload}")
+        return {"notified": True}
+
+    async def _run_noop(self, config: Dict[str, Any], payload: Dict[str, Any]) -> Dict[str, Any]:
         return {}
 
     async def _call_llm(self, prompt: str, model_string: str) -> str:
@@ -0,0 +1,204 @@
+"""
+Compiled workflow execution plans.
+
+A plan is everything WorkflowEngine needs to run a workflow, worked out once
+per saved graph instead of on every run: the validated topological order,
+parsed node configs, each node's handler, and, per trigger node, the reachable
+sub-graph with its predecessor and ancestor sets, and the parsed schedule of
+every schedule trigger (see schedule.py). Plans are cached in memory by
+(workflow id, version); every graph change bumps Workflow.version, so a stale
+plan is never used even if another process saved the graph.
+"""
+import heapq
+import json
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.services.schedule import TriggerSchedule, parse_schedule
+
+# (node type, sub_type) -> WorkflowEngine handler; any other action is a no-op
+NODE_HANDLERS = {
+    ("action", "summarize"): "summarize",
+    ("action", "email_draft"): "email_draft",
+    ("action", "notify"): "notify",
+}
+
+
+class WorkflowGraphError(ValueError):
+    """The saved graph cannot be executed (e.g. it has a cycle)."""
+
+
+def topological_order(node_ids: Iterable[str], edges: Iterable[tuple[str, str]]) -> List[str]:
+    """Node ids so that every edge's source comes before its target.
+
+    Ties are broken by node id, so the order (and the payload merge that follows
+    it) is the same on every run. Edges to unknown nodes are ignored. Raises
+    WorkflowGraphError if the edges form a cycle.
+    """
+    successors: dict[str, list[str]] = {node_id: [] for node_id in node_ids}
+    in_degree = dict.fromkeys(successors, 0)
+    for source, target in edges:
+        if source in successors and target in successors:
+            successors[source].append(target)
+            in_degree[target] += 1
+
+    ready = [node_id for node_id, degree in in_degree.items() if degree == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        node_id = heapq.heappop(ready)
+        order.append(node_id)
+        for target in successors[node_id]:
+            in_degree[target] -= 1
+            if in_degree[target] == 0:
+                heapq.heappush(ready, target)
+
+    if len(order) < len(successors):
+        cyclic = sorted(node_id for node_id, degree in in_degree.items() if degree > 0)
+        raise WorkflowGraphError(f"Workflow graph has a cycle through nodes: {', '.join(cyclic)}")
+    return order
+
+
+def resolve_handler(node_type: str, sub_type: str) -> str:
+    if node_type == "trigger":
+        return "trigger"
+    return NODE_HANDLERS.get((node_type, sub_type), "noop")
+
+
+@dataclass(frozen=True)
+class PlanNode:
+    id: str
+    type: str
+    sub_type: str
+    config: Dict[str, Any]  # Parsed config_json; shared by all runs, so handlers must not modify it
+    handler: str
+    successors: tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class TriggerPlan:
+    """The part of the graph one trigger starts: nodes in run order and their dependencies within it."""
+    node_id: str
+    order: tuple[str, ...]
+    predecessors: Dict[str, frozenset]
+    ancestors: Dict[str, frozenset]
+
+
+@dataclass(frozen=True)
+class WorkflowPlan:
+    workflow_id: str
+    version: int
+    nodes: Dict[str, PlanNode]
+    order: tuple[str, ...]
+    triggers: Dict[str, TriggerPlan]  # By trigger node id, in id order
+    schedules: Dict[str, TriggerSchedule]  # By schedule trigger node id; nodes without a schedule are left out
+
+    def trigger(self, trigger_node_id: Optional[str] = None) -> Optional[TriggerPlan]:
+        """The given trigger's plan, or the first trigger's when none is given."""
+        if trigger_node_id is not None:
+            return self.triggers.get(trigger_node_id)
+        return next(iter(self.triggers.values()), None)
+
+
+def compile_plan(workflow_id: str, version: int, nodes: Iterable, edges: Iterable) -> WorkflowPlan:
+    """Validate a graph (Node/Edge rows or their schemas) and compile it. Raises WorkflowGraphError."""
+    nodes = list(nodes)
+    node_ids = {node.id for node in nodes}
+    edge_pairs = [
+        (edge.source_node_id, edge.target_node_id) for edge in edges
+        if edge.source_node_id in node_ids and edge.target_node_id in node_ids
+    ]
+    order = topological_order(sorted(node_ids), edge_pairs)
+
+    successors: Dict[str, List[str]] = {node_id: [] for node_id in node_ids}
+    for source, target in edge_pairs:
+        successors[source].append(target)
+
+    plan_nodes = {}
+    schedules = {}
+    for node in nodes:
+        try:
+            config = json.loads(node.config_json) if node.config_json else {}
+        except json.JSONDecodeError as e:
+            raise WorkflowGraphError(f"Node {node.id} has invalid config_json: {e}")
+        if node.type == "trigger" and node.sub_type == "schedule":
+            try:
+                schedule = parse_schedule(config)
+            except ValueError as e:
+                raise WorkflowGraphError(f"Node {node.id} has an invalid schedule: {e}")
+            if schedule is not None:
+                schedules[node.id] = schedule
+        plan_nodes[node.id] = PlanNode(
+            id=node.id,
+            type=node.type,
+            sub_type=node.sub_type,
+            config=config,
+            handler=resolve_handler(node.type, node.sub_type),
+            successors=tuple(sorted(set(successors[node.id]))),
+        )
+
+    triggers = {}
+    for trigger_id in sorted(node_id for node_id, node in plan_nodes.items() if node.type == "trigger"):
+        reachable = {trigger_id}
+        for node_id in order:
+            if node_id in reachable:
+                reachable.update(successors[node_id])
+        predecessors: Dict[str, set] = {node_id: set() for node_id in reachable}
+        for source, target in edge_pairs:
+            if source in reachable and target in reachable:
+                predecessors[target].add(source)
+        ancestors: Dict[str, frozenset] = {}
+        trigger_order = tuple(node_id for node_id in order if node_id in reachable)
+        for node_id in trigger_order:
+            inherited = set(predecessors[node_id])
+            for parent in predecessors[node_id]:
+                inherited |= ancestors[parent]
+            ancestors[node_id] = frozenset(inherited)
+        triggers[trigger_id] = TriggerPlan(
+            node_id=trigger_id,
+            order=trigger_order,
+            predecessors={node_id: frozenset(p) for node_id, p in predecessors.items()},
+            ancestors=ancestors,
+        )
+
+    return WorkflowPlan(
+        workflow_id=workflow_id,
+        version=version,
+        nodes=plan_nodes,
+        order=tuple(order),
+        triggers=triggers,
+        schedules=schedules,
+    )
+
+
+class WorkflowPlanCache:
+    """Compiled plans by (workflow id, version); only the latest version of each workflow is kept."""
+
+    def __init__(self):
+        self._plans: Dict[str, WorkflowPlan] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, workflow_id: str, version: int) -> Optional[WorkflowPlan]:
+        with self._lock:
+            plan = self._plans.get(workflow_id)
+            if plan is None or plan.version != version:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return plan
+
+    def put(self, plan: WorkflowPlan):
+        with self._lock:
+            current = self._plans.get(plan.workflow_id)
+            if current is None or current.version <= plan.version:
+                self._plans[plan.workflow_id] = plan
+
+    def invalidate(self, workflow_id: str):
+        with self._lock:
+            self._plans.pop(workflow_id, None)
+
+
+plan_cache = WorkflowPlanCache()
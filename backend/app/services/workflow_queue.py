@@ -0,0 +1,157 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.db.engine import async_session
+from app.models.workflow import WorkflowRun, WorkflowRunStatus
+from app.providers.registry import ProviderRegistry
+from app.services.workflow_engine import WorkflowEngine
+from app.tools.registry import ToolRegistry
+
+
+class WorkflowQueueFull(Exception):
+    """The queue already holds settings.workflow_queue_max_depth waiting runs."""
+
+
+class WorkflowQueue:
+    """
+    Background workflow execution, off the request path.
+
+    Runs are recorded first (WorkflowEngine.create_run) and then queued by id; a
+    fixed number of worker tasks execute them, each in its own session. At most
+    max_runs_per_workflow runs of one workflow execute at once: further runs of
+    that workflow are held back in a per-workflow FIFO and released as its runs
+    finish, so one busy workflow never occupies every worker. The total number
+    of waiting runs is bounded; submit raises WorkflowQueueFull beyond it, which
+    the API returns as 429.
+    """
+
+    def __init__(
+        self,
+        provider_registry: ProviderRegistry,
+        tool_registry: ToolRegistry,
+        workers: int | None = None,
+        max_depth: int | None = None,
+        max_runs_per_workflow: int | None = None,
+    ):
+        self.provider_registry = provider_registry
+        self.tool_registry = tool_registry
+        self.workers = max(1, workers or settings.workflow_workers)
+        self.max_depth = max(1, max_depth or settings.workflow_queue_max_depth)
+        self.max_runs_per_workflow = max(1, max_runs_per_workflow or settings.workflow_max_runs_per_workflow)
+        self._ready: asyncio.Queue[tuple[str, str]] = asyncio.Queue()  # (run id, workflow id)
+        self._held: dict[str, deque[str]] = {}  # Run ids over their workflow's limit, by workflow id
+        self._slots: dict[str, int] = {}  # Runs of each workflow that are ready or executing
+        self._run_ids: set[str] = set()  # Every run waiting or executing
+        self._waiting = 0
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """Runs waiting to execute."""
+        return self._waiting
+
+    @property
+    def is_full(self) -> bool:
+        return self._waiting >= self.max_depth
+
+    def is_queued(self, run_id: str) -> bool:
+        """Whether the run is waiting or executing."""
+        return run_id in self._run_ids
+
+    def stats(self) -> dict:
+        return {
+            "waiting": self._waiting,
+            "executing": len(self._run_ids) - self._waiting,
+            "max_depth": self.max_depth,
+            "workers": self.workers,
+        }
+
+    async def start(self):
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        await self._resume_pending()
+
+    async def stop(self):
+        # Runs cut off here are marked interrupted on the next start
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, run_id: str, workflow_id: str):
+        """Queue a recorded run. Raises WorkflowQueueFull, or ValueError if the run is already queued."""
+        if run_id in self._run_ids:
+            raise ValueError("Run is already queued or executing.")
+        if self.is_full:
+            raise WorkflowQueueFull(f"Workflow queue is full ({self.max_depth} runs waiting); try again later.")
+        self._run_ids.add(run_id)
+        self._waiting += 1
+        if self._slots.get(workflow_id, 0) < self.max_runs_per_workflow:
+            self._slots[workflow_id] = self._slots.get(workflow_id, 0) + 1
+            self._ready.put_nowait((run_id, workflow_id))
+        else:
+            self._held.setdefault(workflow_id, deque()).append(run_id)
+
+    def _release(self, workflow_id: str):
+        """A run of workflow_id finished: pass its slot to the next held run, if any."""
+        held = self._held.get(workflow_id)
+        if held:
+            self._ready.put_nowait((held.popleft(), workflow_id))
+            if not held:
+                del self._held[workflow_id]
+            return
+        self._slots[workflow_id] -= 1
+        if not self._slots[workflow_id]:
+            del self._slots[workflow_id]
+
+    async def _resume_pending(self):
+        """Re-queue runs recorded but never started by a previous process, oldest first."""
+        async with async_session() as session:
+            result = await session.execute(
+                select(WorkflowRun)
+                .where(WorkflowRun.status == WorkflowRunStatus.PENDING)
+                .order_by(WorkflowRun.created_at)
+            )
+            for run in result.scalars().all():
+                try:
+                    self.submit(run.id, run.workflow_id)
+                except WorkflowQueueFull:
+                    run.status = WorkflowRunStatus.INTERRUPTED
+                    run.error = "Not re-queued after a server restart (queue full)"
+            await session.commit()
+
+    async def _worker(self):
+        while True:
+            run_id, workflow_id = await self._ready.get()
+            self._waiting -= 1
+            try:
+                await self._execute(run_id)
+            except Exception as e:
+                print(f"Workflow run {run_id} failed: {e}")
+                # A failure here must not end the worker, or the pool would shrink for good
+                try:
+                    await self._set_run_error(run_id, str(e))
+                except Exception as state_error:
+                    print(f"Error recording failure of workflow run {run_id}: {state_error}")
+            finally:
+                self._run_ids.discard(run_id)
+                self._release(workflow_id)
+                self._ready.task_done()
+
+    async def _execute(self, run_id: str):
+        async with async_session() as session:
+            engine = WorkflowEngine(session, self.provider_registry, self.tool_registry)
+            await engine.run_workflow(run_id)
+
+    async def _set_run_error(self, run_id: str, error: str):
+        async with async_session() as session:
+            run = await session.get(WorkflowRun, run_id)
+            if run is None or run.status == WorkflowRunStatus.SUCCESS:
+                return
+            run.status = WorkflowRunStatus.ERROR
+            run.error = error
+            run.finished_at = datetime.now(timezone.utc)
+            await session.commit()
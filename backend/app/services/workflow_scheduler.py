@@ -0,0 +1,217 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.config import settings
+from app.db.engine import async_session
+from app.models.workflow import WorkflowRunStatus
+from app.services.schedule import MisfirePolicy, TriggerSchedule
+from app.services.workflow_engine import WorkflowEngine
+from app.services.workflow_plan import WorkflowGraphError
+from app.services.workflow_queue import WorkflowQueue, WorkflowQueueFull
+from app.services.workflow_service import WorkflowService
+
+
+@dataclass(eq=False)
+class ScheduledTrigger:
+    workflow_id: str
+    node_id: str
+    schedule: TriggerSchedule
+    due: datetime  # Next fire time from the schedule, before jitter
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.workflow_id, self.node_id
+
+
+class WorkflowScheduler:
+    """
+    Starts runs of "schedule" trigger nodes (see schedule.py) on the WorkflowQueue.
+
+    Upcoming fire times are kept in a min-heap, so each wake-up only looks at the
+    triggers that are due and costs O(log n) per fire, however many workflows are
+    scheduled. Schedules come from the workflows' compiled plans; every
+    settings.workflow_schedule_refresh_seconds one query finds workflows whose
+    version changed (or refresh_soon() is called after an edit) and only those
+    are reloaded. Replaced triggers are dropped from the heap lazily.
+
+    A trigger's next fire time follows its last run (WorkflowRun.created_at), so
+    a restart resumes the schedule. Fire times missed by more than
+    settings.workflow_schedule_misfire_grace_seconds are handled by the node's
+    misfire policy, and a random delay of up to jitter_seconds spreads out
+    schedules that would otherwise fire in the same second.
+    """
+
+    def __init__(self, queue: WorkflowQueue):
+        self.queue = queue
+        self._heap: list[tuple[float, int, ScheduledTrigger]] = []  # (fire time with jitter, tie-breaker, trigger)
+        self._triggers: dict[tuple[str, str], ScheduledTrigger] = {}  # Live triggers by (workflow id, node id)
+        self._versions: dict[str, int] = {}  # Workflow versions the live triggers were loaded from
+        self._counter = itertools.count()
+        self._next_refresh = 0.0
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        if settings.workflow_scheduler:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def refresh_soon(self):
+        """Reload changed schedules now instead of at the next refresh interval."""
+        self._next_refresh = 0.0
+        self._wake.set()
+
+    def upcoming(self) -> list[dict]:
+        """Live triggers with their next fire time, soonest first."""
+        entries = sorted(
+            ((fire_at, trigger) for fire_at, _, trigger in self._heap if self._triggers.get(trigger.key) is trigger),
+            key=lambda entry: entry[0],
+        )
+        return [
+            {
+                "workflow_id": trigger.workflow_id,
+                "node_id": trigger.node_id,
+                "next_run_at": datetime.fromtimestamp(fire_at, timezone.utc).isoformat(),
+            }
+            for fire_at, trigger in entries
+        ]
+
+    async def _loop(self):
+        while True:
+            try:
+                if time.time() >= self._next_refresh:
+                    self._next_refresh = time.time() + settings.workflow_schedule_refresh_seconds
+                    await self.refresh()
+                await self._fire_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Workflow scheduler error: {e}")
+            delay = self._next_refresh - time.time()
+            if self._heap:
+                delay = min(delay, self._heap[0][0] - time.time())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=max(delay, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def refresh(self):
+        """Load the schedules of workflows added or changed since the last refresh; drop removed ones."""
+        async with async_session() as session:
+            service = WorkflowService(session)
+            versions = await service.scheduled_workflow_versions()
+            for workflow_id in [w for w in self._versions if w not in versions]:
+                self._drop(workflow_id)
+            changed = [w for w, version in versions.items() if self._versions.get(w) != version]
+            if not changed:
+                return
+            last_runs = await service.last_trigger_times(changed)
+            now = datetime.now(timezone.utc)
+            for workflow_id in changed:
+                self._drop(workflow_id)
+                self._versions[workflow_id] = versions[workflow_id]
+                try:
+                    plan = await service.get_plan(workflow_id)
+                except WorkflowGraphError as e:
+                    print(f"Schedules of workflow {workflow_id} not loaded: {e}")
+                    continue
+                if plan is None:
+                    continue
+                for node_id, schedule in plan.schedules.items():
+                    due = schedule.next_after(last_runs.get((workflow_id, node_id), now))
+                    if due is not None:
+                        trigger = ScheduledTrigger(workflow_id, node_id, schedule, due)
+                        self._triggers[trigger.key] = trigger
+                        self._push(trigger)
+        self._compact()
+
+    def _drop(self, workflow_id: str):
+        self._versions.pop(workflow_id, None)
+        for key in [key for key in self._triggers if key[0] == workflow_id]:
+            del self._triggers[key]
+
+    def _compact(self):
+        """Rebuild the heap once most of its entries belong to dropped triggers."""
+        if len(self._heap) > 2 * len(self._triggers) + 64:
+            self._heap = [entry for entry in self._heap if self._triggers.get(entry[2].key) is entry[2]]
+            heapq.heapify(self._heap)
+
+    def _push(self, trigger: ScheduledTrigger):
+        jitter = trigger.schedule.jitter_seconds
+        if jitter is None:
+            jitter = settings.workflow_schedule_jitter_seconds
+        fire_at = trigger.due.timestamp() + (random.uniform(0, jitter) if jitter > 0 else 0.0)
+        heapq.heappush(self._heap, (fire_at, next(self._counter), trigger))
+
+    def _advance(self, trigger: ScheduledTrigger, fire_at: float, now: datetime) -> list[datetime]:
+        """The scheduled times to run now, moving trigger.due past them (None when the schedule ends)."""
+        if now.timestamp() - fire_at <= settings.workflow_schedule_misfire_grace_seconds:
+            times = [trigger.due]
+            trigger.due = trigger.schedule.next_after(trigger.due)
+            return times
+
+        policy = trigger.schedule.misfire
+        times = []
+        if policy == MisfirePolicy.RUN_ONCE:
+            times = [trigger.due]
+        elif policy == MisfirePolicy.CATCH_UP:
+            due: Optional[datetime] = trigger.due
+            while due is not None and due <= now and len(times) < max(1, settings.workflow_schedule_max_catchup):
+                times.append(due)
+                due = trigger.schedule.next_after(due)
+        print(
+            f"Workflow {trigger.workflow_id} schedule {trigger.node_id} missed its {trigger.due.isoformat()} run; "
+            f"{policy}: starting {len(times)} run(s)"
+        )
+        trigger.due = trigger.schedule.next_after(now)
+        return times
+
+    async def _fire_due(self):
+        now = time.time()
+        due: list[tuple[ScheduledTrigger, float]] = []
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, trigger = heapq.heappop(self._heap)
+            if self._triggers.get(trigger.key) is trigger:
+                due.append((trigger, fire_at))
+        if not due:
+            return
+
+        now_dt = datetime.fromtimestamp(now, timezone.utc)
+        async with async_session() as session:
+            engine = WorkflowEngine(session, self.queue.provider_registry, self.queue.tool_registry)
+            for trigger, fire_at in due:
+                for scheduled_at in self._advance(trigger, fire_at, now_dt):
+                    await self._dispatch(engine, trigger, scheduled_at)
+                if trigger.due is not None:
+                    self._push(trigger)
+                else:
+                    del self._triggers[trigger.key]
+
+    async def _dispatch(self, engine: WorkflowEngine, trigger: ScheduledTrigger, scheduled_at: datetime):
+        if self.queue.is_full:
+            print(f"Scheduled run of workflow {trigger.workflow_id} skipped: workflow queue is full")
+            return
+        payload = {**trigger.schedule.payload, "scheduled_at": scheduled_at.isoformat()}
+        try:
+            run = await engine.create_run(trigger.workflow_id, payload, trigger.node_id)
+        except ValueError as e:
+            print(f"Scheduled run of workflow {trigger.workflow_id} not started: {e}")
+            return
+        try:
+            self.queue.submit(run.id, trigger.workflow_id)
+        except WorkflowQueueFull as e:
+            run.status = WorkflowRunStatus.ERROR
+            run.error = str(e)
+            await engine.session.commit()
@@ -1,10 +1,13 @@
-from typing import List, Optional
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import selectinload
 
-from app.models.workflow import Workflow, Node, Edge
+from app.models.workflow import Workflow, Node, Edge, NodeRun, WorkflowRun, WorkflowRunStatus
 from app.schemas.workflow import NodeCreate, EdgeCreate
+from app.services.workflow_plan import WorkflowPlan, compile_plan, plan_cache
 
 class WorkflowService:
     def __init__(self, session: AsyncSession):
@@ -47,11 +50,76 @@ class WorkflowService:
         await self.session.refresh(workflow)
         return workflow
 
+    async def get_plan(self, workflow_id: str) -> Optional[WorkflowPlan]:
+        """The compiled plan of an active workflow (None if missing or inactive).
+
+        Costs one small version lookup when the plan is cached; the graph is only
+        loaded and compiled again after it changed. Raises WorkflowGraphError if
+        the stored graph is invalid.
+        """
+        result = await self.session.execute(
+            select(Workflow.version, Workflow.is_active).where(Workflow.id == workflow_id)
+        )
+        row = result.one_or_none()
+        if row is None or not row.is_active:
+            return None
+        plan = plan_cache.get(workflow_id, row.version)
+        if plan is None:
+            workflow = await self.get_workflow(workflow_id)
+            if workflow is None:
+                return None
+            plan = compile_plan(workflow_id, row.version, workflow.nodes, workflow.edges)
+            plan_cache.put(plan)
+        return plan
+
+    async def scheduled_workflow_versions(self) -> Dict[str, int]:
+        """Version of every active workflow that has a schedule trigger node, by workflow id."""
+        scheduled = select(Node.workflow_id).where(Node.type == "trigger", Node.sub_type == "schedule")
+        result = await self.session.execute(
+            select(Workflow.id, Workflow.version).where(Workflow.is_active == True, Workflow.id.in_(scheduled))
+        )
+        return {row.id: row.version for row in result.all()}
+
+    async def last_trigger_times(self, workflow_ids: List[str]) -> Dict[tuple[str, str], datetime]:
+        """When each (workflow id, trigger node id) last started a run, in UTC."""
+        if not workflow_ids:
+            return {}
+        result = await self.session.execute(
+            select(WorkflowRun.workflow_id, WorkflowRun.trigger_node_id, func.max(WorkflowRun.created_at))
+            .where(WorkflowRun.workflow_id.in_(workflow_ids))
+            .group_by(WorkflowRun.workflow_id, WorkflowRun.trigger_node_id)
+        )
+        return {
+            # SQLite returns naive datetimes
+            (workflow_id, node_id): created_at if created_at.tzinfo else created_at.replace(tzinfo=timezone.utc)
+            for workflow_id, node_id, created_at in result.all()
+            if created_at is not None
+        }
+
+    async def touch_graph(self, workflow_id: str):
+        """Record a change to the stored graph: bump its version so cached plans are rebuilt.
+
+        The caller commits.
+        """
+        await self.session.execute(
+            update(Workflow).where(Workflow.id == workflow_id).values(version=Workflow.version + 1)
+        )
+        plan_cache.invalidate(workflow_id)
+
     async def save_graph(self, workflow_id: str, nodes: List[NodeCreate], edges: List[EdgeCreate]) -> Optional[Workflow]:
+        """Replace a workflow's nodes and edges and cache its compiled plan.
+
+        Raises WorkflowGraphError (before anything is changed) for a cyclic graph
+        or invalid node config.
+        """
         workflow = await self.get_workflow(workflow_id)
         if not workflow:
             return None
 
+        # Validate and compile before touching the stored graph
+        version = (workflow.version or 1) + 1
+        plan = compile_plan(workflow_id, version, nodes, edges)
+
         # Delete existing nodes & edges directly (cascade will handle it if we delete via ORM, or we can just empty arrays)
         # SQLAlchemy selectinload populated arrays:
         for node in list(workflow.nodes):
@@ -85,14 +153,87 @@ class WorkflowService:
             )
             self.session.add(e)
 
+        workflow.version = version
+        plan_cache.invalidate(workflow_id)
         await self.session.commit()
+        plan_cache.put(plan)
         
         return await self.get_workflow(workflow_id)
 
     async def delete_workflow(self, workflow_id: str) -> bool:
         workflow = await self.get_workflow(workflow_id)
         if workflow:
+            await self.delete_runs(workflow_id)
             await self.session.delete(workflow)
             await self.session.commit()
+            plan_cache.invalidate(workflow_id)
             return True
         return False
+
+    # ── Runs ──
+
+    async def create_run(
+        self, workflow_id: str, version: int, trigger_node_id: Optional[str], trigger_payload: Dict[str, Any],
+    ) -> WorkflowRun:
+        run = WorkflowRun(
+            workflow_id=workflow_id,
+            workflow_version=version,
+            trigger_node_id=trigger_node_id,
+            status=WorkflowRunStatus.PENDING,
+            trigger_payload_json=json.dumps(trigger_payload, default=str),
+        )
+        self.session.add(run)
+        await self.session.commit()
+        return run
+
+    async def get_run(self, run_id: str) -> Optional[WorkflowRun]:
+        stmt = select(WorkflowRun).options(selectinload(WorkflowRun.node_runs)).where(WorkflowRun.id == run_id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def list_runs(self, workflow_id: str, limit: int = 50) -> List[WorkflowRun]:
+        stmt = (
+            select(WorkflowRun)
+            .where(WorkflowRun.workflow_id == workflow_id)
+            .order_by(WorkflowRun.created_at.desc())
+            .limit(limit)
+        )
+        result = await self.session.execute(stmt)
+        return list(result.scalars().all())
+
+    async def save_node_run(self, run_id: str, entry: Dict[str, Any]):
+        """Checkpoint one finished node (an execution log entry), replacing an earlier attempt."""
+        await self.session.execute(
+            delete(NodeRun).where(NodeRun.run_id == run_id, NodeRun.node_id == entry["node_id"])
+        )
+        self.session.add(NodeRun(
+            run_id=run_id,
+            node_id=entry["node_id"],
+            node_type=entry["type"],
+            status=entry["status"],
+            output_json=json.dumps(entry["output"], default=str) if "output" in entry else None,
+            error=entry.get("error"),
+            started_at=datetime.fromisoformat(entry["started_at"]),
+            finished_at=datetime.fromisoformat(entry["finished_at"]),
+            duration_ms=entry["duration_ms"],
+        ))
+        await self.session.commit()
+
+    async def mark_interrupted_runs(self) -> int:
+        """Flag runs left running by a previous process so they can be resumed.
+
+        Pending runs never started; WorkflowQueue queues them again on start.
+        """
+        result = await self.session.execute(
+            update(WorkflowRun)
+            .where(WorkflowRun.status == WorkflowRunStatus.RUNNING)
+            .values(status=WorkflowRunStatus.INTERRUPTED, error="Interrupted by a server restart")
+        )
+        await self.session.commit()
+        return result.rowcount
+
+    async def delete_runs(self, workflow_id: str):
+        """Remove a workflow's runs (SQLite does not enforce the ON DELETE CASCADE). The caller commits."""
+        run_ids = select(WorkflowRun.id).where(WorkflowRun.workflow_id == workflow_id)
+        await self.session.execute(delete(NodeRun).where(NodeRun.run_id.in_(run_ids)))
+        await self.session.execute(delete(WorkflowRun).where(WorkflowRun.workflow_id == workflow_id))
@@ -1,7 +1,25 @@
 from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ToolContext:
+    """Who a tool call is made for; ChatService sets it around every tool call."""
+    agent_id: str | None = None
+    channel_id: str | None = None
+    conversation_id: str | None = None
+
+
+# Tools that act on the caller's behalf read this (e.g. the knowledge base searches the caller's scope)
+current_tool_context: ContextVar[ToolContext] = ContextVar("current_tool_context", default=ToolContext())
 
 
 class BaseTool(ABC):
+    # Tools that share external state (e.g. a single browser page) set this to
+    # False so that concurrent tool calls in one turn are serialized.
+    parallel_safe: bool = True
+
     @property
     @abstractmethod
     def name(self) -> str:
@@ -25,6 +25,8 @@ class BrowserManager:
             return cls._page
 
 class BrowserTool(BaseTool):
+    parallel_safe = False
+
     @property
     def name(self) -> str:
         return "BrowserTool"
@@ -1,3 +1,4 @@
+import asyncio
 import subprocess
 import sys
 import tempfile
@@ -36,7 +37,8 @@ class CodeExecutorTool(BaseTool):
                 tmp_path = f.name
 
             try:
-                result = subprocess.run(
+                result = await asyncio.to_thread(
+                    subprocess.run,
                     [sys.executable, tmp_path],
                     capture_output=True,
                     text=True,
@@ -1,7 +1,11 @@
-from app.tools.base import BaseTool
+from app.tools.base import BaseTool, current_tool_context
 from app.services.document_service import DocumentService
+from app.services.knowledge_engine import caller_scopes
 
 class KnowledgeBaseTool(BaseTool):
+    def __init__(self, knowledge_engine=None):
+        self.knowledge_engine = knowledge_engine
+
     @property
     def name(self) -> str:
         return "search_knowledge_base"
@@ -10,7 +14,8 @@ class KnowledgeBaseTool(BaseTool):
     def description(self) -> str:
         return (
             "Search the user's uploaded documents (Knowledge Base) for relevant information. "
-            "Use this tool when the user asks questions about their uploaded files, data, or general reference documents."
+            "Use this tool when the user asks questions about their uploaded files, data, or general reference documents. "
+            "Only shared documents and those belonging to the calling agent or channel are searched."
         )
 
     def parameters_schema(self) -> dict:
@@ -25,22 +30,46 @@ class KnowledgeBaseTool(BaseTool):
                     "type": "integer",
                     "description": "The number of text chunks to retrieve. Default is 3.",
                 },
+                "mode": {
+                    "type": "string",
+                    "enum": ["hybrid", "vector", "keyword"],
+                    "description": (
+                        "Retrieval mode. 'hybrid' (default) combines keyword and semantic matching and "
+                        "finds both exact identifiers/names and paraphrases in one call; 'keyword' only "
+                        "matches exact terms; 'vector' only matches by meaning."
+                    ),
+                },
             },
             "required": ["query"],
         }
 
-    async def execute(self, query: str, n_results: int = 3, **kwargs) -> str:
-        # We can pass session=None since search_documents only uses ChromaDB
-        doc_service = DocumentService(session=None)
-        results = doc_service.search_documents(query, n_results=n_results)
+    async def execute(self, query: str, n_results: int = 3, mode: str = "hybrid", **kwargs) -> str:
+        if self.knowledge_engine is None:
+            return "Error: the knowledge base is not initialised."
+        # We can pass session=None since search_documents only uses the knowledge engine
+        doc_service = DocumentService(session=None, engine=self.knowledge_engine)
+        # Only the caller's documents: shared ones plus its agent's and channel's own
+        context = current_tool_context.get()
+        scopes = caller_scopes(context.agent_id, context.channel_id)
+        try:
+            results = await doc_service.search_documents(query, n_results=n_results, mode=mode, scopes=scopes)
+        except ValueError as e:
+            return f"Error: {e}"
         
         if not results:
             return "No relevant information found in the knowledge base."
             
         formatted = []
         for i, res in enumerate(results):
-            filename = res.get('metadata', {}).get('filename', 'Unknown')
+            metadata = res.get('metadata', {})
+            filename = metadata.get('filename', 'Unknown')
+            if metadata.get('page_start'):
+                pages = metadata['page_start'] if metadata['page_start'] == metadata.get('page_end') else f"{metadata['page_start']}-{metadata.get('page_end')}"
+                filename = f"{filename}, page {pages}"
             content = res.get('content', '')
-            formatted.append(f"--- Document: {filename} (Result {i+1}) ---\n{content}\n")
+            label = f"Result {i+1}"
+            if 'rerank_score' in res:
+                label += f", relevance {res['rerank_score']:.2f}"
+            formatted.append(f"--- Document: {filename} ({label}) ---\n{content}\n")
             
         return "\n".join(formatted)
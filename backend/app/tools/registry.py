@@ -42,7 +42,7 @@ class ToolRegistry:
             for t in self._tools.values()
         ]
 
-    def register_defaults(self, provider_registry=None):
+    def register_defaults(self, provider_registry=None, knowledge_engine=None):
         """Register all built-in tools."""
         from app.tools.web_search import WebSearchTool
         from app.tools.file_manager import FileManagerTool
@@ -59,7 +59,7 @@ class ToolRegistry:
 
         for tool in [
             WebSearchTool(), FileManagerTool(), CodeExecutorTool(),
-            DateTimeTool(), KnowledgeBaseTool(),
+            DateTimeTool(), KnowledgeBaseTool(knowledge_engine=knowledge_engine),
             ToolCreatorTool(), SkillCreatorTool(),
             AgentManagerTool(),
             AgentDelegationTool(
@@ -1,3 +1,5 @@
+import asyncio
+
 from app.tools.base import BaseTool
 
 
@@ -31,10 +33,15 @@ class WebSearchTool(BaseTool):
         try:
             from duckduckgo_search import DDGS
 
-            results = []
-            with DDGS() as ddgs:
-                for r in ddgs.text(query, max_results=max_results):
-                    results.append(f"**{r['title']}**\n{r['href']}\n{r['body']}\n")
+            def _search() -> list[str]:
+                with DDGS() as ddgs:
+                    return [
+                        f"**{r['title']}**\n{r['href']}\n{r['body']}\n"
+                        for r in ddgs.text(query, max_results=max_results)
+                    ]
+
+            # DDGS is synchronous; run it off the event loop so parallel tool calls overlap
+            results = await asyncio.to_thread(_search)
 
             if not results:
                 return "No results found."
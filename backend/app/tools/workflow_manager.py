@@ -5,6 +5,8 @@ from sqlalchemy.orm import selectinload
 from app.tools.base import BaseTool
 from app.db.engine import async_session
 from app.models.workflow import Workflow, Node, Edge
+from app.services.workflow_plan import WorkflowGraphError, plan_cache, topological_order
+from app.services.workflow_service import WorkflowService
 import uuid
 
 
@@ -171,8 +173,10 @@ class WorkflowManagerTool(BaseTool):
                 if not wf:
                     return f"Error: Workflow {wf_id} not found."
                 name = wf.name
+                await WorkflowService(session).delete_runs(wf_id)
                 await session.delete(wf)
                 await session.commit()
+                plan_cache.invalidate(wf_id)
                 return f"Workflow '{name}' deleted successfully."
 
             # ── ADD NODE ──
@@ -193,6 +197,7 @@ class WorkflowManagerTool(BaseTool):
                     position_y=params.get("position_y", "200"),
                 )
                 session.add(node)
+                await WorkflowService(session).touch_graph(wf_id)
                 await session.commit()
                 return f"Node '{node.sub_type}' (type: {node.type}) added to workflow '{wf.name}' with node ID: {node.id}"
 
@@ -214,6 +219,7 @@ class WorkflowManagerTool(BaseTool):
                 edges_result = await session.execute(edges_stmt)
                 for edge in edges_result.scalars().all():
                     await session.delete(edge)
+                await WorkflowService(session).touch_graph(wf_id)
                 await session.commit()
                 return f"Node {node_id} and its connected edges removed."
 
@@ -224,6 +230,14 @@ class WorkflowManagerTool(BaseTool):
                 target = params.get("target_node_id")
                 if not wf_id or not source or not target:
                     return "Error: workflow_id, source_node_id, and target_node_id are required for 'connect'."
+                node_ids = (await session.execute(select(Node.id).where(Node.workflow_id == wf_id))).scalars().all()
+                edge_pairs = (await session.execute(
+                    select(Edge.source_node_id, Edge.target_node_id).where(Edge.workflow_id == wf_id)
+                )).all()
+                try:
+                    topological_order(node_ids, [*edge_pairs, (source, target)])
+                except WorkflowGraphError as e:
+                    return f"Error: {e}"
                 edge = Edge(
                     id=f"e-{source}-{target}",
                     workflow_id=wf_id,
@@ -231,6 +245,7 @@ class WorkflowManagerTool(BaseTool):
                     target_node_id=target,
                 )
                 session.add(edge)
+                await WorkflowService(session).touch_graph(wf_id)
                 await session.commit()
                 return f"Edge connected: {source} → {target}"
 
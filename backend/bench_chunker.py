@@ -0,0 +1,148 @@
+"""Benchmark: structure-aware token chunker vs the old fixed 1000-char windows.
+
+Builds a synthetic markdown corpus of sections and paragraphs with planted facts
+("The access code for project P17 is K3X9QZ."). Each chunker is scored on:
+index size (chunks, characters indexed vs source), ingest time (chunking plus
+embedding), and retrieval hit-rate. A hit means the fact sentence appears intact
+in the top-k chunks for "What is the access code for project P17?".
+
+Uses the knowledge base's embedding model when it is available locally, else a
+hashed TF-IDF embedding (no download needed; fine for comparing chunkers).
+
+Usage: uv run python bench_chunker.py [sections] [top_k]
+"""
+import hashlib
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.chunker import chunk_stream
+
+FILLER = [
+    "The team reviewed the quarterly roadmap and agreed on the next milestones.",
+    "Several stakeholders raised concerns about the integration timeline.",
+    "Documentation for the deployment process was updated accordingly.",
+    "Performance tests showed stable latency under the expected load.",
+    "A follow-up meeting was scheduled to discuss the remaining risks.",
+    "The budget allocation was revised after the latest estimates came in.",
+    "Customer feedback highlighted the need for clearer onboarding material.",
+    "Security reviews were completed without any critical findings.",
+]
+
+
+def legacy_chunks(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
+    """The previous DocumentService._chunk_text."""
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+
+def build_corpus(sections: int, seed: int = 7) -> tuple[str, dict[str, str]]:
+    rng = random.Random(seed)
+    facts: dict[str, str] = {}
+    lines = []
+    fact_no = 0
+    for s in range(sections):
+        lines.append(f"## Section {s + 1}: Project update")
+        lines.append("")
+        for _ in range(rng.randint(3, 6)):
+            sentences = rng.sample(FILLER, rng.randint(3, 6))
+            code = "".join(rng.choices("ABCDEFGHJKLMNPQRSTUVWXYZ23456789", k=6))
+            fact = f"The access code for project P{fact_no} is {code}."
+            facts[f"P{fact_no}"] = fact
+            fact_no += 1
+            sentences.insert(rng.randint(0, len(sentences)), fact)
+            lines.append(" ".join(sentences))
+            lines.append("")
+    return "\n".join(lines), facts
+
+
+class HashedTfidf:
+    """Hashed TF-IDF vectors; IDF is fitted on each chunker's own chunks."""
+
+    def __init__(self, dim: int = 4096):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _bucket(self, token: str) -> int:
+        return int(hashlib.md5(token.encode()).hexdigest()[:8], 16) % self.dim
+
+    def fit(self, chunks: list[str]):
+        df = np.zeros(self.dim, dtype=np.float32)
+        for chunk in chunks:
+            for bucket in {self._bucket(t) for t in re.findall(r"\w+", chunk.lower())}:
+                df[bucket] += 1
+        self.idf = np.log((1 + len(chunks)) / (1 + df)).astype(np.float32) + 1.0
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in re.findall(r"\w+", text.lower()):
+                out[row, self._bucket(token)] += 1.0
+        out *= self.idf
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-9)
+
+
+def make_embedder():
+    try:
+        from chromadb.utils import embedding_functions
+        fn = embedding_functions.DefaultEmbeddingFunction()
+        fn(["probe"])
+
+        def embed(texts: list[str]) -> np.ndarray:
+            vectors = np.asarray(fn(texts), dtype=np.float32)
+            return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-9)
+        return "onnx-minilm", embed
+    except Exception:
+        return "hashed-tfidf", HashedTfidf()
+
+
+def evaluate(label: str, chunks: list[str], chunk_seconds: float, source_chars: int,
+             facts: dict[str, str], embed, top_k: int):
+    started = time.perf_counter()
+    if hasattr(embed, "fit"):
+        embed.fit(chunks)
+    vectors = np.concatenate([embed(chunks[i:i + 64]) for i in range(0, len(chunks), 64)])
+    embed_seconds = time.perf_counter() - started
+
+    questions = [f"What is the access code for project {key}?" for key in facts]
+    query_vectors = embed(questions)
+    hits = 0
+    for (key, fact), query in zip(facts.items(), query_vectors):
+        best = np.argsort(-(vectors @ query))[:top_k]
+        normalised_fact = " ".join(fact.split())
+        if any(normalised_fact in " ".join(chunks[i].split()) for i in best):
+            hits += 1
+
+    indexed = sum(len(c) for c in chunks)
+    print(f"{label:<12} {len(chunks):>6} chunks  {indexed:>9} chars ({indexed / source_chars:5.2f}x source)  "
+          f"chunk {chunk_seconds * 1000:7.1f} ms  embed {embed_seconds:6.2f} s  "
+          f"hit@{top_k} {hits / len(facts):6.1%}")
+
+
+def main():
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    top_k = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    text, facts = build_corpus(sections)
+    embedder_name, embed = make_embedder()
+    print(f"{sections} sections, {len(text)} chars, {len(facts)} facts, embedding={embedder_name}")
+
+    started = time.perf_counter()
+    old = legacy_chunks(text)
+    evaluate("fixed-1000", old, time.perf_counter() - started, len(text), facts, embed, top_k)
+
+    started = time.perf_counter()
+    pieces = ((None, line) for line in text.split("\n"))
+    new = [c.text for c in chunk_stream(pieces, settings.chunk_max_tokens, settings.chunk_overlap_tokens)]
+    evaluate("token-aware", new, time.perf_counter() - started, len(text), facts, embed, top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark: chat messages written/sec under N concurrent conversations.
+
+Compares the old engine (rollback journal, synchronous=FULL, no pragmas) with the
+tuned SQLite profile from app.db.engine (WAL, synchronous=NORMAL, busy_timeout,
+cache/mmap sizing, pooled connections). Uses a throwaway database file.
+
+Usage: uv run python bench_db_writes.py [conversations] [messages_per_conversation]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import app.models.agent  # noqa: F401  (register tables)
+import app.models.channel  # noqa: F401
+from app.config import Settings
+from app.db.base import Base
+from app.db.engine import create_engine_from_settings
+from app.services.conversation_service import ConversationService
+
+
+async def run(label: str, engine, conversations: int, per_conversation: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with Session() as session:
+        conv_ids = [(await ConversationService(session).create(title=f"bench {i}")).id for i in range(conversations)]
+
+    async def writer(conv_id: str):
+        async with Session() as session:
+            svc = ConversationService(session)
+            for i in range(per_conversation):
+                await svc.add_message(conv_id, "user" if i % 2 == 0 else "assistant", "x" * 400)
+            # A reader on the same conversation, as each chat turn does
+            await svc.get_messages(conv_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(c) for c in conv_ids))
+    elapsed = time.perf_counter() - started
+    total = conversations * per_conversation
+    print(f"{label:<10} {total:>6} msgs in {elapsed:6.2f}s  ->  {total / elapsed:8.1f} msgs/sec")
+    await engine.dispose()
+
+
+async def main():
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    per_conversation = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    print(f"{conversations} concurrent conversations x {per_conversation} messages")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline_url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'baseline.db')}"
+        await run("baseline", create_async_engine(baseline_url), conversations, per_conversation)
+
+        tuned_url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'tuned.db')}"
+        await run("tuned", create_engine_from_settings(Settings(), tuned_url), conversations, per_conversation)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
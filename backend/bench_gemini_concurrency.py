@@ -0,0 +1,145 @@
+"""Benchmark: concurrent Gemini calls against a local fake Gemini endpoint.
+
+Starts a tiny HTTP server that imitates generateContent / streamGenerateContent
+with a fixed latency, then runs N concurrent completions and streams through
+GeminiProvider. "blocking" reproduces the old provider (sync SDK calls inside
+async methods); "async" is the current one on client.aio. A heartbeat task
+measures how long the event loop is stalled while the calls are in flight.
+
+Usage: uv run python bench_gemini_concurrency.py [concurrency] [latency_seconds]
+"""
+import asyncio
+import json
+import sys
+import threading
+import time
+
+from google import genai
+from google.genai import types
+
+from app.providers.base import ChatMessage
+from app.providers.gemini_provider import GeminiProvider
+
+MODEL = "gemini-2.5-flash"
+STREAM_CHUNKS = 5
+
+
+def _response(text: str, finish: bool) -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finish:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate]}
+
+
+async def fake_gemini(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, latency: float):
+    try:
+        request_line = (await reader.readline()).decode()
+        length = 0
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        await reader.readexactly(length)
+
+        if ":streamGenerateContent" in request_line:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+            for i in range(STREAM_CHUNKS):
+                await asyncio.sleep(latency / STREAM_CHUNKS)
+                data = json.dumps(_response(f"chunk {i} ", i == STREAM_CHUNKS - 1))
+                writer.write(f"data: {data}\r\n\r\n".encode())
+                await writer.drain()
+        else:
+            await asyncio.sleep(latency)
+            body = json.dumps(_response("hello", True)).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+class BlockingGeminiProvider(GeminiProvider):
+    """The pre-async provider: sync SDK calls made directly inside async methods."""
+
+    async def complete(self, messages, model, tools=None, temperature=0.7):
+        contents, _ = self._build_contents(messages)
+        response = self.client.models.generate_content(model=model, contents=contents)
+        return ChatMessage(role="assistant", content=response.text or "")
+
+    async def stream(self, messages, model, tools=None, temperature=0.7):
+        contents, _ = self._build_contents(messages)
+        for chunk in self.client.models.generate_content_stream(model=model, contents=contents):
+            yield chunk
+
+
+async def heartbeat(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Return the worst event-loop stall observed (seconds beyond the interval)."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - started - interval)
+    return worst
+
+
+async def run(label: str, provider: GeminiProvider, concurrency: int, mode: str):
+    messages = [ChatMessage(role="user", content="hi")]
+
+    async def one():
+        if mode == "complete":
+            await provider.complete(messages, MODEL)
+        else:
+            async for _ in provider.stream(messages, MODEL):
+                pass
+
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    stall = await beat
+    print(f"{label:<9} {mode:<8} {concurrency:>3} calls in {elapsed:6.2f}s  "
+          f"({concurrency / elapsed:6.1f} calls/sec, worst loop stall {stall * 1000:7.1f} ms)")
+
+
+def make_provider(cls, base_url: str) -> GeminiProvider:
+    provider = cls("fake-key")
+    provider.client = genai.Client(api_key="fake-key", http_options=types.HttpOptions(base_url=base_url))
+    return provider
+
+
+async def main():
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    print(f"{concurrency} concurrent calls, {latency}s simulated generation latency")
+
+    # The blocking provider stalls this loop, so the fake server runs on its own loop/thread
+    server_ready = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    address: list = []
+
+    def serve():
+        async def _serve():
+            server = await asyncio.start_server(lambda r, w: fake_gemini(r, w, latency), "127.0.0.1", 0)
+            address.append(server.sockets[0].getsockname())
+            loop.call_soon_threadsafe(server_ready.set)
+            async with server:
+                await server.serve_forever()
+        asyncio.run(_serve())
+
+    threading.Thread(target=serve, daemon=True).start()
+    await server_ready.wait()
+    base_url = f"http://{address[0][0]}:{address[0][1]}"
+
+    for mode in ("complete", "stream"):
+        await run("blocking", make_provider(BlockingGeminiProvider, base_url), concurrency, mode)
+        provider = make_provider(GeminiProvider, base_url)
+        await run("async", provider, concurrency, mode)
+        await provider.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
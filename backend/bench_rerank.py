@@ -0,0 +1,111 @@
+"""Benchmark: prompt tokens vs recall for knowledge-base results, with and without reranking.
+
+Uses the planted-fact corpus from bench_chunker.py, chunked with the ingestion
+chunker. For each question ("What is the access code for project P17?") the
+first stage returns its top-k chunks by embedding similarity; the reranked
+variant fetches settings.kb_rerank_candidates chunks and keeps the top-k by
+reranker score. Reported per k: recall (the fact sentence is in the returned
+chunks) and the average tokens those chunks add to the prompt.
+
+The reranker is the configured cross-encoder when sentence-transformers and the
+model are available, else an IDF-weighted term-overlap scorer (no download
+needed). Fallback numbers only show the mechanics (candidate pool, tokens
+saved): every question contains the exact project key, which term overlap
+finds trivially, so they say nothing about the cross-encoder's recall. Output
+rows are labelled with the reranker that produced them.
+
+Usage: uv run python bench_rerank.py [sections]
+"""
+import re
+import sys
+import time
+
+import numpy as np
+
+from app.config import settings
+from app.services.chunker import chunk_stream, count_tokens
+from app.services.reranker import Reranker
+from bench_chunker import build_corpus, make_embedder
+
+K_VALUES = (1, 3, 5, 10, 20)
+
+
+class OverlapScorer:
+    """Fallback reranker: sum of IDF weights of the query terms a chunk contains."""
+
+    def __init__(self, chunks: list[str]):
+        self.terms = [set(re.findall(r"\w+", c.lower())) for c in chunks]
+        df: dict[str, int] = {}
+        for terms in self.terms:
+            for term in terms:
+                df[term] = df.get(term, 0) + 1
+        self.idf = {t: float(np.log((1 + len(chunks)) / (1 + n))) for t, n in df.items()}
+
+    def __call__(self, query: str, indices: list[int]) -> np.ndarray:
+        query_terms = set(re.findall(r"\w+", query.lower()))
+        return np.array([sum(self.idf.get(t, 0.0) for t in query_terms & self.terms[i]) for i in indices])
+
+
+def make_reranker(chunks: list[str]):
+    reranker = Reranker()
+    try:
+        reranker.score("probe", ["probe"])
+
+        def score(query: str, indices: list[int]) -> np.ndarray:
+            return reranker.score(query, [chunks[i] for i in indices])
+        return settings.kb_rerank_model, score
+    except Exception:
+        return "term-overlap", OverlapScorer(chunks)
+
+
+def report(label: str, k: int, retrieved: list[list[int]], chunks: list[str], facts: list[str], seconds: float):
+    hits = 0
+    tokens = 0
+    for fact, indices in zip(facts, retrieved):
+        texts = [" ".join(chunks[i].split()) for i in indices[:k]]
+        hits += any(fact in t for t in texts)
+        tokens += sum(count_tokens(chunks[i]) for i in indices[:k])
+    print(f"{label:<40} k={k:<3} recall {hits / len(facts):6.1%}  "
+          f"prompt tokens/query {tokens / len(facts):7.1f}  {seconds * 1000 / len(facts):6.2f} ms/query")
+
+
+def main():
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    text, facts = build_corpus(sections)
+    chunks = [c.text for c in chunk_stream(((None, line) for line in text.split("\n")),
+                                           settings.chunk_max_tokens, settings.chunk_overlap_tokens)]
+    embedder_name, embed = make_embedder()
+    if hasattr(embed, "fit"):
+        embed.fit(chunks)
+    vectors = np.concatenate([embed(chunks[i:i + 64]) for i in range(0, len(chunks), 64)])
+    reranker_name, rerank = make_reranker(chunks)
+    candidates = settings.kb_rerank_candidates
+    print(f"{len(chunks)} chunks, {len(facts)} questions, embedding={embedder_name}, "
+          f"reranker={reranker_name}, candidates={candidates}")
+    if reranker_name == "term-overlap":
+        print("Cross-encoder unavailable: reranked rows use the term-overlap fallback, not cross-encoder recall")
+
+    questions = [f"What is the access code for project {key}?" for key in facts]
+    fact_texts = [" ".join(f.split()) for f in facts.values()]
+
+    started = time.perf_counter()
+    query_vectors = embed(questions)
+    first_stage = [list(np.argsort(-(vectors @ q))[:max(max(K_VALUES), candidates)]) for q in query_vectors]
+    first_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    reranked = []
+    for question, ranked in zip(questions, first_stage):
+        pool = ranked[:candidates]
+        scores = rerank(question, pool)
+        reranked.append([pool[i] for i in np.argsort(-scores)])
+    rerank_seconds = time.perf_counter() - started
+
+    for k in K_VALUES:
+        report("first stage", k, first_stage, chunks, fact_texts, first_seconds)
+    for k in (1, 3, 5):
+        report(f"reranked/{reranker_name} (top {candidates})", k, reranked, chunks, fact_texts, first_seconds + rerank_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Chunker streaming tests: chunks must come out while the input is still being read."""
+from app.services.chunker import PARAGRAPH_BUFFER_CHARS_PER_TOKEN, chunk_stream
+
+
+def test_text_without_blank_lines_is_chunked_incrementally():
+    consumed = 0
+
+    def log_lines():
+        nonlocal consumed
+        for i in range(20_000):
+            consumed += 1
+            yield None, f"2024-05-01 12:00:{i % 60:02d} INFO worker-{i % 8} processed request {i} in {i % 97} ms"
+
+    chunks = chunk_stream(log_lines(), max_tokens=200, overlap_tokens=32)
+    first = next(chunks)
+    # One buffer's worth of lines (~4800 characters) is read before the first chunk, not the whole stream
+    assert consumed * 60 < 2 * 200 * PARAGRAPH_BUFFER_CHARS_PER_TOKEN
+    assert first.token_count <= 200
+
+    seen = consumed
+    total = 1 + sum(1 for _ in chunks)
+    assert consumed == 20_000 > seen
+    assert total > 100
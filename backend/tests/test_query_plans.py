@@ -0,0 +1,144 @@
+"""Query-plan regression tests: the hot per-turn queries must be served by indexes.
+
+Runs the real service queries against a fresh SQLite database, captures the SQL
+they emit and checks EXPLAIN QUERY PLAN for an index search without a temp
+B-tree sort.
+"""
+import asyncio
+
+import pytest
+import sqlalchemy
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import app.models.agent  # noqa: F401  (register tables)
+import app.models.channel  # noqa: F401
+from app.config import Settings
+from app.db.base import Base
+from app.db.engine import create_engine_from_settings
+from app.db.migrations import run_migrations
+from app.models.agent import Agent
+from app.models.channel import Channel
+from app.models.channel_agent import ChannelAgent
+from app.services.conversation_service import ConversationService
+from app.services.history_cache import history_cache
+from app.services.lexical_index import LexicalIndex
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine_from_settings(Settings(), f"sqlite+aiosqlite:///{tmp_path / 'plans.db'}")
+    Session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def setup():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(run_migrations)
+        async with Session() as session:
+            session.add(Agent(id="a1", name="Coder", provider="gemini", model="gemini/gemini-2.5-flash"))
+            session.add(Channel(id="c1", name="General"))
+            session.add(ChannelAgent(channel_id="c1", agent_id="a1"))
+            await session.commit()
+            svc = ConversationService(session)
+            conv = await svc.create(title="t", agent_id="a1")
+            for i in range(50):
+                await svc.add_message(conv.id, "user", f"message {i}")
+            return conv.id
+
+    conv_id = asyncio.run(setup())
+    history_cache.clear()
+    yield engine, Session, conv_id
+    asyncio.run(engine.dispose())
+
+
+def capture_plans(engine, Session, work) -> list[tuple[str, str]]:
+    """Run `work(session)` and return (sql, query plan) for every SELECT it issued."""
+    statements = []
+
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    async def run():
+        async with Session() as session:
+            event.listen(engine.sync_engine, "before_cursor_execute", before_execute)
+            try:
+                await work(session)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", before_execute)
+            plans = []
+            for statement, parameters in statements:
+                conn = await session.connection()
+                rows = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                plans.append((statement, " | ".join(str(r[-1]) for r in rows)))
+            return plans
+
+    return asyncio.run(run())
+
+
+def assert_uses_index(plans, table: str, index: str):
+    matching = [(sql, plan) for sql, plan in plans if f"FROM {table}" in sql]
+    assert matching, f"no query against {table} captured"
+    for sql, plan in matching:
+        assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, f"{sql}\n-> {plan}"
+        assert "TEMP B-TREE" not in plan, f"{sql}\n-> {plan}"
+
+
+def test_get_messages_uses_conversation_created_at_index(db):
+    engine, Session, conv_id = db
+    plans = capture_plans(engine, Session, lambda s: ConversationService(s).get_messages(conv_id))
+    assert_uses_index(plans, "messages", "ix_messages_conversation_id_created_at")
+
+
+def test_incremental_history_read_uses_conversation_id_index(db):
+    engine, Session, conv_id = db
+
+    async def work(session):
+        svc = ConversationService(session)
+        history_cache.clear()
+        await svc.get_chat_history(conv_id)  # miss: full load
+        await svc.get_chat_history(conv_id)  # hit: only rows with id > last seen
+
+    plans = capture_plans(engine, Session, work)
+    incremental = [(sql, plan) for sql, plan in plans if "messages.id >" in sql]
+    assert incremental, "incremental history query not issued"
+    assert_uses_index(incremental, "messages", "ix_messages_conversation_id_id")
+
+
+def test_list_conversations_by_agent_uses_agent_updated_at_index(db):
+    engine, Session, _ = db
+    plans = capture_plans(engine, Session, lambda s: ConversationService(s).list_all(limit=1, agent_id="a1"))
+    assert_uses_index(plans, "conversations", "ix_conversations_agent_id_updated_at")
+
+
+def test_channel_membership_probe_uses_primary_key(db):
+    engine, Session, _ = db
+
+    async def work(session):
+        # Same probe as add_agent_to_channel / remove_agent_from_channel
+        stmt = select(ChannelAgent).where(ChannelAgent.channel_id == "c1", ChannelAgent.agent_id == "a1")
+        await session.scalar(stmt)
+
+    plans = capture_plans(engine, Session, work)
+    assert_uses_index(plans, "channel_agents", "sqlite_autoindex_channel_agents_1")
+
+
+def test_lexical_index_changes_chunks_by_rowid(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    index.add(["c1", "c2"], ["alpha beta", "gamma"], [{"doc_id": "d1", "scope": "global"}] * 2)
+    statements = []
+    index._conn.set_trace_callback(statements.append)
+    index.add(["c1"], ["alpha"], [{"doc_id": "d1", "scope": "global"}])
+    index.set_document_scope("d1", "agent:a1")
+    index.delete_document("d1")
+    index._conn.set_trace_callback(None)
+
+    writes = [sql for sql in statements if "chunks_fts" in sql and sql.lstrip().upper().startswith(("DELETE", "UPDATE"))]
+    assert len(writes) == 3
+    for sql in writes:
+        plan = " | ".join(row[-1] for row in index._conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+        # "INDEX 0:=" is an FTS5 rowid lookup; a bare "INDEX 0:" scans the whole table
+        assert "VIRTUAL TABLE INDEX 0:=" in plan, f"{sql}\n-> {plan}"
+        assert "chunk_rows USING COVERING INDEX" in plan, f"{sql}\n-> {plan}"
+    assert index.count() == 0
+    index.close()
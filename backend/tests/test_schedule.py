@@ -0,0 +1,34 @@
+"""Cron schedule tests: day-of-month / day-of-week combination follows standard cron."""
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+from app.services.schedule import CronSchedule
+
+UTC = ZoneInfo("UTC")
+
+
+def fire_times(expression: str, count: int) -> list[datetime]:
+    schedule = CronSchedule.parse(expression, UTC)
+    moment = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    times = []
+    for _ in range(count):
+        moment = schedule.next_after(moment)
+        times.append(moment)
+    return times
+
+
+def test_stepped_wildcard_day_of_month_is_anded_with_day_of_week():
+    # "*/2" is unrestricted for the OR rule: odd days that are also Mondays
+    times = fire_times("0 9 */2 * 1", 12)
+    assert all(t.weekday() == 0 and t.day % 2 == 1 and t.hour == 9 for t in times)
+
+
+def test_stepped_wildcard_day_of_week_is_anded_with_day_of_month():
+    times = fire_times("0 9 1 * */2", 12)
+    assert all(t.day == 1 and (t.weekday() + 1) % 7 in (0, 2, 4, 6) for t in times)
+
+
+def test_restricted_day_of_month_and_day_of_week_are_ored():
+    times = fire_times("0 9 1,15 * 1", 20)
+    assert all(t.day in (1, 15) or t.weekday() == 0 for t in times)
+    assert any(t.weekday() != 0 for t in times) and any(t.day not in (1, 15) for t in times)
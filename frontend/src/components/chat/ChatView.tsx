@@ -1,4 +1,4 @@
-import { useEffect, useRef, useState } from 'react';
+import { useEffect, useLayoutEffect, useRef, useState } from 'react';
 import { MessageBubble } from './MessageBubble';
 import { StreamingMessage } from './StreamingMessage';
 import { MessageInput } from './MessageInput';
@@ -23,6 +23,9 @@ export function ChatView() {
     startOrLoadAgentChat,
     startOrLoadChannelChat,
     loadConversations,
+    hasMoreHistory,
+    isLoadingHistory,
+    loadOlderMessages,
     error,
     clearError,
   } = useChatStore();
@@ -32,6 +35,9 @@ export function ChatView() {
 
   const { selectedModel } = useSettingsStore();
   const bottomRef = useRef<HTMLDivElement>(null);
+  const scrollRef = useRef<HTMLDivElement>(null);
+  // Distance from the bottom to restore after older messages are prepended
+  const prependAnchor = useRef<number | null>(null);
   const [searchQuery, setSearchQuery] = useState('');
   const [isCreateChannelModalOpen, setIsCreateChannelModalOpen] = useState(false);
   const [isAgentManagerModalOpen, setIsAgentManagerModalOpen] = useState(false);
@@ -42,9 +48,28 @@ export function ChatView() {
     loadChannels();
   }, [loadConversations, loadAgents, loadChannels]);
 
+  const firstMessage = messages[0];
+  const lastMessage = messages[messages.length - 1];
+
+  // Only follow the bottom for new messages, not when history is prepended
   useEffect(() => {
     bottomRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [messages, streamingContent, streamingToolCalls]);
+  }, [lastMessage, streamingContent, streamingToolCalls]);
+
+  useLayoutEffect(() => {
+    const el = scrollRef.current;
+    if (el && prependAnchor.current !== null) {
+      el.scrollTop = el.scrollHeight - prependAnchor.current;
+      prependAnchor.current = null;
+    }
+  }, [firstMessage]);
+
+  const handleMessagesScroll = () => {
+    const el = scrollRef.current;
+    if (!el || el.scrollTop > 80 || !hasMoreHistory || isLoadingHistory) return;
+    prependAnchor.current = el.scrollHeight - el.scrollTop;
+    loadOlderMessages();
+  };
 
   // Filter agents by search
   const filteredAgents = agents.filter(a =>
@@ -314,8 +339,11 @@ export function ChatView() {
             )}
 
             {/* Messages */}
-            <div className="flex-1 overflow-y-auto">
+            <div ref={scrollRef} onScroll={handleMessagesScroll} className="flex-1 overflow-y-auto">
               <div className="max-w-3xl mx-auto">
+                {isLoadingHistory && (
+                  <div className="text-center text-xs text-gray-400 py-2">Loading earlier messages...</div>
+                )}
                 {messages.length === 0 && !isStreaming && (
                   <div className="flex flex-col items-center justify-center py-20 text-gray-400">
                     <Bot className="w-10 h-10 text-gray-300 mb-3" />
@@ -1,10 +1,14 @@
 import { useState, useEffect } from 'react';
 import { Upload, FileText, Trash2, Database, AlertCircle, Search, X, Eye } from 'lucide-react';
 import { api } from '../../services/api';
-import type { Document } from '../../types';
+import { useAgentStore } from '../../stores/agentStore';
+import { useChannelStore } from '../../stores/channelStore';
+import type { Document, DocumentScope, IngestionJob } from '../../types';
 
 type FilterType = 'all' | 'pdf' | 'txt' | 'markdown';
 
+const ARCHIVE_RE = /\.(zip|tar|tgz|tar\.gz|tar\.bz2|tar\.xz)$/i;
+
 export function KnowledgeView() {
     const [documents, setDocuments] = useState<Document[]>([]);
     const [isLoading, setIsLoading] = useState(true);
@@ -14,13 +18,40 @@ export function KnowledgeView() {
     const [searchQuery, setSearchQuery] = useState('');
     const [previewDoc, setPreviewDoc] = useState<Document | null>(null);
 
+    const [jobs, setJobs] = useState<Record<string, IngestionJob>>({});
+    // '' = shared with all agents, 'agent:<id>' or 'channel:<id>' = private to it
+    const [uploadScope, setUploadScope] = useState('');
+    const { agents, loadAgents } = useAgentStore();
+    const { channels, loadChannels } = useChannelStore();
+
     useEffect(() => {
         loadDocuments();
+        if (agents.length === 0) loadAgents();
+        if (channels.length === 0) loadChannels();
+    }, []);
+
+    // Live ingestion progress; reload the list whenever a job finishes
+    useEffect(() => {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const ws = new WebSocket(`${protocol}//${window.location.hostname}:8321/api-ws/knowledge/jobs`);
+        ws.onmessage = (event) => {
+            try {
+                const data = JSON.parse(event.data);
+                if (data.type === 'ingestion_job_update') {
+                    const job: IngestionJob = data.job;
+                    setJobs(prev => ({ ...prev, [job.doc_id]: job }));
+                    if (job.finished_at) loadDocuments(false);
+                }
+            } catch (e) {
+                console.error('[Ingestion WS] Failed to parse message', e);
+            }
+        };
+        return () => ws.close();
     }, []);
 
-    const loadDocuments = async () => {
+    const loadDocuments = async (showSpinner = true) => {
         try {
-            setIsLoading(true);
+            if (showSpinner) setIsLoading(true);
             const docs = await api.getDocuments();
             setDocuments(docs);
             setError(null);
@@ -32,12 +63,26 @@ export function KnowledgeView() {
     };
 
     const handleFileUpload = async (event: React.ChangeEvent<HTMLInputElement>) => {
-        const file = event.target.files?.[0];
-        if (!file) return;
+        const files = Array.from(event.target.files ?? []);
+        if (files.length === 0) return;
         try {
             setIsUploading(true);
             setError(null);
-            await api.uploadDocument(file);
+            const [kind, id] = uploadScope.split(':');
+            const scope: DocumentScope = kind === 'agent' ? { agent_id: id } : kind === 'channel' ? { channel_id: id } : {};
+            if (files.length === 1 && !ARCHIVE_RE.test(files[0].name)) {
+                const uploaded = await api.uploadDocument(files[0], scope);
+                if (uploaded.job_id) {
+                    const job = await api.getIngestionJob(uploaded.job_id);
+                    setJobs(prev => ({ ...prev, [job.doc_id]: job }));
+                }
+            } else {
+                // Several files or an archive: one request, progress arrives over the jobs WebSocket
+                const result = await api.bulkUploadDocuments(files, scope);
+                if (result.skipped.length > 0) {
+                    setError(`Skipped ${result.skipped.length} file(s): ${result.skipped.slice(0, 5).map(s => `${s.name} (${s.reason})`).join(', ')}`);
+                }
+            }
             await loadDocuments();
         } catch (err: any) {
             setError(err.message || 'Failed to upload document');
@@ -69,6 +114,25 @@ export function KnowledgeView() {
         return ext;
     };
 
+    const renderScope = (doc: Document) => {
+        if (doc.agent_id) return agents.find(a => a.id === doc.agent_id)?.name ?? doc.agent_id;
+        if (doc.channel_id) return `#${channels.find(c => c.id === doc.channel_id)?.name ?? doc.channel_id}`;
+        return 'All agents';
+    };
+
+    const renderStatus = (doc: Document) => {
+        const job = jobs[doc.id];
+        const status = job && !job.finished_at ? job.status : doc.status;
+        if (status === 'failed') {
+            return <span title={doc.error || job?.error || ''} className="text-[10px] font-bold text-red-600 bg-red-50 px-2 py-0.5 rounded-full w-fit">Failed</span>;
+        }
+        if (status === 'pending' || status === 'processing') {
+            const label = job?.stage === 'indexing' ? `Indexing ${Math.round(job.progress * 100)}%` : status === 'pending' ? 'Queued' : 'Indexing';
+            return <span className="text-[10px] font-bold text-amber-600 bg-amber-50 px-2 py-0.5 rounded-full w-fit">{label}</span>;
+        }
+        return <span className="text-[10px] font-bold text-emerald-600 bg-emerald-50 px-2 py-0.5 rounded-full w-fit">Indexed</span>;
+    };
+
     const filteredDocs = documents.filter(doc => {
         const ext = getFileExt(doc);
         if (filterType === 'pdf' && ext !== 'pdf') return false;
@@ -99,19 +163,32 @@ export function KnowledgeView() {
                             </h1>
                             <p className="text-sm text-gray-500 mt-0.5">Upload documents to power your agents' retrieval-augmented (RAG) capabilities.</p>
                         </div>
+                        <div className="flex items-center gap-2">
+                        <select
+                            value={uploadScope}
+                            onChange={e => setUploadScope(e.target.value)}
+                            className="px-3 py-2 text-xs bg-white border border-gray-200 rounded-xl focus:outline-none focus:border-indigo-400"
+                            title="Who can search the uploaded document"
+                        >
+                            <option value="">All agents</option>
+                            {agents.map(a => <option key={a.id} value={`agent:${a.id}`}>Agent: {a.name}</option>)}
+                            {channels.map(c => <option key={c.id} value={`channel:${c.id}`}>Channel: #{c.name}</option>)}
+                        </select>
                         <div className="relative">
                             <input
                                 type="file"
                                 className="absolute inset-0 w-full h-full opacity-0 cursor-pointer"
                                 onChange={handleFileUpload}
-                                accept=".txt,.pdf,.md"
+                                accept=".txt,.pdf,.md,.zip,.tar,.tgz,.gz,.bz2,.xz"
+                                multiple
                                 disabled={isUploading}
                             />
                             <button disabled={isUploading} className="flex items-center gap-2 px-4 py-2 bg-indigo-600 text-white rounded-xl text-sm font-semibold hover:bg-indigo-700 transition-colors shadow-sm disabled:opacity-50">
                                 <Upload className="w-4 h-4" />
-                                {isUploading ? 'Uploading...' : 'Upload a Document'}
+                                {isUploading ? 'Uploading...' : 'Upload Documents'}
                             </button>
                         </div>
+                        </div>
                     </div>
 
                     {error && (
@@ -175,9 +252,9 @@ export function KnowledgeView() {
                                             <span className="font-medium text-gray-800 truncate text-xs">{doc.filename}</span>
                                         </div>
                                         <span className="text-[10px] font-bold text-gray-500 uppercase">{getFileExt(doc)}</span>
-                                        <span className="text-[10px] font-bold text-emerald-600 bg-emerald-50 px-2 py-0.5 rounded-full w-fit">Indexed</span>
+                                        {renderStatus(doc)}
                                         <span className="text-[11px] text-gray-400">{new Date(doc.created_at).toLocaleDateString()}</span>
-                                        <span className="text-[11px] text-gray-400">—</span>
+                                        <span className="text-[11px] text-gray-400 truncate">{renderScope(doc)}</span>
                                         <div className="flex items-center gap-1">
                                             <button
                                                 onClick={(e) => { e.stopPropagation(); setPreviewDoc(doc); }}
@@ -23,10 +23,19 @@ export const api = {
       method: 'POST',
       body: JSON.stringify(data),
     }),
-  getConversation: (id: string) =>
+  getConversation: (id: string, last?: number) =>
     request<import('../types').Conversation & { messages: import('../types').Message[] }>(
-      `/conversations/${id}`
+      `/conversations/${id}${last ? `?last=${last}` : ''}`
     ),
+  getMessages: (id: string, params: { before_id?: number; after_id?: number; limit?: number }) => {
+    const query = new URLSearchParams();
+    if (params.before_id !== undefined) query.set('before_id', String(params.before_id));
+    if (params.after_id !== undefined) query.set('after_id', String(params.after_id));
+    if (params.limit !== undefined) query.set('limit', String(params.limit));
+    return request<{ messages: import('../types').Message[]; has_more: boolean }>(
+      `/conversations/${id}/messages?${query}`
+    );
+  },
   updateConversation: (id: string, data: { title?: string; model?: string }) =>
     request<import('../types').Conversation>(`/conversations/${id}`, {
       method: 'PATCH',
@@ -83,17 +92,35 @@ export const api = {
 
   // Knowledge Base
   getDocuments: () => request<import('../types').Document[]>('/knowledge'),
-  uploadDocument: async (file: File) => {
+  uploadDocument: async (file: File, scope: import('../types').DocumentScope = {}) => {
     const formData = new FormData();
     formData.append('file', file);
+    if (scope.agent_id) formData.append('agent_id', scope.agent_id);
+    if (scope.channel_id) formData.append('channel_id', scope.channel_id);
     const res = await fetch('/api/knowledge', {
       method: 'POST',
       body: formData,
       // Do NOT set Content-Type header here, browser sets it with appropriate boundary for FormData
     });
     if (!res.ok) throw new Error(await res.text());
-    return res.json() as Promise<import('../types').Document>;
+    return res.json() as Promise<import('../types').DocumentUpload>;
+  },
+  bulkUploadDocuments: async (files: File[], scope: import('../types').DocumentScope = {}) => {
+    const formData = new FormData();
+    files.forEach(file => formData.append('files', file));
+    if (scope.agent_id) formData.append('agent_id', scope.agent_id);
+    if (scope.channel_id) formData.append('channel_id', scope.channel_id);
+    const res = await fetch('/api/knowledge/bulk', { method: 'POST', body: formData });
+    if (!res.ok) throw new Error(await res.text());
+    return res.json() as Promise<import('../types').BulkUpload>;
   },
+  getIngestionJob: (jobId: string) =>
+    request<import('../types').IngestionJob>(`/knowledge/jobs/${jobId}`),
+  setDocumentScope: (id: string, scope: import('../types').DocumentScope) =>
+    request<import('../types').Document>(`/knowledge/${id}/scope`, {
+      method: 'PUT',
+      body: JSON.stringify(scope),
+    }),
   deleteDocument: (id: string) =>
     request<{ status: string }>(`/knowledge/${id}`, { method: 'DELETE' }),
 
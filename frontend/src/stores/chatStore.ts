@@ -3,17 +3,22 @@ import type { Conversation, Message, StreamEvent, ModelInfo } from '../types';
 import { api } from '../services/api';
 import { WebSocketClient } from '../services/websocket';
 
+// Messages fetched when opening a conversation and per scroll-back page
+const HISTORY_PAGE_SIZE = 100;
+
 interface ChatState {
   // Data
   conversations: Conversation[];
   activeConversationId: string | null;
   messages: Message[];
+  hasMoreHistory: boolean;
+  isLoadingHistory: boolean;
   models: ModelInfo[];
 
   // UI state
   isStreaming: boolean;
   streamingContent: string;
-  streamingToolCalls: { name: string; args?: Record<string, unknown>; result?: string }[];
+  streamingToolCalls: { id?: string; name: string; args?: Record<string, unknown>; result?: string; elapsedMs?: number }[];
   streamingAgentName: string | null;
   isConnected: boolean;
   error: string | null;
@@ -25,6 +30,7 @@ interface ChatState {
   loadConversations: () => Promise<void>;
   loadModels: () => Promise<void>;
   selectConversation: (id: string) => Promise<void>;
+  loadOlderMessages: () => Promise<void>;
   createConversation: (model?: string, is_group?: boolean, agent_id?: string, channel_id?: string) => Promise<string>;
   startOrLoadAgentChat: (agent: any) => Promise<string>;
   startOrLoadChannelChat: (channel: import('../types').Channel) => Promise<string>;
@@ -40,6 +46,8 @@ export const useChatStore = create<ChatState>((set, get) => ({
   conversations: [],
   activeConversationId: null,
   messages: [],
+  hasMoreHistory: false,
+  isLoadingHistory: false,
   models: [],
   isStreaming: false,
   streamingContent: '',
@@ -69,10 +77,12 @@ export const useChatStore = create<ChatState>((set, get) => ({
 
   selectConversation: async (id: string) => {
     try {
-      const conv = await api.getConversation(id);
+      const conv = await api.getConversation(id, HISTORY_PAGE_SIZE);
+      const messages = conv.messages || [];
       set({
         activeConversationId: id,
-        messages: conv.messages || [],
+        messages,
+        hasMoreHistory: messages.length >= HISTORY_PAGE_SIZE,
         error: null,
       });
       get().connectWebSocket(id);
@@ -81,6 +91,27 @@ export const useChatStore = create<ChatState>((set, get) => ({
     }
   },
 
+  loadOlderMessages: async () => {
+    const { activeConversationId, messages, hasMoreHistory, isLoadingHistory } = get();
+    const oldestId = messages.find((m) => m.id !== undefined)?.id;
+    if (!activeConversationId || !hasMoreHistory || isLoadingHistory || oldestId === undefined) return;
+
+    set({ isLoadingHistory: true });
+    try {
+      const page = await api.getMessages(activeConversationId, { before_id: oldestId, limit: HISTORY_PAGE_SIZE });
+      // Ignore the page if the user switched conversations meanwhile
+      if (get().activeConversationId !== activeConversationId) return;
+      set((state) => ({
+        messages: [...page.messages, ...state.messages],
+        hasMoreHistory: page.has_more,
+      }));
+    } catch (e: any) {
+      set({ error: e.message });
+    } finally {
+      set({ isLoadingHistory: false });
+    }
+  },
+
   createConversation: async (model?: string, is_group?: boolean, agent_id?: string, channel_id?: string) => {
     try {
       const conv = await api.createConversation({ model: model || 'gemini/gemini-2.5-flash', is_group, agent_id, channel_id } as any);
@@ -88,6 +119,7 @@ export const useChatStore = create<ChatState>((set, get) => ({
         conversations: [conv, ...state.conversations],
         activeConversationId: conv.id,
         messages: [],
+        hasMoreHistory: false,
         error: null,
       }));
       get().connectWebSocket(conv.id);
@@ -143,7 +175,7 @@ export const useChatStore = create<ChatState>((set, get) => ({
         const needsClear = state.activeConversationId === id;
         return {
           conversations,
-          ...(needsClear ? { activeConversationId: null, messages: [] } : {}),
+          ...(needsClear ? { activeConversationId: null, messages: [], hasMoreHistory: false } : {}),
         };
       });
     } catch (e: any) {
@@ -207,7 +239,7 @@ export const useChatStore = create<ChatState>((set, get) => ({
             set((state) => ({
               streamingToolCalls: [
                 ...state.streamingToolCalls,
-                { name: event.tool_name || '', args: event.tool_args },
+                { id: event.tool_call_id, name: event.tool_name || '', args: event.tool_args },
               ],
             }));
             break;
@@ -215,8 +247,13 @@ export const useChatStore = create<ChatState>((set, get) => ({
           case 'tool_result':
             set((state) => {
               const calls = [...state.streamingToolCalls];
-              if (calls.length > 0) {
-                calls[calls.length - 1].result = event.tool_result;
+              // Tool calls in one turn run concurrently, so match results by id
+              let idx = event.tool_call_id
+                ? calls.findIndex((c) => c.id === event.tool_call_id)
+                : -1;
+              if (idx === -1) idx = calls.length - 1;
+              if (idx >= 0) {
+                calls[idx] = { ...calls[idx], result: event.tool_result, elapsedMs: event.elapsed_ms };
               }
               return { streamingToolCalls: calls };
             });
@@ -13,6 +13,7 @@ export interface Channel {
   name: string;
   description: string | null;
   is_announcement: boolean;
+  parallel_broadcast?: boolean;
   created_at: string;
   updated_at: string;
 }
@@ -52,6 +53,8 @@ export interface StreamEvent {
   tool_name?: string;
   tool_args?: Record<string, unknown>;
   tool_result?: string;
+  tool_call_id?: string;
+  elapsed_ms?: number;
   message_id?: number;
   conversation_id?: string;
   agent_name?: string;
@@ -93,16 +96,52 @@ export interface Agent {
   updated_at: string;
 }
 
+export type DocumentStatus = 'pending' | 'processing' | 'ready' | 'failed';
+
 export interface Document {
   id: string;
   filename: string;
   file_type: string;
   size: number;
   content_hash: string;
+  status: DocumentStatus;
+  chunk_count: number;
+  error?: string | null;
+  agent_id?: string | null;  // Private to this agent
+  channel_id?: string | null;  // Private to this channel; neither set = shared with all agents
   created_at: string;
   updated_at: string;
 }
 
+export interface DocumentScope {
+  agent_id?: string | null;
+  channel_id?: string | null;
+}
+
+export interface DocumentUpload extends Document {
+  job_id: string | null;
+}
+
+export interface BulkUpload {
+  created: DocumentUpload[];
+  duplicates: Document[];
+  skipped: { name: string; reason: string }[];
+}
+
+export interface IngestionJob {
+  id: string;
+  doc_id: string;
+  filename: string;
+  status: DocumentStatus;
+  stage: 'queued' | 'indexing' | 'done';
+  progress: number;
+  chunks_done: number;
+  page_errors: { page: number; error: string }[];
+  error?: string | null;
+  created_at: string;
+  finished_at?: string | null;
+}
+
 export interface CustomTool {
   id: string;
   name: string;